@@ -0,0 +1,166 @@
+import multiprocessing
+import time
+import traceback
+
+from timed_agent import get_latency_stats, get_noop_action
+
+
+def _agent_worker(connection, agent_class, player_id: int, weights_path: str):
+    # Import wewnątrz procesu agenta - simulation importuje ten moduł
+    from simulation import get_agent, reset_agent
+
+    agent = get_agent(agent_class=agent_class, player_id=player_id, weights_path=weights_path)
+    while True:
+        try:
+            command, step, obs = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+
+        if command == "close":
+            return
+        if command == "reset":
+            reset_agent(agent)
+            continue
+
+        start = time.perf_counter()
+        try:
+            action, error = agent.get_action(obs), None
+        except Exception:
+            action, error = None, traceback.format_exc()
+        connection.send((step, action, time.perf_counter() - start, error))
+
+
+class ProcessAgent:
+    """
+    Agent uruchomiony w osobnym procesie, z którym runner komunikuje się przez Pipe.
+
+    Runner wysyła obserwacje obu graczy (send_observation), a potem odbiera ich akcje (receive_action), więc agenci
+    liczą akcje równolegle i tura trwa tyle, ile wolniejszy z nich. Interfejs i statystyki (get_stats) są takie
+    same jak w TimedAgent, ale czas get_action jest mierzony w procesie agenta.
+
+    Przy limicie time_budget (w sekundach) runner czeka na akcję najwyżej tyle czasu - spóźniona akcja jest
+    odrzucana i zastępowana akcją pustą, a dopóki agent liczy poprzednią akcję, nowe obserwacje nie są wysyłane
+    (w tych turach agent także wykonuje akcję pustą). Wyjątek w get_action albo awaria procesu agenta nie przerywa
+    meczu: agent wykonuje wtedy akcję pustą (błędy są liczone w self.errors, awaria ustawia self.crashed).
+    """
+
+    def __init__(self, agent_class, player_id: int, weights_path: str = None, time_budget: float = None,
+                 context: str = "fork"):
+        self.time_budget = time_budget
+        self.latencies = []
+        self.over_budget = 0
+        self.errors = 0
+        self.crashed = False
+
+        # Metoda "fork" nie wymaga przesłania klasy agenta do procesu (klasy wczytane przez SourceFileLoader
+        # nie dają się zapisać przez pickle)
+        context = multiprocessing.get_context(context)
+        self._connection, worker_connection = context.Pipe()
+        self._process = context.Process(target=_agent_worker, args=(worker_connection, agent_class, player_id,
+                                                                    weights_path), daemon=True)
+        self._process.start()
+        worker_connection.close()
+
+        self._step = 0
+        self._pending_step = None
+        self._sent = False
+        self._sent_at = None
+
+    def _receive(self, timeout: float = None):
+        """
+        Odbiera odpowiedź na ostatnią wysłaną obserwację (odrzucając spóźnione odpowiedzi na wcześniejsze).
+        Zwraca (action, latency, error) albo None, jeśli odpowiedź nie przyszła w czasie timeout.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self._pending_step is not None:
+            remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            if not self._connection.poll(remaining):
+                return None
+            step, action, latency, error = self._connection.recv()
+            if step == self._pending_step:
+                self._pending_step = None
+                return action, latency, error
+        return None
+
+    def _record(self, reply: tuple) -> tuple:
+        # Czas i błędy liczymy także dla spóźnionych odpowiedzi, których akcje zostały odrzucone
+        action, latency, error = reply
+        self.latencies.append(latency)
+        if error is not None:
+            self.errors += 1
+        return reply
+
+    def send_observation(self, obs: dict):
+        self._step += 1
+        self._sent = False
+        if self.crashed:
+            return
+
+        try:
+            # Agent, który nadal liczy poprzednią akcję, nie dostaje nowej obserwacji
+            if self._pending_step is not None:
+                reply = self._receive(timeout=0)
+                if reply is None:
+                    return
+                self._record(reply)
+            self._connection.send(("act", self._step, obs))
+        except (EOFError, OSError):
+            self.crashed = True
+            return
+
+        self._pending_step = self._step
+        self._sent = True
+        self._sent_at = time.perf_counter()
+
+    def receive_action(self) -> dict:
+        if not self._sent:
+            if not self.crashed:
+                self.over_budget += 1
+            return get_noop_action()
+
+        timeout = None if self.time_budget is None else max(self._sent_at + self.time_budget - time.perf_counter(), 0)
+        try:
+            reply = self._receive(timeout=timeout)
+        except (EOFError, OSError):
+            self.crashed = True
+            return get_noop_action()
+
+        if reply is None:
+            self.over_budget += 1
+            return get_noop_action()
+
+        action, latency, error = self._record(reply)
+        if error is not None:
+            return get_noop_action()
+        if self.time_budget is not None and latency > self.time_budget:
+            self.over_budget += 1
+            return get_noop_action()
+        return action
+
+    def get_action(self, obs: dict) -> dict:
+        self.send_observation(obs)
+        return self.receive_action()
+
+    def reset(self):
+        if not self.crashed:
+            try:
+                self._connection.send(("reset", None, None))
+            except (EOFError, OSError):
+                self.crashed = True
+
+    def get_stats(self) -> dict:
+        stats = get_latency_stats(self.latencies, self.time_budget, self.over_budget)
+        stats.update({"errors": self.errors, "crashed": self.crashed})
+        return stats
+
+    def close(self):
+        if self._process.is_alive():
+            try:
+                self._connection.send(("close", None, None))
+            except (EOFError, OSError):
+                pass
+            self._process.join(timeout=1)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self._connection.close()
@@ -0,0 +1,48 @@
+import argparse
+import time
+
+import numpy as np
+
+from data import load_data_from_all_matches
+from feature_extraction import extract_features, extract_features_batch
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description='Compare extract_features with extract_features_batch')
+    parser.add_argument('data_path', type=str, help='Folder with recorded matches (np. saves_choco)')
+    parser.add_argument('--repeats', type=int, default=3, help='Number of timed runs of each extractor')
+    return parser
+
+
+def check_parity(observations):
+    """
+    Sprawdza, czy extract_features_batch zwraca dokładnie to samo co extract_features dla każdej obserwacji.
+    """
+    expected = np.stack([extract_features(obs).numpy() for obs in observations])
+    batch = extract_features_batch(observations)
+    assert batch.shape == expected.shape, f"Zły wymiar cech: {batch.shape} zamiast {expected.shape}"
+    mismatches = np.flatnonzero((batch != expected).any(axis=1))
+    assert len(mismatches) == 0, f"Różne cechy dla {len(mismatches)} obserwacji, np. indeks {mismatches[0]}"
+
+
+def benchmark(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    args = get_parser().parse_args()
+    observations, _, _ = load_data_from_all_matches(args.data_path)
+
+    check_parity(observations)
+    print(f"Zgodność cech: OK ({len(observations)} obserwacji)")
+
+    per_sample = benchmark(lambda: [extract_features(obs) for obs in observations], args.repeats)
+    batch = benchmark(lambda: extract_features_batch(observations), args.repeats)
+    print(f"extract_features:       {per_sample * 1e3:8.2f} ms ({per_sample / len(observations) * 1e6:.2f} us/obserwację)")
+    print(f"extract_features_batch: {batch * 1e3:8.2f} ms ({batch / len(observations) * 1e6:.2f} us/obserwację)")
+    print(f"Przyspieszenie: {per_sample / batch:.1f}x")
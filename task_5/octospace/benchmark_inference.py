@@ -0,0 +1,62 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from simple_agent_1.inference import BACKENDS, EagerBackend, create_backend, export_onnx, export_torchscript, \
+    time_backend
+from simple_agent_1.simple_agent import SimpleAgent
+
+INPUT_DIM = 55
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description='Compare the latency of SimpleAgent inference backends')
+    parser.add_argument('--weights_path', type=str, default=None,
+                        help='Folder with agent_weights.pth (by default random weights)')
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1, 8, 64], help='Batch sizes to time')
+    parser.add_argument('--n_calls', type=int, default=1000, help='Number of timed calls per backend and batch size')
+    parser.add_argument('--num_threads', type=int, default=1, help='Number of torch / onnxruntime threads')
+    parser.add_argument('--export_path', type=str, default=None,
+                        help='Folder to save the exported model.onnx and model.pt')
+    return parser
+
+
+if __name__ == '__main__':
+    args = get_parser().parse_args()
+    torch.set_num_threads(args.num_threads)
+
+    model = SimpleAgent(input_dim=INPUT_DIM, hidden_dim=128)
+    if args.weights_path is not None:
+        model.load_state_dict(torch.load(Path(args.weights_path) / "agent_weights.pth", map_location="cpu"))
+    model.eval()
+
+    if args.export_path is not None:
+        export_path = Path(args.export_path)
+        export_path.mkdir(parents=True, exist_ok=True)
+        export_onnx(model, INPUT_DIM, export_path / "model.onnx")
+        export_torchscript(model, INPUT_DIM, export_path / "model.pt")
+        print(f"Modele zapisane w {export_path}")
+
+    backends = {}
+    for name in BACKENDS:
+        try:
+            backends[name] = create_backend(name, model, INPUT_DIM)
+        except Exception as e:
+            print(f"Backend {name} niedostępny: {e}")
+
+    rng = np.random.default_rng(0)
+    eager = EagerBackend(model, INPUT_DIM)
+    for batch_size in args.batch_sizes:
+        features = rng.random((batch_size, INPUT_DIM), dtype=np.float32)
+        expected = eager(features)
+
+        print(f"\nBatch {batch_size}:")
+        for name, backend in backends.items():
+            # Zgodność wyników z modelem eager (maksymalna różnica logitów)
+            max_diff = max(float(np.abs(out - exp).max()) for out, exp in zip(backend(features), expected))
+            times = time_backend(backend, features, n_calls=args.n_calls) * 1e6
+            p50, p99 = np.percentile(times, [50, 99])
+            print(f"  {name:12} p50 {p50:8.1f} us, p99 {p99:8.1f} us, średnio {times.mean():8.1f} us, "
+                  f"różnica logitów {max_diff:.1e}")
@@ -0,0 +1,83 @@
+import argparse
+
+import numpy as np
+
+from octospace.envs.game_config import MAX_SHIP_FIRE_RANGE
+from octospace.envs.game_logic import _get_target, _get_targets
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description='Compare the vectorized target selection with _get_target')
+    parser.add_argument('--n_batches', type=int, default=200, help='Number of random batches of ships')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random batches')
+    return parser
+
+
+def check_shots(ships_x, ships_y, directions, enemy_x, enemy_y):
+    """
+    Sprawdza, czy _get_targets (wszystkie strzały naraz przez _select_targets) wybiera dla każdego strzału
+    ten sam cel co _get_target.
+    """
+    targets = _get_targets(ships_x=ships_x, ships_y=ships_y, directions=directions, enemy_x=enemy_x, enemy_y=enemy_y)
+    expected = [_get_target(int(x), int(y), int(direction), enemy_x, enemy_y)
+                for x, y, direction in zip(ships_x, ships_y, directions)]
+    mismatches = np.flatnonzero(targets != np.array(expected, dtype=int))
+    assert len(mismatches) == 0, (f"Różny cel strzału {mismatches[0]}: {targets[mismatches[0]]} zamiast "
+                                  f"{expected[mismatches[0]]} (statek ({ships_x[mismatches[0]]}, "
+                                  f"{ships_y[mismatches[0]]}), kierunek {directions[mismatches[0]]})")
+    return len(targets)
+
+
+def sweep_offsets():
+    """
+    Jeden przeciwnik na każdym polu w zasięgu (z zapasem) i strzały we wszystkich czterech kierunkach.
+    """
+    reach = MAX_SHIP_FIRE_RANGE + 2
+    n_shots = 0
+    for dx in range(-reach, reach + 1):
+        for dy in range(-reach, reach + 1):
+            enemy = np.array([50 + dx]), np.array([50 + dy])
+            n_shots += check_shots(np.full(4, 50), np.full(4, 50), np.arange(4), *enemy)
+    return n_shots
+
+
+def sweep_ties():
+    """
+    Dwaj przeciwnicy w tej samej odległości (symetrycznie względem kierunku strzału) w obu kolejnościach
+    oraz przeciwnicy na tym samym polu - wybierany jest pierwszy z nich.
+    """
+    n_shots = 0
+    for distance in range(1, MAX_SHIP_FIRE_RANGE + 2):
+        for side in range(0, distance + 1):
+            for direction, (enemy_x, enemy_y) in enumerate([
+                ([50 + distance, 50 + distance], [50 - side, 50 + side]),
+                ([50 - side, 50 + side], [50 + distance, 50 + distance]),
+                ([50 - distance, 50 - distance], [50 - side, 50 + side]),
+                ([50 - side, 50 + side], [50 - distance, 50 - distance]),
+            ]):
+                for order in [slice(None), slice(None, None, -1)]:
+                    n_shots += check_shots(np.array([50]), np.array([50]), np.array([direction]),
+                                           np.array(enemy_x)[order], np.array(enemy_y)[order])
+        n_shots += check_shots(np.full(4, 50), np.full(4, 50), np.arange(4),
+                               np.array([50 + distance] * 3), np.array([50] * 3))
+    return n_shots
+
+
+def random_batches(n_batches, rng):
+    """
+    Losowe grupy statków i przeciwników na małym fragmencie planszy (dużo celów w zasięgu).
+    """
+    n_shots = 0
+    for _ in range(n_batches):
+        n_ships, n_enemies = rng.integers(1, 30), rng.integers(0, 60)
+        ships_x, ships_y = rng.integers(30, 70, n_ships), rng.integers(30, 70, n_ships)
+        enemy_x, enemy_y = rng.integers(30, 70, n_enemies), rng.integers(30, 70, n_enemies)
+        n_shots += check_shots(ships_x, ships_y, rng.integers(0, 4, n_ships), enemy_x, enemy_y)
+    return n_shots
+
+
+if __name__ == '__main__':
+    args = get_parser().parse_args()
+    print(f"Przesunięcia: OK ({sweep_offsets()} strzałów)")
+    print(f"Remisy: OK ({sweep_ties()} strzałów)")
+    print(f"Losowe grupy: OK ({random_batches(args.n_batches, np.random.default_rng(args.seed))} strzałów)")
@@ -0,0 +1,126 @@
+import argparse
+
+import numpy as np
+
+from octospace.envs import OctoSpaceEnv, VectorOctoSpaceEnv
+from octospace.envs.game_config import PLAYER_1_ORIGIN, PLAYER_2_ORIGIN
+from octospace.envs.ship_table import ShipTableState
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description='Compare VectorOctoSpaceEnv with a loop over OctoSpaceEnv')
+    parser.add_argument('--num_envs', type=int, default=8, help='Number of matches')
+    parser.add_argument('--n_steps', type=int, default=600, help='Number of steps of the vector env')
+    parser.add_argument('--max_steps', type=int, default=250, help='Turn limit of a match')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the maps and the actions')
+    parser.add_argument('--crowd', type=int, default=100,
+                        help='Number of ships of every player placed in the middle of the board in the 1st round')
+    return parser
+
+
+def random_actions(obs: dict, target: np.ndarray, rng: np.random.Generator, noise: float) -> dict:
+    """
+    Losowe akcje jednego gracza: statki lecą w stronę target (z prawdopodobieństwem noise w losowym
+    kierunku), część strzela, do tego rozkazy dla nieistniejących statków i kilka rozkazów dla tego samego statku.
+    """
+    ships = obs["allied_ships"]
+    ships_actions = []
+    for ship_id, x, y, *_ in ships:
+        if rng.random() < 0.3:
+            ships_actions.append((ship_id, 1, int(rng.integers(0, 4)), 0))
+        dx, dy = target[0] - x, target[1] - y
+        direction = (0 if dx > 0 else 2) if abs(dx) > abs(dy) else (1 if dy > 0 else 3)
+        if rng.random() < noise:
+            direction = int(rng.integers(0, 4))
+        for _ in range(int(rng.integers(1, 3))):
+            ships_actions.append((ship_id, 0, direction, int(rng.integers(0, 5))))
+    for _ in range(int(rng.integers(0, 3))):
+        ships_actions.append((int(rng.integers(0, 300)), int(rng.integers(0, 2)), int(rng.integers(0, 4)),
+                              int(rng.integers(0, 4))))
+    rng.shuffle(ships_actions)
+    return {"ships_actions": ships_actions, "construction": int(rng.integers(0, 11))}
+
+
+def crowded_ships(n_ships: int, rng: np.random.Generator) -> ShipTableState:
+    """
+    Po n_ships statków każdego gracza stłoczonych na środku planszy (dużo strzałów do tych samych celów i remisów).
+    """
+    owner = np.repeat([0, 1], n_ships)
+    rng.shuffle(owner)
+    ids = np.zeros(2 * n_ships, dtype=int)
+    for player in range(2):
+        ids[owner == player] = np.arange(n_ships)
+    return ShipTableState(ids=ids, owner=owner, x=rng.integers(40, 60, 2 * n_ships),
+                          y=rng.integers(40, 60, 2 * n_ships), hp=rng.integers(10, 101, 2 * n_ships),
+                          firing_cooldown=np.zeros(2 * n_ships, dtype=int), move_cooldown=rng.integers(0, 2, 2 * n_ships),
+                          facing=rng.integers(0, 4, 2 * n_ships), next_id=(n_ships, n_ships))
+
+
+def compare_obs(vector_obs: dict, obs: list):
+    """
+    Sprawdza, czy obserwacje wszystkich meczów z VectorOctoSpaceEnv są takie same jak z osobnych OctoSpaceEnv.
+    """
+    for player in ["player_1", "player_2"]:
+        for i, env_obs in enumerate(obs):
+            expected, actual = env_obs[player], {name: values[i] for name, values in vector_obs[player].items()}
+            assert np.array_equal(expected["map"], actual["map"]), f"Różna mapa ({player}, mecz {i})"
+            for name in ["allied_ships", "enemy_ships"]:
+                assert expected[name] == actual[name], f"Różne {name} ({player}, mecz {i})"
+            assert [tuple(int(value) for value in planet) for planet in expected["planets_occupation"]] == \
+                   [tuple(int(value) for value in planet) for planet in actual["planets_occupation"]], \
+                f"Różne planets_occupation ({player}, mecz {i})"
+            assert np.array_equal(expected["resources"], actual["resources"]), f"Różne zasoby ({player}, mecz {i})"
+
+
+if __name__ == '__main__':
+    args = get_parser().parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    vector_env = VectorOctoSpaceEnv(num_envs=args.num_envs, player_1_id=46, player_2_id=47, max_steps=args.max_steps)
+    vector_obs, _ = vector_env.reset(seed=args.seed)
+
+    # Mapy są losowane globalnym generatorem numpy w kolejności resetów, tak samo jak w VectorOctoSpaceEnv
+    envs = [OctoSpaceEnv(player_1_id=46, player_2_id=47, max_steps=args.max_steps) for _ in range(args.num_envs)]
+    np.random.seed(args.seed)
+    obs = [env.reset()[0] for env in envs]
+    autoreset = np.zeros(args.num_envs, dtype=bool)
+
+    if args.crowd > 0:
+        for i, env in enumerate(envs):
+            ships = crowded_ships(args.crowd, rng)
+            env._ships.set_state(ships)
+            vector_env.ships.set_state(ships, env=i)
+        obs, vector_obs = [env._get_obs() for env in envs], vector_env._get_obs()
+    compare_obs(vector_obs, obs)
+
+    n_finished, n_won, n_ships = 0, 0, 0
+    for step in range(args.n_steps):
+        # Gracz player_1 zawsze zaczyna przy PLAYER_1_ORIGIN. W co drugim meczu statki lecą prosto na bazę
+        # przeciwnika, więc mecze kończą się też jej zdobyciem
+        actions = [{player: random_actions({name: values[i] for name, values in vector_obs[player].items()}, target,
+                                           rng, noise=0.3 * (i % 2))
+                    for player, target in [("player_1", PLAYER_2_ORIGIN), ("player_2", PLAYER_1_ORIGIN)]}
+                   for i in range(args.num_envs)]
+        # Nowe mapy po resetach są losowane z tego samego stanu globalnego generatora
+        random_state = np.random.get_state()
+        vector_obs, rewards, terminated, _, _ = vector_env.step(actions)
+        np.random.set_state(random_state)
+
+        for i, env in enumerate(envs):
+            if autoreset[i]:
+                obs[i], reward, autoreset[i] = env.reset()[0], {"player_1": 0, "player_2": 0}, False
+            else:
+                obs[i], reward, _, _, _ = env.step(actions[i])
+                autoreset[i] = env._game_over()
+            assert [rewards["player_1"][i], rewards["player_2"][i]] == [reward["player_1"], reward["player_2"]], \
+                f"Różna nagroda w kroku {step} (mecz {i})"
+            n_ships += len(env._ships)
+        assert np.array_equal(terminated, autoreset), f"Różne zakończenie meczów w kroku {step}"
+        compare_obs(vector_obs, obs)
+        n_finished += int(terminated.sum())
+        n_won += int(np.sum(terminated & (rewards["player_1"] != rewards["player_2"])))
+
+    vector_env.close()
+    print(f"Zgodność z OctoSpaceEnv: OK ({args.n_steps} kroków, {n_finished} zakończonych meczów, w tym {n_won} "
+          f"wygranych, "
+          f"średnio {n_ships / args.n_steps / args.num_envs:.1f} statków w meczu)")
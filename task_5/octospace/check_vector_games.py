@@ -0,0 +1,70 @@
+import argparse
+
+import numpy as np
+
+from octospace.envs.game_config import PLAYER_1_ORIGIN, PLAYER_2_ORIGIN
+from simulation import simulate_vector_games
+
+
+class RushAgent:
+    """
+    Agent, który buduje statki i wysyła wszystkie prosto na bazę przeciwnika.
+    """
+
+    def __init__(self, player_id):
+        self.target = None
+
+    def get_action(self, obs: dict) -> dict:
+        ships = obs["allied_ships"]
+        if self.target is None and ships:
+            # Gracz startujący przy PLAYER_1_ORIGIN atakuje bazę PLAYER_2_ORIGIN i odwrotnie
+            near_player_1 = np.abs(np.array(ships[0][1:3]) - PLAYER_1_ORIGIN).sum() < np.abs(
+                np.array(ships[0][1:3]) - PLAYER_2_ORIGIN).sum()
+            self.target = PLAYER_2_ORIGIN if near_player_1 else PLAYER_1_ORIGIN
+
+        ships_actions = []
+        for ship_id, x, y, *_ in ships:
+            dx, dy = self.target[0] - x, self.target[1] - y
+            if abs(dx) > abs(dy):
+                direction = 0 if dx > 0 else 2
+            else:
+                direction = 1 if dy > 0 else 3
+            ships_actions.append((ship_id, 0, direction, 3))
+        return {"ships_actions": ships_actions, "construction": 10}
+
+    def load(self, abs_path: str):
+        pass
+
+    def eval(self):
+        pass
+
+    def to(self, device):
+        pass
+
+
+class IdleAgent(RushAgent):
+    """
+    Agent, który nic nie robi.
+    """
+
+    def get_action(self, obs: dict) -> dict:
+        return {"ships_actions": [], "construction": 0}
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description='Check that simulate_vector_games scores won games')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the games')
+    parser.add_argument('--n_games', type=int, default=4, help='Number of games (each in its own env)')
+    return parser
+
+
+if __name__ == '__main__':
+    args = get_parser().parse_args()
+
+    # Każda gra toczy się w osobnym środowisku, więc wszystkie są pierwszymi rundami (bez zamiany stron):
+    # RushAgent jako gracz 1 zdobywa bazę bezczynnego przeciwnika przed limitem tur i każda gra jest jego wygraną
+    score = simulate_vector_games(player_1_id=46, player_2_id=47, player_1_agent_class=RushAgent,
+                                  player_2_agent_class=IdleAgent, n_games=args.n_games, num_envs=args.n_games,
+                                  seed=args.seed)
+    assert list(score) == [args.n_games, 0], f"Zły wynik gier zakończonych zdobyciem bazy: {score}"
+    print(f"Wygrane gry są liczone: OK (wynik {score})")
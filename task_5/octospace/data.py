@@ -5,6 +5,8 @@ import numpy as np
 import torch
 from torch.utils.data import Dataset, DataLoader
 
+from trajectory import TrajectoryReader, TRAJECTORY_SUFFIX
+
 
 def np_encoder(obj):
     """Konwertuje obiekty NumPy na typy kompatybilne z JSON."""
@@ -117,6 +119,20 @@ def load_data_from_single_match(match_folder: Path):
     return match_observations, match_actions, match_rewards
 
 
+def load_data_from_trajectory(match_file: Path):
+    """
+    Wczytuje dane treningowe z pliku rozgrywki zapisanego przez TrajectoryRecorder (patrz trajectory.py).
+    Mapy w obserwacjach są widokami na plik zmapowany do pamięci (bez kopiowania).
+    Zwraca:
+      match_observations, match_actions, match_rewards
+    """
+    reader = TrajectoryReader(match_file)
+    match_observations = [reader.get_observation(step) for step in range(len(reader))]
+    match_actions = [reader.get_action(step) for step in range(len(reader))]
+    match_rewards = [reader.get_reward(step) for step in range(len(reader))]
+    return match_observations, match_actions, match_rewards
+
+
 def load_data_from_all_matches(main_folder: str):
     """
     Wczytuje dane z folderu `main_folder` (np. "pierwszekrokibebika"),
@@ -124,7 +140,8 @@ def load_data_from_all_matches(main_folder: str):
     (np. 2025-03-15_16-41-48, 2025-03-15_16-50-00, itp.).
 
     Każdy z tych podfolderów zawiera kolejne rundy (0..10 itd.) z plikami
-    observations.json, actions.json i rewards.json.
+    observations.json, actions.json i rewards.json. Rozgrywki zapisane jako
+    pojedyncze pliki .octo (TrajectoryRecorder) są wczytywane przez load_data_from_trajectory.
 
     Zwraca:
       all_observations, all_actions, all_rewards
@@ -137,10 +154,13 @@ def load_data_from_all_matches(main_folder: str):
 
     # Iterujemy po podfolderach – każda nazwa to np. 2025-03-15_16-41-48
     for match_subfolder in base_path.iterdir():
-        if match_subfolder.is_dir():
+        if match_subfolder.is_dir() or match_subfolder.suffix == TRAJECTORY_SUFFIX:
             print(f"[Rozgrywka {match_subfolder.name}]")
             try:
-                obs, acts, rews = load_data_from_single_match(match_subfolder)
+                if match_subfolder.is_dir():
+                    obs, acts, rews = load_data_from_single_match(match_subfolder)
+                else:
+                    obs, acts, rews = load_data_from_trajectory(match_subfolder)
                 all_observations.extend(obs)
                 all_actions.extend(acts)
                 all_rewards.extend(rews)
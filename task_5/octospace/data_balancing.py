@@ -1,7 +1,51 @@
+import hashlib
+import json
+
+import numpy as np
 import torch
 
 
-def compute_class_weights(dataset):
+# Plik z zapisanymi wagami klas w folderze z fragmentami danych (patrz ShardedOctoSpaceDataset)
+CLASS_WEIGHTS_FILE = "class_weights.json"
+
+NUM_ACTION_CLASSES = 2
+NUM_DIRECTION_CLASSES = 4
+NUM_SPEED_CLASSES = 3
+NUM_CONSTRUCTION_CLASSES = 11
+
+
+def get_dataset_labels(dataset):
+    """
+    Etykiety wszystkich próbek datasetu: labels (N, 3) i construction (N,).
+    Datasety z metodą get_labels (np. MemmapOctoSpaceDataset) zwracają je bez liczenia cech,
+    dla pozostałych pobieramy kolejne próbki.
+    """
+    if hasattr(dataset, "get_labels"):
+        labels, construction = dataset.get_labels()
+        return np.asarray(labels), np.asarray(construction)
+
+    labels = np.zeros((len(dataset), 3), dtype=np.int64)
+    construction = np.zeros(len(dataset), dtype=np.int64)
+    for i in range(len(dataset)):
+        _, sample_labels, sample_construction = dataset[i]
+        labels[i] = sample_labels.cpu().numpy()
+        construction[i] = int(sample_construction)
+    return labels, construction
+
+
+def _class_weights(values, num_classes):
+    # Wagi odwrotnie proporcjonalne do liczności klas: total / (num_classes * count), brakująca klasa ma count = 1
+    values = np.asarray(values).reshape(-1)
+    counts = np.bincount(values[(values >= 0) & (values < num_classes)], minlength=num_classes)
+    counts[counts == 0] = 1
+    return len(values) / (num_classes * counts)
+
+
+def _get_manifest_key(manifest):
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()
+
+
+def compute_class_weights(dataset, device=None):
     """
     Oblicza wagi klas dla etykiet datasetu.
     Zakładamy, że dataset zwraca:
@@ -12,59 +56,33 @@ def compute_class_weights(dataset):
       - direction (4 klasy)
       - speed (3 klasy)
       - construction (11 klas)
+    Liczności klas liczymy jednym np.bincount na głowicę. Dla datasetu z manifestem (ShardedOctoSpaceDataset)
+    wynik jest zapisywany w folderze fragmentów i używany ponownie, dopóki manifest się nie zmieni.
+    Wagi zwracamy jako tensory na device (domyślnie cuda, jeśli jest dostępna, w przeciwnym razie cpu).
     """
-    action_counts = {}
-    direction_counts = {}
-    speed_counts = {}
-    construction_counts = {}
+    device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
 
-    for i in range(len(dataset)):
-        _, labels, constr = dataset[i]
-        a = int(labels[0].item())
-        d = int(labels[1].item())
-        s = int(labels[2].item())
-        c = int(constr.item())
-
-        action_counts[a] = action_counts.get(a, 0) + 1
-        direction_counts[d] = direction_counts.get(d, 0) + 1
-        speed_counts[s] = speed_counts.get(s, 0) + 1
-        construction_counts[c] = construction_counts.get(c, 0) + 1
-
-    total_actions = sum(action_counts.values())
-    total_directions = sum(direction_counts.values())
-    total_speeds = sum(speed_counts.values())
-    total_construction = sum(construction_counts.values())
-
-    num_action_classes = 2
-    num_direction_classes = 4
-    num_speed_classes = 3
-    num_construction_classes = 11
-
-    action_weights = []
-    for i in range(num_action_classes):
-        count = action_counts.get(i, 1)
-        weight = total_actions / (num_action_classes * count)
-        action_weights.append(weight)
-
-    direction_weights = []
-    for i in range(num_direction_classes):
-        count = direction_counts.get(i, 1)
-        weight = total_directions / (num_direction_classes * count)
-        direction_weights.append(weight)
-
-    speed_weights = []
-    for i in range(num_speed_classes):
-        count = speed_counts.get(i, 1)
-        weight = total_speeds / (num_speed_classes * count)
-        speed_weights.append(weight)
-
-    construction_weights = []
-    for i in range(num_construction_classes):
-        count = construction_counts.get(i, 1)
-        weight = total_construction / (num_construction_classes * count)
-        construction_weights.append(weight)
-
-    return (torch.tensor(action_weights, dtype=torch.float32, device="cuda"),
-            torch.tensor(direction_weights, dtype=torch.float32, device="cuda"),
-            torch.tensor(speed_weights, dtype=torch.float32, device="cuda"),
-            torch.tensor(construction_weights, dtype=torch.float32, device="cuda"))
+    cache_file = None
+    manifest = getattr(dataset, "manifest", None)
+    if manifest is not None:
+        cache_file = dataset.shards_path / CLASS_WEIGHTS_FILE
+        manifest_key = _get_manifest_key(manifest)
+        if cache_file.exists():
+            with open(cache_file, "r") as f:
+                cached = json.load(f)
+            if cached["manifest_key"] == manifest_key:
+                return tuple(torch.tensor(weights, dtype=torch.float32, device=device) for weights in cached["weights"])
+
+    labels, construction = get_dataset_labels(dataset)
+    weights = [
+        _class_weights(labels[:, 0], NUM_ACTION_CLASSES),
+        _class_weights(labels[:, 1], NUM_DIRECTION_CLASSES),
+        _class_weights(labels[:, 2], NUM_SPEED_CLASSES),
+        _class_weights(construction, NUM_CONSTRUCTION_CLASSES),
+    ]
+
+    if cache_file is not None:
+        with open(cache_file, "w") as f:
+            json.dump({"manifest_key": manifest_key, "weights": [w.tolist() for w in weights]}, f, indent=2)
+
+    return tuple(torch.tensor(w, dtype=torch.float32, device=device) for w in weights)
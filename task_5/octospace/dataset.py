@@ -1,14 +1,62 @@
+import json
 from pathlib import Path
 
+import numpy as np
 import torch
-from torch.utils.data import Dataset, DataLoader
-from feature_extraction import extract_features
+from torch.utils.data import ConcatDataset, Dataset, DataLoader, IterableDataset, get_worker_info
+from feature_extraction import extract_features, extract_features_batch
 
-from data import load_data_from_all_matches
+from data import load_data_from_all_matches, load_data_from_single_match
+from trajectory import TrajectoryReader, TRAJECTORY_SUFFIX
+
+
+# Plik z listą przetworzonych rozgrywek w folderze z fragmentami danych (patrz preprocess.py)
+SHARDS_MANIFEST_FILE = "manifest.json"
+
+
+def action_to_labels(act):
+    """
+    Zamienia akcję (dict) na etykiety: [action_type, direction, speed_label] oraz construction.
+    Bierzemy pierwszą akcję z "ships_actions", a jeśli lista jest pusta - domyślną [0, 0, 0, 1].
+    """
+    # Obsługa akcji – lista "ships_actions" może być pusta
+    ship_actions = act.get("ships_actions", [])
+    if len(ship_actions) > 0:
+        act0 = ship_actions[0]
+    else:
+        act0 = [0, 0, 0, 1]  # Domyślna akcja: [ship_id, action_type, direction, speed]
+
+    # act0: [ship_id, action_type, direction, speed]
+    action_type = act0[1]  # 0: move, 1: fire
+    direction = act0[2]    # 0-3
+    speed_label = (act0[3] - 1) if action_type == 0 else 0
+
+    # Wyciągamy etykietę konstrukcji z akcji (domyślnie 0, jeśli nie podano)
+    construction_val = act.get("construction", 0)
+    return [action_type, direction, speed_label], construction_val
+
+
+def actions_to_labels_batch(ships_actions, ships_actions_offsets, construction):
+    """
+    Wektorowa wersja action_to_labels dla bloku kolumnowego akcji (format TrajectoryRecorder):
+    ships_actions (A, 4), ships_actions_offsets (N + 1,), construction (N,).
+    Zwraca labels (N, 3) int64 i construction (N,) int64.
+    """
+    offsets = np.asarray(ships_actions_offsets, dtype=np.int64)
+    has_action = np.diff(offsets) > 0
+
+    act0 = np.tile(np.array([0, 0, 0, 1], dtype=np.int64), (len(has_action), 1))
+    act0[has_action] = ships_actions[offsets[:-1][has_action]]
+
+    labels = np.zeros((len(act0), 3), dtype=np.int64)
+    labels[:, 0] = act0[:, 1]
+    labels[:, 1] = act0[:, 2]
+    labels[:, 2] = np.where(act0[:, 1] == 0, act0[:, 3] - 1, 0)
+    return labels, np.asarray(construction, dtype=np.int64)
 
 
 class OctoSpaceDataset(Dataset):
-    def __init__(self, observations, actions, max_ships=10, max_planets=8):
+    def __init__(self, observations, actions, max_ships=10, max_planets=8, device=None):
         """
         Założenia:
          - Każda obserwacja (dict) zawiera klucze: "allied_ships", "resources", "planets_occupation", itd.
@@ -17,19 +65,27 @@ class OctoSpaceDataset(Dataset):
              "ships_actions" – lista akcji; bierzemy pierwszą akcję (format: [ship_id, action_type, direction, speed])
              oraz "construction" – liczba statków do zbudowania (int, zakres 0-10).
            Jeśli lista "ships_actions" jest pusta, przypisujemy domyślną akcję: [0, 0, 0, 1].
+         - device: urządzenie tensorów (domyślnie cuda, jeśli jest dostępna, w przeciwnym razie cpu).
         """
         assert len(observations) == len(actions), "Liczba obserwacji musi być równa liczbie akcji."
         self.observations = observations
         self.actions = actions
         self.max_ships = max_ships
         self.max_planets = max_planets
-        self.device = torch.device("cuda")
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
         # Inicjalizujemy cache – będzie to słownik, w którym kluczem jest indeks, a wartością wynik __getitem__
         self.cache = {}
 
     def __len__(self):
         return len(self.observations)
 
+    def get_labels(self):
+        """
+        Etykiety wszystkich próbek jako tablice numpy: labels (N, 3) i construction (N,), bez liczenia cech.
+        """
+        labels, construction = zip(*map(action_to_labels, self.actions)) if self.actions else ([], [])
+        return np.array(labels, dtype=np.int64).reshape(-1, 3), np.array(construction, dtype=np.int64)
+
     def __getitem__(self, idx):
         # Jeśli wynik dla danego indeksu jest już w cache, zwracamy go
         if idx in self.cache:
@@ -41,21 +97,8 @@ class OctoSpaceDataset(Dataset):
         # Wyciągamy cechy przy użyciu funkcji extract_features (przekazujemy także device)
         features_tensor = extract_features(obs, max_ships=self.max_ships, max_planets=self.max_planets, device=self.device)
 
-        # Obsługa akcji – lista "ships_actions" może być pusta
-        ship_actions = act.get("ships_actions", [])
-        if len(ship_actions) > 0:
-            act0 = ship_actions[0]
-        else:
-            act0 = [0, 0, 0, 1]  # Domyślna akcja: [ship_id, action_type, direction, speed]
-
-        # act0: [ship_id, action_type, direction, speed]
-        action_type = act0[1]  # 0: move, 1: fire
-        direction = act0[2]    # 0-3
-        speed_label = (act0[3] - 1) if action_type == 0 else 0
-        labels = torch.tensor([action_type, direction, speed_label], dtype=torch.long, device=self.device)
-
-        # Wyciągamy etykietę konstrukcji z akcji (domyślnie 0, jeśli nie podano)
-        construction_val = act.get("construction", 0)
+        labels_val, construction_val = action_to_labels(act)
+        labels = torch.tensor(labels_val, dtype=torch.long, device=self.device)
         construction_tensor = torch.tensor(construction_val, dtype=torch.long, device=self.device)
 
         data = (features_tensor, labels, construction_tensor)
@@ -64,6 +107,226 @@ class OctoSpaceDataset(Dataset):
         return data
 
 
+class MemmapOctoSpaceDataset(Dataset):
+    """
+    Dataset z cech i etykiet przygotowanych wcześniej przez preprocess_matches i zapisanych w folderze data_path:
+      - features.npy: (N, 55) float32 - wynik extract_features
+      - labels.npy: (N, 3) int64 - [action_type, direction, speed_label]
+      - construction.npy: (N,) int64
+    Pliki są mapowane do pamięci (np.load z mmap_mode="r"), więc tworzenie datasetu nie zależy od liczby próbek,
+    a procesy DataLoadera (num_workers > 0) współdzielą strony pliku zamiast kopii danych.
+    Zwraca te same krotki co OctoSpaceDataset, ale zawsze jako tensory na cpu - na GPU przenosimy całe batche
+    (np. DataLoader z pin_memory=True i .to(device, non_blocking=True)).
+    """
+
+    FILES = ("features", "labels", "construction")
+
+    def __init__(self, data_path):
+        self.data_path = Path(data_path)
+        self._arrays = None
+        self._length = len(self._load()["features"])
+
+    def _load(self):
+        # Pliki otwieramy leniwie - każdy proces DataLoadera mapuje je sam (patrz __getstate__)
+        if self._arrays is None:
+            self._arrays = {name: np.load(self.data_path / f"{name}.npy", mmap_mode="r") for name in self.FILES}
+        return self._arrays
+
+    def __getstate__(self):
+        # Mapowanie pliku nie jest przekazywane do procesów DataLoadera, bo pickle skopiowałby całe tablice
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        return state
+
+    def __len__(self):
+        return self._length
+
+    def get_labels(self):
+        arrays = self._load()
+        return arrays["labels"], arrays["construction"]
+
+    def __getitem__(self, idx):
+        arrays = self._load()
+        return (torch.from_numpy(np.array(arrays["features"][idx])),
+                torch.from_numpy(np.array(arrays["labels"][idx])),
+                torch.tensor(arrays["construction"][idx]))
+
+
+class StreamingOctoSpaceDataset(IterableDataset):
+    """
+    Strumieniowy dataset nad plikami rozgrywek (pliki .octo albo foldery z zapisem JSON), który nie wczytuje całego
+    zbioru do pamięci. Zwraca gotowe batche (features (B, 55), labels (B, 3), construction (B,)) - DataLoader
+    tworzymy z batch_size=None (patrz create_streaming_dataloader).
+
+    Próbki przechodzą przez bufor mieszający o rozmiarze shuffle_buffer_size: batch to losowe próbki z bufora,
+    a ich miejsce zajmują kolejne próbki z plików. W pamięci jest więc najwyżej bufor i jeden fragment pliku
+    (albo jedna rozgrywka JSON). Kolejność rozgrywek jest losowana co epokę (set_epoch), a przy num_workers > 0
+    każdy proces DataLoadera czyta co num_workers-tą rozgrywkę.
+
+    Parametry:
+      saves_paths: foldery z zapisami rozgrywek albo pojedyncze rozgrywki
+      batch_size: rozmiar batcha (ostatni batch epoki może być mniejszy)
+      shuffle_buffer_size: rozmiar bufora mieszającego, 0 - bez mieszania
+      seed: ziarno losowania kolejności rozgrywek i próbek
+    """
+
+    def __init__(self, saves_paths, batch_size=256, shuffle_buffer_size=16384, seed=0, max_ships=10, max_planets=8):
+        self.match_paths = []
+        for path in map(Path, saves_paths):
+            # Folder rozgrywki JSON zawiera foldery kroków z observations.json, folder z zapisami - foldery rozgrywek
+            if path.suffix == TRAJECTORY_SUFFIX or any(path.glob("*/observations.json")):
+                self.match_paths.append(path)
+            else:
+                self.match_paths.extend(sorted(match for match in path.iterdir()
+                                               if match.is_dir() or match.suffix == TRAJECTORY_SUFFIX))
+        self.batch_size = batch_size
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.seed = seed
+        self.max_ships = max_ships
+        self.max_planets = max_planets
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def _iter_match_arrays(self, match_path):
+        # Pliki .octo czytamy fragmentami, bez zamiany na słowniki obserwacji
+        if match_path.suffix == TRAJECTORY_SUFFIX:
+            for chunk in TrajectoryReader(match_path).chunks:
+                labels, construction = actions_to_labels_batch(chunk["ships_actions"], chunk["ships_actions_offsets"],
+                                                               chunk["construction"])
+                features = extract_features_batch(chunk, max_ships=self.max_ships, max_planets=self.max_planets)
+                yield {"features": features, "labels": labels, "construction": construction}
+        else:
+            observations, actions, _ = load_data_from_single_match(match_path)
+            yield compute_training_arrays(observations, actions, max_ships=self.max_ships, max_planets=self.max_planets)
+
+    def _make_batch(self, buffer, rows):
+        return (torch.from_numpy(buffer["features"][rows]),
+                torch.from_numpy(buffer["labels"][rows]),
+                torch.from_numpy(buffer["construction"][rows]))
+
+    def __iter__(self):
+        worker_info = get_worker_info()
+        worker_id, num_workers = (0, 1) if worker_info is None else (worker_info.id, worker_info.num_workers)
+
+        # Kolejność rozgrywek jest wspólna dla wszystkich procesów, każdy bierze swoją część
+        order = np.random.default_rng((self.seed, self.epoch)).permutation(len(self.match_paths))
+        match_paths = [self.match_paths[i] for i in order[worker_id::num_workers]]
+        rng = np.random.default_rng((self.seed, self.epoch, worker_id))
+
+        # Bufor mieszający ma stały rozmiar i jest alokowany raz (w typach i kształtach kolumn pierwszego fragmentu),
+        # size to liczba próbek w buforze - zawsze zajmują one wiersze [0, size)
+        capacity = max(self.shuffle_buffer_size, self.batch_size)
+        buffer, size = None, 0
+        for match_path in match_paths:
+            for arrays in self._iter_match_arrays(match_path):
+                if buffer is None:
+                    buffer = {name: np.empty((capacity,) + values.shape[1:], dtype=values.dtype)
+                              for name, values in arrays.items()}
+
+                n_new, position = len(arrays["features"]), 0
+                while position < n_new:
+                    take = min(capacity - size, n_new - position)
+                    for name in buffer:
+                        buffer[name][size:size + take] = arrays[name][position:position + take]
+                    size += take
+                    position += take
+                    if size < capacity:
+                        break
+
+                    # Z pełnego bufora zabieramy losowe próbki, ich miejsca zajmują kolejne próbki fragmentu,
+                    # a gdy fragment się skończy - próbki z końca bufora
+                    rows = np.sort(rng.choice(capacity, size=self.batch_size, replace=False))
+                    yield self._make_batch(buffer, rows)
+
+                    take = min(len(rows), n_new - position)
+                    for name in buffer:
+                        buffer[name][rows[:take]] = arrays[name][position:position + take]
+                    position += take
+
+                    holes = rows[take:]
+                    size = capacity - len(holes)
+                    tail = np.setdiff1d(np.arange(size, capacity), holes)
+                    for name in buffer:
+                        buffer[name][holes[holes < size]] = buffer[name][tail]
+
+        if buffer is None:
+            return
+        rows = rng.permutation(size)
+        for start in range(0, len(rows), self.batch_size):
+            yield self._make_batch(buffer, rows[start:start + self.batch_size])
+
+
+def compute_training_arrays(observations, actions, max_ships=10, max_planets=8):
+    """
+    Liczy cechy i etykiety próbek w formacie MemmapOctoSpaceDataset.
+    Zwraca słownik: features (N, 55) float32, labels (N, 3) int64, construction (N,) int64.
+    """
+    assert len(observations) == len(actions), "Liczba obserwacji musi być równa liczbie akcji."
+
+    features = extract_features_batch(observations, max_ships=max_ships, max_planets=max_planets)
+    labels = np.zeros((len(actions), 3), dtype=np.int64)
+    construction = np.zeros(len(actions), dtype=np.int64)
+    for i, act in enumerate(actions):
+        labels[i], construction[i] = action_to_labels(act)
+    return {"features": features, "labels": labels, "construction": construction}
+
+
+def save_training_arrays(data_path, arrays):
+    """
+    Zapisuje wynik compute_training_arrays w folderze data_path (pliki .npy czytane przez MemmapOctoSpaceDataset).
+    """
+    data_path = Path(data_path)
+    data_path.mkdir(parents=True, exist_ok=True)
+    for name in MemmapOctoSpaceDataset.FILES:
+        np.save(data_path / f"{name}.npy", arrays[name])
+
+
+def preprocess_matches(base_path, data_path, max_ships=10, max_planets=8):
+    """
+    Wczytuje wszystkie rozgrywki z folderu base_path, liczy cechy i etykiety każdej próbki
+    i zapisuje je w folderze data_path w formacie MemmapOctoSpaceDataset.
+    Zwraca liczbę zapisanych próbek.
+    """
+    observations, actions, rewards = load_data_from_all_matches(base_path)
+    arrays = compute_training_arrays(observations, actions, max_ships=max_ships, max_planets=max_planets)
+    save_training_arrays(data_path, arrays)
+    return len(arrays["features"])
+
+
+def load_shards_manifest(shards_path):
+    """
+    Wczytuje manifest folderu z fragmentami danych treningowych przygotowanymi przez preprocess.py.
+    """
+    with open(Path(shards_path) / SHARDS_MANIFEST_FILE, "r") as f:
+        return json.load(f)
+
+
+class ShardedOctoSpaceDataset(ConcatDataset):
+    """
+    Dataset ze wszystkich fragmentów (jeden na rozgrywkę) wymienionych w manifeście folderu shards_path
+    (patrz preprocess.py). Każdy fragment jest osobnym MemmapOctoSpaceDataset, self.manifest to wczytany manifest.
+    """
+
+    def __init__(self, shards_path):
+        self.shards_path = Path(shards_path)
+        self.manifest = load_shards_manifest(shards_path)
+        super().__init__([MemmapOctoSpaceDataset(self.shards_path / match["shard"])
+                          for match in self.manifest["matches"].values() if match["n_samples"] > 0])
+
+    def get_labels(self):
+        labels, construction = zip(*(shard.get_labels() for shard in self.datasets))
+        return np.concatenate(labels), np.concatenate(construction)
+
+
+def create_sharded_dataset(shards_path):
+    """
+    Dataset ze wszystkich fragmentów danych treningowych z folderu shards_path (patrz ShardedOctoSpaceDataset).
+    """
+    return ShardedOctoSpaceDataset(shards_path)
+
+
 def create_dataloader(base_path, batch_size=4):
     """
     Wczytuje dane z folderu base_path i tworzy DataLoader.
@@ -74,4 +337,26 @@ def create_dataloader(base_path, batch_size=4):
     # reward.json nie jest wykorzystywany w DataLoaderze
     dataset = OctoSpaceDataset(observations, actions)
     dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
-    return dataloader
\ No newline at end of file
+    return dataloader
+
+
+def create_memmap_dataloader(data_path, batch_size=4, num_workers=0):
+    """
+    Tworzy DataLoader z danych przygotowanych przez preprocess_matches (patrz MemmapOctoSpaceDataset).
+    """
+    dataset = MemmapOctoSpaceDataset(data_path)
+    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True, num_workers=num_workers,
+                            pin_memory=torch.cuda.is_available(), persistent_workers=num_workers > 0)
+    return dataloader
+
+
+def create_streaming_dataloader(saves_paths, batch_size=256, shuffle_buffer_size=16384, num_workers=0, seed=0):
+    """
+    Tworzy DataLoader ze StreamingOctoSpaceDataset - pamięć nie zależy od liczby zapisanych rozgrywek.
+    Przed każdą epoką warto wywołać dataloader.dataset.set_epoch(epoch), żeby zmienić kolejność próbek.
+    """
+    dataset = StreamingOctoSpaceDataset(saves_paths, batch_size=batch_size, shuffle_buffer_size=shuffle_buffer_size,
+                                        seed=seed)
+    # Bez persistent_workers - procesy są tworzone co epokę, więc widzą epokę ustawioną przez set_epoch
+    dataloader = DataLoader(dataset, batch_size=None, num_workers=num_workers, pin_memory=torch.cuda.is_available())
+    return dataloader
@@ -57,6 +57,26 @@ class Agent:
             "construction": 0
         }
 
+    def get_actions_batch(self, observations: list) -> list:
+        """
+        Optional function for runners, which play many games at once (e.g. simulate_vector_games). It gets
+        the observations of all the games in a list and returns a list of actions in the format of get_action,
+        so the agent can compute all of them in a single batched forward pass. The same agent plays all the games,
+        so it shouldn't keep any per-game state here. When not implemented, get_action is called for every observation.
+
+        :param observations:
+        :return:
+        """
+        return [self.get_action(obs) for obs in observations]
+
+    def reset(self):
+        """
+        Optional function called before every game. The agent is created and loaded only once and then reused
+        by all games and matches, so use it to clear any state kept from the previous game.
+
+        :return:
+        """
+        pass
 
     def load(self, abs_path: str):
         """
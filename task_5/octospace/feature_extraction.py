@@ -1,3 +1,4 @@
+import numpy as np
 import torch
 
 
@@ -71,3 +72,73 @@ def extract_features(obs, max_ships=10, max_planets=8, device='cpu', board_size=
 
     features = ship_features + [resources_norm] + planet_features
     return torch.tensor(features, dtype=torch.float32, device=device)
+
+
+def _to_columns(observations, max_ships, max_planets):
+    """
+    Zamienia listę obserwacji (dictów) na blok kolumnowy w formacie TrajectoryRecorder: statki i planety wszystkich
+    obserwacji jedna po drugiej z tablicami offsets. Bierzemy tylko pierwsze max_ships statków i max_planets planet.
+    """
+    allied_ships = [ship[:4] for obs in observations for ship in obs.get("allied_ships", [])[:max_ships]]
+    planets = [planet[:3] for obs in observations for planet in obs.get("planets_occupation", [])[:max_planets]]
+    allied_counts = [min(len(obs.get("allied_ships", [])), max_ships) for obs in observations]
+    planet_counts = [min(len(obs.get("planets_occupation", [])), max_planets) for obs in observations]
+    return {
+        "allied_ships": np.array(allied_ships, dtype=np.float64).reshape(-1, 4),
+        "allied_ships_offsets": np.concatenate([[0], np.cumsum(allied_counts)]).astype(np.int64),
+        "planets_occupation": np.array(planets, dtype=np.float64).reshape(-1, 3),
+        "planets_occupation_offsets": np.concatenate([[0], np.cumsum(planet_counts)]).astype(np.int64),
+        "resources": np.array([obs["resources"][0] for obs in observations], dtype=np.float64),
+    }
+
+
+def _gather_rows(values, offsets, max_rows):
+    """
+    Dla każdej obserwacji zwraca jej pierwsze max_rows wierszy z values: (N, max_rows, szerokość) oraz maskę
+    (N, max_rows) istniejących wierszy (wiersze poza maską są zerami).
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.minimum(np.diff(offsets), max_rows)
+    valid = np.arange(max_rows) < counts[:, None]
+    rows = np.zeros((len(counts), max_rows, values.shape[1]), dtype=np.float64)
+    rows[valid] = values[(offsets[:-1, None] + np.arange(max_rows))[valid]]
+    return rows, valid
+
+
+def extract_features_batch(observations, max_ships=10, max_planets=8, board_size=100, max_hp=100, max_resource=1000):
+    """
+    Wektorowa wersja extract_features dla wielu obserwacji naraz - zwraca np.ndarray (N, 55) float32,
+    którego wiersz i jest równy extract_features(observations[i]).
+
+    observations to lista obserwacji (dictów) albo blok kolumnowy, np. fragment pliku TrajectoryReader.chunks,
+    z kolumnami: allied_ships (S, >=4) i allied_ships_offsets (N + 1,), planets_occupation (P, 3)
+    i planets_occupation_offsets (N + 1,) oraz resources (N, >=1).
+    """
+    if isinstance(observations, dict):
+        columns = observations
+    else:
+        columns = _to_columns(observations, max_ships, max_planets)
+
+    ships, ships_valid = _gather_rows(np.asarray(columns["allied_ships"], dtype=np.float64),
+                                      columns["allied_ships_offsets"], max_ships)
+    planets, planets_valid = _gather_rows(np.asarray(columns["planets_occupation"], dtype=np.float64),
+                                          columns["planets_occupation_offsets"], max_planets)
+    resources = np.asarray(columns["resources"], dtype=np.float64)
+    if resources.ndim == 2:
+        resources = resources[:, 0]
+
+    # Statki: [pos_x, pos_y, hp] znormalizowane, brakujące statki to zera
+    ship_features = ships[:, :, 1:4] / np.array([board_size, board_size, max_hp])
+
+    # Planety względem pierwszego statku (zera przy braku statków - wtedy ships[:, 0] jest wyzerowany)
+    ref = ships[:, :1, 1:3]
+    planet_features = np.empty_like(planets)
+    planet_features[:, :, :2] = (planets[:, :, :2] - ref) / board_size
+    occupation = planets[:, :, 2]
+    planet_features[:, :, 2] = np.where(occupation == -1, -1, occupation / 100.0)
+    planet_features[~planets_valid] = [0, 0, -1]
+
+    # Szerokości podane wprost - reshape z -1 nie działa dla N = 0
+    return np.concatenate([ship_features.reshape(len(resources), max_ships * 3),
+                           (resources / max_resource)[:, None],
+                           planet_features.reshape(len(resources), max_planets * 3)], axis=1).astype(np.float32)
@@ -1 +1,3 @@
-from octospace.envs.octospace import OctoSpaceEnv
\ No newline at end of file
+from octospace.envs.octospace import OctoSpaceEnv
+from octospace.envs.vector_octospace import VectorOctoSpaceEnv
+from octospace.envs.subproc_vector_octospace import SubprocVectorOctoSpaceEnv
@@ -0,0 +1,54 @@
+import heapq
+from collections import deque
+from itertools import count
+from typing import Callable, Iterator
+
+from octospace.envs.game_config import MAX_EFFECTS
+
+
+class Effects:
+    """
+    Effects kept for rendering.
+
+    Transient effects (death, firing, capture, space jump) end after a few frames and are kept in a ring buffer,
+    at most MAX_EFFECTS of them (the oldest ones are dropped first). Healing effects last as long as the ship stays
+    on its player's tiles, so they are kept apart, keyed by (player, ship_id): they are never dropped and starting
+    or stopping one doesn't scan the other effects.
+
+    Every effect is tagged with the order of creation and iterating yields all of them in that order.
+    """
+
+    def __init__(self, maxlen: int = MAX_EFFECTS):
+        # (order, effect) pairs
+        self.transient = deque(maxlen=maxlen)
+        # (player, ship_id) -> (order, effect), in the order of creation
+        self.healing = {}
+        self._order = count()
+
+    def __len__(self):
+        return len(self.transient) + len(self.healing)
+
+    def __iter__(self) -> Iterator[list]:
+        for _, effect in heapq.merge(self.transient, self.healing.values(), key=lambda entry: entry[0]):
+            yield effect
+
+    def append(self, effect: list):
+        """
+        Adds a transient effect
+        """
+        self.transient.append((next(self._order), effect))
+
+    def start_healing(self, player: int, ship_id: int):
+        if (player, ship_id) not in self.healing:
+            self.healing[(player, ship_id)] = (next(self._order), [1, player, ship_id, 0])
+
+    def stop_healing(self, player: int, ship_id: int):
+        self.healing.pop((player, ship_id), None)
+
+    def remove_expired(self, is_expired: Callable[[list], bool]):
+        """
+        Drops the transient effects, for which is_expired returns True
+        """
+        kept = [entry for entry in self.transient if not is_expired(entry[1])]
+        self.transient.clear()
+        self.transient.extend(kept)
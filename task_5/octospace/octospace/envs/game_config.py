@@ -1,6 +1,11 @@
+import os
+
 import numpy as np
 VERSION = '1.0.1'
 
+# Images and sounds, resolved relative to the package, so the env works from any working directory
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'assets')
+
 # You may change this, to adjust the window into your screen
 WINDOW_SIZE = 800
 
@@ -23,6 +28,7 @@ MOVE_COOLDOWN = 3
 ASTEROID_DAMAGE = 3
 VISION_RANGE = 5
 PLANET_VISION_RANGE = 9
+SPATIAL_GRID_CELL_SIZE = MAX_SHIP_FIRE_RANGE + 1      # size of the buckets (in tiles) for the ships' spatial index
 
 # Map generation settings
 BOARD_SIZE = 100
@@ -38,6 +44,10 @@ PLAYER_1_ORIGIN = np.array([PLAYER_1_LOCATION, PLAYER_1_LOCATION], dtype=int)
 PLAYER_2_ORIGIN = np.array([PLAYER_2_LOCATION, PLAYER_2_LOCATION], dtype=int)
 
 # Rendering settings
+MAX_EFFECTS = 2048                      # transient effects kept for rendering, the oldest ones are dropped first
+N_LAND_SPRITES = 13
+N_ASTEROID_SPRITES = 12
+N_IONIZED_FIELD_FRAMES = 12
 BORDER_WIDTH = 75
 GUI_SIZE = 110
 TILE_SIZE = WINDOW_SIZE // BOARD_SIZE
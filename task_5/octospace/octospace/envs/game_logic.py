@@ -1,228 +1,169 @@
+from typing import Optional
+
 import numpy as np
 
 from octospace.envs.game_config import (MAX_SHIP_FIRE_RANGE, SHIP_DAMAGE, BASE_SHIP_SPEED,
                          IONIZED_FIELD_SPEED_FACTOR, BOARD_SIZE, MOVEMENT_DIRECTIONS, SHIP_COST, PLAYER_1_ORIGIN, \
-    PLAYER_2_ORIGIN, OCCUPATION_SPEED, SHIP_HEALING_SPEED, SHIP_OCCUPATION_RANGE, FIRING_COOLDOWN, MOVE_COOLDOWN,
+    PLAYER_2_ORIGIN, OCCUPATION_SPEED, SHIP_HEALING_SPEED, FIRING_COOLDOWN, MOVE_COOLDOWN,
                          ASTEROID_DAMAGE, VISION_RANGE, VISION_ADD_MASK)
+from octospace.envs.effects import Effects
 from octospace.envs.schemes import PLANET_MASK
+from octospace.envs.ship_table import ShipTable
 from octospace.envs.sound import play_space_jump_sound, play_capture_sound, play_ship_explosion_sound, play_shoot_sound
 
 
-player_1_ships_next_id = 1
-player_2_ships_next_id = 1
+# Ships fire within 15 degrees of their facing direction
+FIRING_CONE_COS_SQ = np.cos(np.pi / 12) ** 2
 
 
 def _ship_firing(
     actions: dict,
-    player_1_ships: dict,
-    player_2_ships: dict,
-    player_1_ships_facing: dict,
-    player_2_ships_facing: dict,
-    effects: list,
+    ships: ShipTable,
+    effects: Optional[Effects],
     turn_on_music: bool,
     volume: float
 ):
-    for command in actions["player_1"]["ships_actions"]:
-        if command[1] == 1:
-            ship_id, act, direction = command
-
-            # If there is not such ship or the ship has an active firing cooldown
-            if ship_id not in player_1_ships.keys() or player_1_ships[ship_id][4] > 0:
-                continue
-
-            # Play shoot sound
-            if turn_on_music:
-                play_shoot_sound(volume=volume)
-
-            target_id = _get_target(
-                ship_x=player_1_ships[ship_id][0],
-                ship_y=player_1_ships[ship_id][1],
-                direction=direction,
-                player=0,
-                player_1_ships=player_1_ships,
-                player_2_ships=player_2_ships
-            )
-
-            effects.append([2, player_1_ships[ship_id][0], player_1_ships[ship_id][1], player_1_ships_facing[ship_id], 0])
-            player_1_ships[ship_id][3] = FIRING_COOLDOWN    # Set firing cooldown for this ship
-
-            if target_id == -1:
-                continue
-            player_2_ships[target_id][2] -= SHIP_DAMAGE  # Damage the enemy ship
-            player_1_ships_facing[ship_id] = direction
-
-    for command in actions["player_2"]["ships_actions"]:
-        if command[1] == 1:
-            ship_id, act, direction = command
-
-            # If there is not such ship or the ship has an active firing cooldown
-            if ship_id not in player_2_ships.keys() or player_2_ships[ship_id][4] > 0:
-                continue
-
-            # Play shoot sound
-            if turn_on_music:
-                play_shoot_sound(volume=volume)
-
-            target_id = _get_target(
-                ship_x=player_2_ships[ship_id][0],
-                ship_y=player_2_ships[ship_id][1],
-                direction=direction,
-                player=1,
-                player_1_ships=player_1_ships,
-                player_2_ships=player_2_ships
-            )
-
-            effects.append([2, player_2_ships[ship_id][0], player_2_ships[ship_id][1], player_2_ships_facing[ship_id], 0])
-            player_2_ships[ship_id][3] = FIRING_COOLDOWN
-
-            if target_id == -1:
-                continue
-            player_1_ships[target_id][2] -= SHIP_DAMAGE
-            player_2_ships_facing[ship_id] = direction
+    rows, directions, _ = _parse_ships_commands(actions=actions, ships=ships, action_type=1)
+
+    # If there is not such ship or the ship has an active cooldown, skip the command
+    valid = rows != -1
+    valid[valid] = ships.move_cooldown[rows[valid]] == 0
+    rows, directions = rows[valid], directions[valid]
+
+    # Play shoot sounds and add firing effects (no effects are kept in the headless mode)
+    for row in rows:
+        if turn_on_music:
+            play_shoot_sound(volume=volume)
+        if effects is not None:
+            effects.append([2, int(ships.x[row]), int(ships.y[row]), int(ships.facing[row]), 0])
+
+    # Set firing cooldown for the ships
+    ships.firing_cooldown[rows] = FIRING_COOLDOWN
+
+    # Ships don't move during firing, so all shots are resolved at once.
+    # The targets are looked up only in the grid cells around the shooting ships
+    shot_index, enemy_rows = ships.grid.get_neighbour_pairs(env=ships.env[rows], owner=1 - ships.owner[rows],
+                                                            x=ships.x[rows], y=ships.y[rows], reach=MAX_SHIP_FIRE_RANGE)
+    targets = _select_targets(
+        ships_x=ships.x[rows],
+        ships_y=ships.y[rows],
+        directions=directions,
+        shot_index=shot_index,
+        target_index=enemy_rows,
+        target_x=ships.x[enemy_rows],
+        target_y=ships.y[enemy_rows]
+    )
+    hit = targets != -1
+
+    # Damage the enemy ships, a ship can be hit by many shots in one turn
+    np.subtract.at(ships.hp, targets[hit], SHIP_DAMAGE)
+    ships.facing[rows[hit]] = directions[hit]
 
 
 def _handle_ship_death(
-    player_1_ships: dict,
-    player_2_ships: dict,
-    player_1_ships_facing: dict,
-    player_2_ships_facing: dict,
-    effects: list,
+    ships: ShipTable,
+    effects: Optional[Effects],
     turn_on_music: bool,
     volume: float
 ):
-    for ship_id in list(player_1_ships.keys()):
-        # If the damaged ship's health points are below 0, then remove it from the board
-        if player_1_ships[ship_id][2] <= 0:
-            _delete_ship(player_1_ships=player_1_ships, player_2_ships=player_2_ships, player_1_ships_facing=player_1_ships_facing,
-                         player_2_ships_facing=player_2_ships_facing, player=0, ship_id=ship_id, turn_on_music=turn_on_music,
-                         volume=volume, effects=effects)
-
-    for ship_id in list(player_2_ships.keys()):
-        # If the damaged ship's health points are below 0, then remove it from the board
-        if player_2_ships[ship_id][2] <= 0:
-            _delete_ship(player_1_ships=player_1_ships, player_2_ships=player_2_ships,
-                         player_1_ships_facing=player_1_ships_facing,
-                         player_2_ships_facing=player_2_ships_facing, player=1, ship_id=ship_id,
-                         turn_on_music=turn_on_music,
-                         volume=volume, effects=effects)
+    # If the damaged ship's health points are below 0, then remove it from the board
+    rows = ships.alive_rows()
+    _delete_ships(ships=ships, rows=rows[ships.hp[rows] <= 0], turn_on_music=turn_on_music, volume=volume,
+                  effects=effects)
 
 
 def _ship_movement(
     game_map: np.ndarray,
     actions: dict,
-    player_1_ships: dict,
-    player_2_ships: dict,
-    player_1_ships_facing: dict,
-    player_2_ships_facing: dict,
-    effects: list,
+    ships: ShipTable,
+    effects: Optional[Effects],
+    turn_on_music: bool,
+    volume: float
+):
+    rows, directions, velocities = _parse_ships_commands(actions=actions, ships=ships, action_type=0)
+    valid = rows != -1
+    rows, directions, velocities = rows[valid], directions[valid], velocities[valid]
+
+    # Commands given to the same ship are executed one after another,
+    # so the n-th command of every ship is handled in the n-th pass
+    command_rank = _get_command_rank(rows)
+    for rank in range(command_rank.max() + 1 if len(rows) > 0 else 0):
+        selected = command_rank == rank
+        _move_ships(game_map=game_map, ships=ships, rows=rows[selected], directions=directions[selected],
+                    velocities=velocities[selected], effects=effects, turn_on_music=turn_on_music, volume=volume)
+
+
+def _move_ships(
+    game_map: np.ndarray,
+    ships: ShipTable,
+    rows: np.ndarray,
+    directions: np.ndarray,
+    velocities: np.ndarray,
+    effects: Optional[Effects],
     turn_on_music: bool,
     volume: float
 ):
-    for command in actions["player_1"]["ships_actions"]:
-        if command[1] == 0:
-            ship_id, act, direction, velocity = command
-            if ship_id not in player_1_ships.keys() or player_1_ships[ship_id][4] > 0:
-                continue
-            ship_x, ship_y = player_1_ships[ship_id][0], player_1_ships[ship_id][1]
-
-            # Calculate max distance the ship can travel
-            max_movement = BASE_SHIP_SPEED
-            if game_map[ship_y, ship_x] == 4:
-                max_movement = int(max_movement * IONIZED_FIELD_SPEED_FACTOR)
-                if velocity == max_movement:
-                    effects.append([4, ship_x, ship_y, 0])
-                    if turn_on_music:
-                        play_space_jump_sound(volume=volume)
-
-            # If it's too far, then clip it to the maximum speed for the ship
-            velocity = np.clip(velocity, 0, max_movement)
-            movement_vec = MOVEMENT_DIRECTIONS[direction] * velocity
-
-            # Move the ship in that direction
-            player_1_ships[ship_id][0] = np.clip(player_1_ships[ship_id][0] + movement_vec[0], 0, BOARD_SIZE - 1)
-            player_1_ships[ship_id][1] = np.clip(player_1_ships[ship_id][1] + movement_vec[1], 0, BOARD_SIZE - 1)
-
-            # Update ship's direction
-            player_1_ships_facing[ship_id] = direction
-
-            # If the ship stumbled upon asteroid field, add a move cooldown
-            if game_map[player_1_ships[ship_id][1], player_1_ships[ship_id][0]] == 2:
-                player_1_ships[ship_id][4] = MOVE_COOLDOWN
-                player_1_ships[ship_id][2] -= ASTEROID_DAMAGE
-
-            # If the ship entered one of player's tiles, start the healing effect
-            if game_map[player_1_ships[ship_id][1], player_1_ships[ship_id][0]] & 64 == 64 and game_map[ship_y, ship_x] & 64 != 64:
-                effects.append([1, 0, ship_id, 0])
-
-            # If the ship left player's tile, stop the healing effect
-            if game_map[player_1_ships[ship_id][1], player_1_ships[ship_id][0]] & 64 != 64 and game_map[ship_y, ship_x] & 64 == 64:
-                _delete_healing_effect(0, ship_id, effects)
-
-    for command in actions["player_2"]["ships_actions"]:
-        if command[1] == 0:
-            ship_id, act, direction, velocity = command
-            if ship_id not in player_2_ships.keys() or player_2_ships[ship_id][4] > 0:
-                continue
-            ship_x, ship_y = player_2_ships[ship_id][0], player_2_ships[ship_id][1]
-
-            # Calculate max distance the ship can travel
-            max_movement = BASE_SHIP_SPEED
-            if game_map[ship_y, ship_x] == 4:
-                max_movement = int(max_movement * IONIZED_FIELD_SPEED_FACTOR)
-                if velocity == max_movement:
-                    effects.append([4, ship_x, ship_y, 0])
-                    if turn_on_music:
-                        play_space_jump_sound(volume=volume)
-
-            # If it's too far, then don't do anything
-            velocity = np.clip(velocity, 0, max_movement)
-            movement_vec = MOVEMENT_DIRECTIONS[direction] * velocity
-
-            # Move the ship in that direction
-            player_2_ships[ship_id][0] = np.clip(player_2_ships[ship_id][0] + movement_vec[0], 0, BOARD_SIZE - 1)
-            player_2_ships[ship_id][1] = np.clip(player_2_ships[ship_id][1] + movement_vec[1], 0, BOARD_SIZE - 1)
-
-            # Update ship's direction
-            player_2_ships_facing[ship_id] = direction
-
-            # If the ship stumbled upon asteroid field, add a move cooldown
-            if game_map[player_2_ships[ship_id][1], player_2_ships[ship_id][0]] == 2:
-                player_2_ships[ship_id][4] = MOVE_COOLDOWN
-                player_2_ships[ship_id][2] -= ASTEROID_DAMAGE
-
-            # If the ship entered one of player's tiles, start the healing effect
-            if game_map[player_2_ships[ship_id][1], player_2_ships[ship_id][0]] & 128 == 128 and game_map[ship_y, ship_x] & 128 != 128:
-                effects.append([1, 1, ship_id, 0])
-
-            # If the ship left player's tile, stop the healing effect
-            if game_map[player_2_ships[ship_id][1], player_2_ships[ship_id][0]] & 128 != 128 and game_map[ship_y, ship_x] & 128 == 128:
-                _delete_healing_effect(1, ship_id, effects)
+    # Ships with an active move cooldown can't move
+    can_move = ships.move_cooldown[rows] == 0
+    rows, directions, velocities = rows[can_move], directions[can_move], velocities[can_move]
+    ship_x, ship_y = ships.x[rows].astype(int), ships.y[rows].astype(int)
+
+    # Calculate max distance the ship can travel
+    on_ionized_field = game_map[ship_y, ship_x] == 4
+    max_movement = np.where(on_ionized_field, int(BASE_SHIP_SPEED * IONIZED_FIELD_SPEED_FACTOR), BASE_SHIP_SPEED)
+    for jump_x, jump_y in zip(ship_x[on_ionized_field & (velocities == max_movement)],
+                              ship_y[on_ionized_field & (velocities == max_movement)]):
+        if effects is not None:
+            effects.append([4, int(jump_x), int(jump_y), 0])
+        if turn_on_music:
+            play_space_jump_sound(volume=volume)
+
+    # If it's too far, then clip it to the maximum speed for the ship
+    velocities = np.clip(velocities, 0, max_movement)
+    movement_vec = MOVEMENT_DIRECTIONS[directions] * velocities[:, None]
+
+    # Move the ships in that direction
+    new_x = np.clip(ship_x + movement_vec[:, 0], 0, BOARD_SIZE - 1)
+    new_y = np.clip(ship_y + movement_vec[:, 1], 0, BOARD_SIZE - 1)
+    ships.move(rows, new_x, new_y)
+
+    # Update ships' direction
+    ships.facing[rows] = directions
+
+    # If the ship stumbled upon asteroid field, add a move cooldown
+    on_asteroids = rows[game_map[new_y, new_x] == 2]
+    ships.move_cooldown[on_asteroids] = MOVE_COOLDOWN
+    ships.hp[on_asteroids] -= ASTEROID_DAMAGE
+
+    # If the ship entered one of player's tiles, start the healing effect.
+    # If the ship left player's tile, stop the healing effect
+    # Healing effects are needed only for rendering
+    if effects is None:
+        return
+    owner_bit = np.where(ships.owner[rows] == 0, 64, 128)
+    was_on_own_tile = game_map[ship_y, ship_x] & owner_bit == owner_bit
+    is_on_own_tile = game_map[new_y, new_x] & owner_bit == owner_bit
+    for row in rows[is_on_own_tile & ~was_on_own_tile]:
+        effects.start_healing(int(ships.owner[row]), int(ships.ids[row]))
+    for row in rows[~is_on_own_tile & was_on_own_tile]:
+        effects.stop_healing(int(ships.owner[row]), int(ships.ids[row]))
 
 
 def _ship_construction(
     actions: dict,
-    player_1_ships: dict,
-    player_2_ships: dict,
-    player_1_ships_facing: dict,
-    player_2_ships_facing: dict,
+    ships: ShipTable,
     player_1_resources: np.ndarray,
     player_2_resources: np.ndarray,
 ):
-    if actions["player_1"]["construction"] > 0:
-        for i in range(actions["player_1"]["construction"]):
-            if np.all([player_1_resources[i] >= SHIP_COST[i] for i in range(4)]):
-                new_ship_id = _get_player_next_id(0)
-                player_1_ships[new_ship_id] = [PLAYER_1_ORIGIN[0], PLAYER_1_ORIGIN[1], 100, 0, 0]
-                player_1_ships_facing[new_ship_id] = 0
-                player_1_resources -= SHIP_COST
-
-    if actions["player_2"]["construction"] > 0:
-        for i in range(actions["player_2"]["construction"]):
-            if np.all([player_2_resources[i] >= SHIP_COST[i] for i in range(4)]):
-                new_ship_id = _get_player_next_id(1)
-                player_2_ships[new_ship_id] = [PLAYER_2_ORIGIN[0], PLAYER_2_ORIGIN[1], 100, 0, 0]
-                player_2_ships_facing[new_ship_id] = 0
-                player_2_resources -= SHIP_COST
+    for player, (player_key, resources, origin) in enumerate(zip(["player_1", "player_2"],
+                                                                 [player_1_resources, player_2_resources],
+                                                                 [PLAYER_1_ORIGIN, PLAYER_2_ORIGIN])):
+        if actions[player_key]["construction"] > 0:
+            # Build as many of the requested ships as the resources allow
+            n_ships = min(int(actions[player_key]["construction"]), int(np.min(resources // SHIP_COST)))
+            if n_ships > 0:
+                ships.add(owner=player, x=origin[0], y=origin[1], facing=0, n=n_ships)
+                resources -= SHIP_COST * n_ships
 
 
 def _occupation_progress(
@@ -248,7 +189,7 @@ def _change_ownership_of_planets(
     player_2_occupied_rf: np.ndarray,
     player_1_visibility_mask: np.ndarray,
     player_2_visibility_mask: np.ndarray,
-    effects: list,
+    effects: Optional[Effects],
     turn_on_music: bool,
     volume: float
 ):
@@ -279,7 +220,8 @@ def _change_ownership_of_planets(
             game_map[map_mask.astype(bool)] |= 64
 
             # Add capture effect
-            effects.append([3, center[1], center[0], 0])
+            if effects is not None:
+                effects.append([3, center[1], center[0], 0])
             if turn_on_music:
                 play_capture_sound(volume=volume)
 
@@ -308,7 +250,8 @@ def _change_ownership_of_planets(
             game_map[map_mask.astype(bool)] |= 128
 
             # Add capture effect
-            effects.append([3, center[1], center[0], 0])
+            if effects is not None:
+                effects.append([3, center[1], center[0], 0])
             if turn_on_music:
                 play_capture_sound(volume=volume)
 
@@ -317,125 +260,65 @@ def _change_ownership_of_planets(
 
 def _ship_land_interaction(
     game_map: np.ndarray,
-    planets_centers: np.ndarray,
+    planets_raster: np.ndarray,
     planets_occupation_progress: np.ndarray,
     planets_ongoing_occupation: np.ndarray,
-    player_1_ships: dict,
-    player_2_ships: dict,
-    player_1_ships_facing: dict,
-    player_2_ships_facing: dict,
-    effects: list
+    ships: ShipTable,
+    effects: Optional[Effects]
 ):
-    ship_ids_to_delete_1 = []
-    for ship_id, (ship_x, ship_y, hp, firing_cooldown, move_cooldown) in player_1_ships.items():
-        if game_map[ship_y, ship_x] & 64 == 64 and hp != 100:
-            player_1_ships[ship_id][2] = np.clip(player_1_ships[ship_id][2] + SHIP_HEALING_SPEED, 1, 100)
-
-        planet_id = _get_planet_id_by_ship_position(ship_x, ship_y, planets_centers=planets_centers)
-        if planet_id != -1:
+    # 1st player pushes the occupation progress towards 0, 2nd player towards 100
+    for player, owner_bit, own_progress, enemy_progress, sign in [(0, 64, 0, 100, -1), (1, 128, 100, 0, 1)]:
+        rows = ships.alive_rows(player)
+        ship_x, ship_y, hp = ships.x[rows], ships.y[rows], ships.hp[rows]
+
+        healed = (game_map[ship_y, ship_x] & owner_bit == owner_bit) & (hp != 100)
+        ships.hp[rows[healed]] = np.clip(hp[healed] + SHIP_HEALING_SPEED, 1, 100)
+
+        # The planets' state changes with every landing ship, so the ships on the planets are handled in order
+        planet_ids = planets_raster[ship_y, ship_x]
+        ship_rows_to_delete = []
+        for row, planet_id in zip(rows[planet_ids != -1], planet_ids[planet_ids != -1]):
             # If there is an ongoing fight for this planet
             if planets_ongoing_occupation[planet_id] != 0 or planets_occupation_progress[planet_id] not in [-1, 0, 100]:
-                planets_ongoing_occupation[planet_id] -= 1
-                ship_ids_to_delete_1.append(ship_id)
+                planets_ongoing_occupation[planet_id] += sign
+                ship_rows_to_delete.append(row)
 
             # If planet is unoccupied
             elif planets_occupation_progress[planet_id] == -1:
-                planets_occupation_progress[planet_id] = 0
-                ship_ids_to_delete_1.append(ship_id)
+                planets_occupation_progress[planet_id] = own_progress
+                ship_rows_to_delete.append(row)
 
             # If the planet belongs to the other player
-            elif planets_occupation_progress[planet_id] == 100:
-                planets_occupation_progress[planet_id] = 100 - OCCUPATION_SPEED
-                planets_ongoing_occupation[planet_id] -= 1
-                ship_ids_to_delete_1.append(ship_id)
-
-    # Delete the ship afterward
-    for ship_id in ship_ids_to_delete_1:
-        _delete_ship(player_1_ships=player_1_ships, player_2_ships=player_2_ships,
-                     player_1_ships_facing=player_1_ships_facing,
-                     player_2_ships_facing=player_2_ships_facing, player=0, ship_id=ship_id,
-                     turn_on_music=False,
-                     volume=0.0, effects=effects, death_effect=False)
-
-    ship_ids_to_delete_2 = []
-    for ship_id, (ship_x, ship_y, hp, firing_cooldown, move_cooldown) in player_2_ships.items():
-        if game_map[ship_y, ship_x] & 128 == 128 and hp != 100:
-            player_2_ships[ship_id][2] = np.clip(player_2_ships[ship_id][2] + SHIP_HEALING_SPEED, 1, 100)
-
-        planet_id = _get_planet_id_by_ship_position(ship_x, ship_y, planets_centers=planets_centers)
-        if planet_id != -1:
-            # If there is an ongoing fight for this planet
-            if planets_ongoing_occupation[planet_id] != 0 or planets_occupation_progress[planet_id] not in [-1, 0, 100]:
-                planets_ongoing_occupation[planet_id] += 1
-                ship_ids_to_delete_2.append(ship_id)
+            elif planets_occupation_progress[planet_id] == enemy_progress:
+                planets_occupation_progress[planet_id] = enemy_progress + sign * OCCUPATION_SPEED
+                planets_ongoing_occupation[planet_id] += sign
+                ship_rows_to_delete.append(row)
 
-            # If planet is unoccupied
-            elif planets_occupation_progress[planet_id] == -1:
-                planets_occupation_progress[planet_id] = 100
-                ship_ids_to_delete_2.append(ship_id)
-
-            # If the planet belongs to the other player
-            elif planets_occupation_progress[planet_id] == 0:
-                planets_occupation_progress[planet_id] = OCCUPATION_SPEED
-                planets_ongoing_occupation[planet_id] += 1
-                ship_ids_to_delete_2.append(ship_id)
-
-    # Delete the ship afterward
-    for ship_id in ship_ids_to_delete_2:
-        _delete_ship(player_1_ships=player_1_ships, player_2_ships=player_2_ships,
-                     player_1_ships_facing=player_1_ships_facing,
-                     player_2_ships_facing=player_2_ships_facing, player=1, ship_id=ship_id,
-                     turn_on_music=False,
-                     volume=0.0, effects=effects, death_effect=False)
+        # Delete the ships afterward
+        _delete_ships(ships=ships, rows=np.array(ship_rows_to_delete, dtype=int), turn_on_music=False, volume=0.0,
+                      effects=effects, death_effect=False)
 
 
 def _decrease_cooldowns(
-    player_1_ships: dict,
-    player_2_ships: dict,
+    ships: ShipTable
 ):
-    for key in player_1_ships.keys():
-        player_1_ships[key][3] = max(player_1_ships[key][3] - 1, 0)
-        player_1_ships[key][4] = max(player_1_ships[key][4] - 1, 0)
-
-    for key in player_2_ships.keys():
-        player_2_ships[key][3] = max(player_2_ships[key][3] - 1, 0)
-        player_2_ships[key][4] = max(player_2_ships[key][4] - 1, 0)
+    np.maximum(ships.firing_cooldown[:ships.size] - 1, 0, out=ships.firing_cooldown[:ships.size])
+    np.maximum(ships.move_cooldown[:ships.size] - 1, 0, out=ships.move_cooldown[:ships.size])
 
 
 def _handle_visibility(
-    player_1_ships: dict,
-    player_2_ships: dict,
+    ships: ShipTable,
     player_1_visibility_mask: np.ndarray,
     player_2_visibility_mask: np.ndarray
 ):
-    for ship_id in player_1_ships.keys():
-        ship_x, ship_y = player_1_ships[ship_id][0], player_1_ships[ship_id][1]
-        start_x = max(ship_x - VISION_RANGE, 0)
-        end_x = min(ship_x + VISION_RANGE + 1, BOARD_SIZE)
-        start_y = max(ship_y - VISION_RANGE, 0)
-        end_y = min(ship_y + VISION_RANGE + 1, BOARD_SIZE)
-
-        vision_add_start_x = start_x - ship_x + VISION_RANGE
-        vision_add_end_x = end_x - ship_x + VISION_RANGE
-        vision_add_start_y = start_y - ship_y + VISION_RANGE
-        vision_add_end_y = end_y - ship_y + VISION_RANGE
-
-        player_1_visibility_mask[start_x:end_x, start_y:end_y] = player_1_visibility_mask[start_x:end_x, start_y:end_y] | VISION_ADD_MASK[vision_add_start_x:vision_add_end_x, vision_add_start_y:vision_add_end_y]
-
-    for ship_id in player_2_ships.keys():
-        ship_x, ship_y = player_2_ships[ship_id][0], player_2_ships[ship_id][1]
-        start_x = max(ship_x - VISION_RANGE, 0)
-        end_x = min(ship_x + VISION_RANGE + 1, BOARD_SIZE)
-        start_y = max(ship_y - VISION_RANGE, 0)
-        end_y = min(ship_y + VISION_RANGE + 1, BOARD_SIZE)
-
-        vision_add_start_x = start_x - ship_x + VISION_RANGE
-        vision_add_end_x = end_x - ship_x + VISION_RANGE
-        vision_add_start_y = start_y - ship_y + VISION_RANGE
-        vision_add_end_y = end_y - ship_y + VISION_RANGE
-
-        player_2_visibility_mask[start_x:end_x, start_y:end_y] = player_2_visibility_mask[start_x:end_x, start_y:end_y] | VISION_ADD_MASK[vision_add_start_x:vision_add_end_x,
-                                                                  vision_add_start_y:vision_add_end_y]
+    for player, visibility_mask in enumerate([player_1_visibility_mask, player_2_visibility_mask]):
+        # Vision is only ever added, so only the ships which moved since the last turn can reveal new tiles
+        rows = ships.pop_moved_rows(player)
+
+        # Ships standing on the same tile add the same vision
+        positions = np.unique(np.stack([ships.x[rows], ships.y[rows]], axis=1), axis=0)
+        for ship_x, ship_y in positions:
+            _add_visibility(int(ship_x), int(ship_y), visibility_mask)
 
 
 def _check_victory_conditions(
@@ -455,15 +338,23 @@ def _add_planet_visibility(
     planet_y: int,
     visibility_mask: np.ndarray
 ):
-    start_x = max(planet_x - VISION_RANGE, 0)
-    end_x = min(planet_x + VISION_RANGE + 1, BOARD_SIZE)
-    start_y = max(planet_y - VISION_RANGE, 0)
-    end_y = min(planet_y + VISION_RANGE + 1, BOARD_SIZE)
+    _add_visibility(planet_x, planet_y, visibility_mask)
+
 
-    vision_add_start_x = start_x - planet_x + VISION_RANGE
-    vision_add_end_x = end_x - planet_x + VISION_RANGE
-    vision_add_start_y = start_y - planet_y + VISION_RANGE
-    vision_add_end_y = end_y - planet_y + VISION_RANGE
+def _add_visibility(
+    pos_x: int,
+    pos_y: int,
+    visibility_mask: np.ndarray
+):
+    start_x = max(pos_x - VISION_RANGE, 0)
+    end_x = min(pos_x + VISION_RANGE + 1, BOARD_SIZE)
+    start_y = max(pos_y - VISION_RANGE, 0)
+    end_y = min(pos_y + VISION_RANGE + 1, BOARD_SIZE)
+
+    vision_add_start_x = start_x - pos_x + VISION_RANGE
+    vision_add_end_x = end_x - pos_x + VISION_RANGE
+    vision_add_start_y = start_y - pos_y + VISION_RANGE
+    vision_add_end_y = end_y - pos_y + VISION_RANGE
 
     visibility_mask[start_x:end_x, start_y:end_y] = visibility_mask[start_x:end_x, start_y:end_y] | VISION_ADD_MASK[vision_add_start_x:vision_add_end_x,
                                                                   vision_add_start_y:vision_add_end_y]
@@ -473,95 +364,144 @@ def _get_target(
     ship_x: int,
     ship_y: int,
     direction: int,
-    player: int,
-    player_1_ships: dict,
-    player_2_ships: dict
+    enemy_x: np.ndarray,
+    enemy_y: np.ndarray
 ):
     """
-    Returns id of the first ship, that player's ship is facing, if it is in firing range
-    """
-    if player == 0:
-        enemy_ships = player_2_ships
-    else:
-        enemy_ships = player_1_ships
+    Returns index (into enemy_x, enemy_y) of the first ship, that player's ship is facing, if it is in firing range
 
-    if len(enemy_ships.keys()) == 0:
+    Reference implementation for a single shot, the game resolves all shots at once with _select_targets
+    (check_targets.py compares them)
+    """
+    if len(enemy_x) == 0:
         return -1
 
     ship_vec = np.array([ship_x, ship_y], dtype=int)
     target_vec = np.array([ship_x, ship_y], dtype=int) + MOVEMENT_DIRECTIONS[direction] * MAX_SHIP_FIRE_RANGE
     target_vec -= ship_vec
-    vec_to_other_ships = np.array([(x, y) for ship_id, (x, y, hp, firing_cooldown, move_cooldown) in enemy_ships.items()], dtype=int)
+    vec_to_other_ships = np.stack([enemy_x, enemy_y], axis=1).astype(int)
     vec_to_other_ships = vec_to_other_ships - ship_vec
     vec_angles = [np.arccos(np.clip(np.dot(vec/np.linalg.norm(vec), target_vec/np.linalg.norm(target_vec)), -1.0, 1.0)) if np.linalg.norm(vec) != 0 else 0 for vec in vec_to_other_ships]
 
-    target_id = -1
+    target = -1
     min_dist = MAX_SHIP_FIRE_RANGE + 1
-    for i in range(len(enemy_ships.keys())):
+    for i in range(len(enemy_x)):
 
         # Get all ships between -15 and 15 degrees
         if -np.pi/12 <= vec_angles[i] <= np.pi/12 and min_dist > np.linalg.norm(vec_to_other_ships[i]):
-            target_id = list(enemy_ships.keys())[i]
+            target = i
             min_dist = np.linalg.norm(vec_to_other_ships[i])
-    return target_id
+    return target
+
+
+def _get_targets(
+    ships_x: np.ndarray,
+    ships_y: np.ndarray,
+    directions: np.ndarray,
+    enemy_x: np.ndarray,
+    enemy_y: np.ndarray
+):
+    """
+    Returns for every shot index (into enemy_x, enemy_y) of the closest enemy ship within 15 degrees of the firing
+    direction, if it is in firing range, otherwise -1. Out of equally distant ships the first one is chosen,
+    the same as in _get_target.
+    """
+    shot_index = np.repeat(np.arange(len(ships_x)), len(enemy_x))
+    enemy_index = np.tile(np.arange(len(enemy_x)), len(ships_x))
+    return _select_targets(ships_x=ships_x, ships_y=ships_y, directions=directions, shot_index=shot_index,
+                           target_index=enemy_index, target_x=enemy_x[enemy_index], target_y=enemy_y[enemy_index])
+
+
+def _select_targets(
+    ships_x: np.ndarray,
+    ships_y: np.ndarray,
+    directions: np.ndarray,
+    shot_index: np.ndarray,
+    target_index: np.ndarray,
+    target_x: np.ndarray,
+    target_y: np.ndarray
+):
+    """
+    Resolves the shots over (shot, possible target) pairs. For every shot returns target_index of the closest target
+    within 15 degrees of the firing direction, if it is in firing range, otherwise -1.
+    Out of equally distant targets the one with the lowest target_index is chosen.
+    """
+    targets = np.full(len(ships_x), -1, dtype=int)
+
+    # Vectors from the shooting ship to the possible target
+    vec_x = target_x.astype(int) - ships_x.astype(int)[shot_index]
+    vec_y = target_y.astype(int) - ships_y.astype(int)[shot_index]
+    dist_sq = vec_x ** 2 + vec_y ** 2
+
+    # The angle to the firing direction is at most 15 degrees when cos(angle) >= cos(15 deg), and as the
+    # directions are unit vectors, cos(angle) = projection / dist, so we can compare the squares instead
+    direction_vec = MOVEMENT_DIRECTIONS[directions].astype(int)[shot_index]
+    projection = vec_x * direction_vec[:, 0] + vec_y * direction_vec[:, 1]
+    in_cone = (dist_sq == 0) | ((projection > 0) & (projection ** 2 >= FIRING_CONE_COS_SQ * dist_sq))
+    in_range = dist_sq < (MAX_SHIP_FIRE_RANGE + 1) ** 2
+    shot_index, target_index, dist_sq = shot_index[in_cone & in_range], target_index[in_cone & in_range], dist_sq[in_cone & in_range]
+
+    # For every shot take the first pair, after sorting by distance and target_index
+    order = np.lexsort((target_index, dist_sq, shot_index))
+    shot_index, target_index = shot_index[order], target_index[order]
+    first = np.r_[True, shot_index[1:] != shot_index[:-1]] if len(shot_index) > 0 else np.zeros(0, dtype=bool)
+    targets[shot_index[first]] = target_index[first]
+    return targets
+
+
+def _parse_ships_commands(
+    actions: dict,
+    ships: ShipTable,
+    action_type: int
+):
+    """
+    Collects the commands of the given type (0 - movement, 1 - firing) of both players, in the order of execution.
 
+    :return: rows of the commanded ships (-1 if there is no such ship), directions and velocities
+    """
+    owners, ship_ids, directions, velocities = [], [], [], []
+    for player, player_key in enumerate(["player_1", "player_2"]):
+        for command in actions[player_key]["ships_actions"]:
+            if command[1] == action_type:
+                owners.append(player)
+                ship_ids.append(command[0])
+                directions.append(command[2])
+                velocities.append(command[3] if action_type == 0 else 0)
 
-def _get_player_next_id(player: int):
-    global player_1_ships_next_id, player_2_ships_next_id
-    if player == 0:
-        player_1_ships_next_id += 1
-        return player_1_ships_next_id - 1
-    else:
-        player_2_ships_next_id += 1
-        return player_2_ships_next_id - 1
+    rows = ships.rows_of(owner=owners, ship_ids=ship_ids)
+    return rows, np.array(directions, dtype=int), np.array(velocities, dtype=int)
 
 
-def _get_planet_id_by_ship_position(ship_x, ship_y, planets_centers):
-    for e, center in enumerate(planets_centers):
-        if np.linalg.norm([ship_x - center[1], ship_y - center[0]]) <= SHIP_OCCUPATION_RANGE:
-            return e
-    return -1
+def _get_command_rank(rows: np.ndarray):
+    """
+    Returns for every command, how many earlier commands were given to the same ship
+    """
+    order = np.argsort(rows, kind="stable")
+    sorted_rows = rows[order]
+    group_start = np.maximum.accumulate(np.where(
+        np.r_[True, sorted_rows[1:] != sorted_rows[:-1]], np.arange(len(rows)), 0))
 
+    command_rank = np.empty(len(rows), dtype=int)
+    command_rank[order] = np.arange(len(rows)) - group_start
+    return command_rank
 
-def _delete_healing_effect(
-        player: int,
-        ship_id: int,
-        effects: list
-):
-    i = 0
-    while i < len(effects):
-        if effects[i][0] == 1 and effects[i][1] == player and effects[i][2] == ship_id:
-            effects.pop(i)
-        i += 1
-
-
-def _delete_ship(
-    player_1_ships: dict,
-    player_2_ships: dict,
-    player_1_ships_facing: dict,
-    player_2_ships_facing: dict,
-    player: int,
-    ship_id: int,
+
+def _delete_ships(
+    ships: ShipTable,
+    rows: np.ndarray,
     turn_on_music: bool,
     volume: float,
-    effects: list,
+    effects: Optional[Effects],
     death_effect: bool = True
 ):
-    if player == 0:
-        ship_list = player_1_ships
-        ship_list_facing = player_1_ships_facing
-    else:
-        ship_list = player_2_ships
-        ship_list_facing = player_2_ships_facing
-
-    if death_effect:
-        effects.append([0, ship_list[ship_id][0], ship_list[ship_id][1], 0])
-
-    _delete_healing_effect(player, ship_id, effects)
+    for row in rows:
+        if effects is not None:
+            if death_effect:
+                effects.append([0, int(ships.x[row]), int(ships.y[row]), 0])
 
-    del ship_list[ship_id]
-    del ship_list_facing[ship_id]
+            effects.stop_healing(int(ships.owner[row]), int(ships.ids[row]))
 
-    if turn_on_music:
-        play_ship_explosion_sound(volume=volume)
+        if turn_on_music:
+            play_ship_explosion_sound(volume=volume)
 
+    ships.remove(rows)
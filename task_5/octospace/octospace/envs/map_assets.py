@@ -1,3 +1,6 @@
+import os
+from functools import lru_cache
+
 import pygame
 
 from pygame import Color, BLEND_MULT
@@ -6,90 +9,194 @@ from octospace.envs.game_config import (SHIP_SIZE, SIDE_SHIP_SIZE, TILE_SIZE, PL
                          EFFECT_IONIZED_FIELD_SIZE, RF_MARKER_SIZE, RF_ICON_SIZE, RF_BAR_SIZE, GUI_SIZE, BORDER_WIDTH,
                          PLAYER_ICON_TEAM_NAME_SIZE, FLAG_SIZE, OCCUPATION_BAR_SIZE, EFFECT_DEATH_SIZE,
                          EFFECT_FIRING_SIZE, EFFECT_HEALING_SIZE, EFFECT_CAPTURE_SIZE, EFFECT_SPACE_JUMP_SIZE,
-                         ASTEROID_SIZE)
+                         ASTEROID_SIZE, N_LAND_SPRITES, N_ASTEROID_SPRITES, N_IONIZED_FIELD_FRAMES, ASSETS_DIR)
 
 
-BACKGROUND = pygame.image.load('assets/background.jpg')
-BORDER = pygame.transform.scale(pygame.image.load('assets/border_long.png'), (WINDOW_SIZE + 2*BORDER_WIDTH, WINDOW_SIZE))
-BORDER_SCORE = pygame.transform.scale(pygame.image.load('assets/scoreboard.png'), (WINDOW_SIZE + 2*BORDER_WIDTH - 50, WINDOW_SIZE - 300))
-LAND = {
-    i: pygame.transform.scale(pygame.image.load(f'assets/planets/land_{i}.png'), size=(TILE_SIZE, TILE_SIZE))
-    for i in range(13)
-}
-ASTEROIDS = {
-    i: pygame.transform.scale(pygame.image.load(f'assets/asteroids/asteroid_{i}.png'), size=(ASTEROID_SIZE, ASTEROID_SIZE))
-    for i in range(12)
-}
+"""
+The images are loaded lazily: every asset below is registered with a loader, which runs on the first access to the
+module attribute (e.g. map_assets.LAND) and its result is cached as the attribute. Importing the module doesn't
+load anything, so the headless simulation never pays for it.
+"""
+_ASSET_LOADERS = {}
 
-PLAYER_ICON = pygame.transform.scale(pygame.image.load('assets/tentacle_white_ring.png'), size=(PLAYER_ICON_TEAM_NAME_SIZE, PLAYER_ICON_TEAM_NAME_SIZE))
-OCCUPATION_FLAG = pygame.transform.scale(pygame.image.load('assets/flag_small.png'), size=(FLAG_SIZE, FLAG_SIZE))
-OCCUPATION_FLAG_CROSSED = pygame.transform.scale(pygame.image.load('assets/flag_small_crossed.png'), size=(FLAG_SIZE, FLAG_SIZE))
 
-ROUGH_TERRAIN = {
-    i: pygame.transform.rotate(pygame.transform.scale(pygame.image.load('assets/planets/rough_terrain.png'), size=(TILE_SIZE, TILE_SIZE)), angle=i*90)
-    for i in range(4)
-}
-ROUGH_TERRAIN_FLAG = pygame.transform.scale(pygame.image.load('assets/planets/rough_terrain_flag.png'), size=(TILE_SIZE, TILE_SIZE))
+def _asset(loader):
+    _ASSET_LOADERS[loader.__name__.upper()] = loader
+    return loader
 
-ROUGH_TERRAIN_CORNER = {
-    i: pygame.transform.rotate(
-        pygame.transform.scale(pygame.image.load('assets/planets/rough_terrain_corner.png'), size=(TILE_SIZE, TILE_SIZE)),
-        angle=i * 90)
-    for i in range(4)
-}
 
-RESOURCE_FIELDS_MARKERS = {
-    i: pygame.transform.scale(pygame.image.load(f'assets/rf_icons/rf_{i}.png'), size=(RF_MARKER_SIZE, RF_MARKER_SIZE)) for i in range(4)
-}
+def _load_image(path: str) -> pygame.Surface:
+    return pygame.image.load(os.path.join(ASSETS_DIR, path))
 
-RESOURCE_FIELDS_ICONS = {
-    i: pygame.transform.scale(pygame.image.load(f'assets/rf_icons/rf_icon_{i}.png'), size=(RF_ICON_SIZE, RF_ICON_SIZE)) for i in range(4)
-}
 
-RESOURCE_FIELDS_BARS = [
-    {i: pygame.transform.scale(pygame.image.load(f'assets/rf_bars/bar_{color}_{i}.png'), size=(RF_BAR_SIZE, RF_BAR_SIZE//5)) for i in range(10)}
-    for color in ['gray', 'green', 'brown', 'blue']
-]
+def __getattr__(name: str):
+    if name not in _ASSET_LOADERS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    asset = _ASSET_LOADERS[name]()
+    globals()[name] = asset
+    return asset
 
-BAR_EMPTY = pygame.transform.scale(pygame.image.load('assets/rf_bars/bar_empty.png'), size=(OCCUPATION_BAR_SIZE, OCCUPATION_BAR_SIZE//5))
 
-IONIZED_FIELDS = {
-    i: pygame.transform.scale(pygame.image.load(f'assets/effects/ionized_field_animation/ionized_field_blue_{i}.png'),
-                              size=(EFFECT_IONIZED_FIELD_SIZE, EFFECT_IONIZED_FIELD_SIZE))
-    for i in range(12)
-}
+@_asset
+def background():
+    return pygame.transform.scale(_load_image('background.jpg'), (WINDOW_SIZE, WINDOW_SIZE))
 
-DEATH_EFFECT_ANIMATION = {
-    i: pygame.transform.scale(pygame.image.load(f'assets/effects/death_animation/death_animation_{i}.png'),
-                              size=(EFFECT_DEATH_SIZE, EFFECT_DEATH_SIZE))
-    for i in range(15)
-}
 
-HEALING_EFFECT_ANIMATION = {
-    i: pygame.transform.scale(pygame.image.load(f'assets/effects/healing_animation/healing_animation_{i}.png'),
-                              size=(EFFECT_HEALING_SIZE, EFFECT_HEALING_SIZE))
-    for i in range(15)
-}
+@_asset
+def border():
+    return pygame.transform.scale(_load_image('border_long.png'), (WINDOW_SIZE + 2*BORDER_WIDTH, WINDOW_SIZE))
 
-FIRING_EFFECT_ANIMATION = {
-    direction: {
-        i: pygame.transform.rotate(pygame.transform.scale(pygame.image.load(f'assets/effects/firing_animation/firing_animation_{i}.png'),
-                              size=(EFFECT_FIRING_SIZE, EFFECT_FIRING_SIZE)), angle=65-90*direction)
-        for i in range(5)
-    } for direction in range(4)
-}
 
-CAPTURE_EFFECT_ANIMATION = {
-    i: pygame.transform.scale(pygame.image.load(f'assets/effects/capture_animation/capture_animation_{i}.png'),
-                              size=(EFFECT_CAPTURE_SIZE, EFFECT_CAPTURE_SIZE))
-    for i in range(12)
-}
+@_asset
+def border_score():
+    return pygame.transform.scale(_load_image('scoreboard.png'), (WINDOW_SIZE + 2*BORDER_WIDTH - 50, WINDOW_SIZE - 300))
+
+
+@_asset
+def land():
+    return {
+        i: pygame.transform.scale(_load_image(f'planets/land_{i}.png'), size=(TILE_SIZE, TILE_SIZE))
+        for i in range(N_LAND_SPRITES)
+    }
+
+
+@_asset
+def asteroids():
+    return {
+        i: pygame.transform.scale(_load_image(f'asteroids/asteroid_{i}.png'), size=(ASTEROID_SIZE, ASTEROID_SIZE))
+        for i in range(N_ASTEROID_SPRITES)
+    }
+
+
+@_asset
+def player_icon():
+    return pygame.transform.scale(_load_image('tentacle_white_ring.png'), size=(PLAYER_ICON_TEAM_NAME_SIZE, PLAYER_ICON_TEAM_NAME_SIZE))
+
+
+@_asset
+def occupation_flag():
+    return pygame.transform.scale(_load_image('flag_small.png'), size=(FLAG_SIZE, FLAG_SIZE))
+
+
+@_asset
+def occupation_flag_crossed():
+    return pygame.transform.scale(_load_image('flag_small_crossed.png'), size=(FLAG_SIZE, FLAG_SIZE))
+
+
+@_asset
+def rough_terrain():
+    return {
+        i: pygame.transform.rotate(pygame.transform.scale(_load_image('planets/rough_terrain.png'), size=(TILE_SIZE, TILE_SIZE)), angle=i*90)
+        for i in range(4)
+    }
+
+
+@_asset
+def rough_terrain_flag():
+    return pygame.transform.scale(_load_image('planets/rough_terrain_flag.png'), size=(TILE_SIZE, TILE_SIZE))
+
+
+@_asset
+def rough_terrain_corner():
+    return {
+        i: pygame.transform.rotate(
+            pygame.transform.scale(_load_image('planets/rough_terrain_corner.png'), size=(TILE_SIZE, TILE_SIZE)),
+            angle=i * 90)
+        for i in range(4)
+    }
+
+
+@_asset
+def resource_fields_markers():
+    return {
+        i: pygame.transform.scale(_load_image(f'rf_icons/rf_{i}.png'), size=(RF_MARKER_SIZE, RF_MARKER_SIZE)) for i in range(4)
+    }
+
+
+@_asset
+def resource_fields_icons():
+    return {
+        i: pygame.transform.scale(_load_image(f'rf_icons/rf_icon_{i}.png'), size=(RF_ICON_SIZE, RF_ICON_SIZE)) for i in range(4)
+    }
+
+
+@_asset
+def resource_fields_bars():
+    return [
+        {i: pygame.transform.scale(_load_image(f'rf_bars/bar_{color}_{i}.png'), size=(RF_BAR_SIZE, RF_BAR_SIZE//5)) for i in range(10)}
+        for color in ['gray', 'green', 'brown', 'blue']
+    ]
+
+
+@_asset
+def bar_empty():
+    return pygame.transform.scale(_load_image('rf_bars/bar_empty.png'), size=(OCCUPATION_BAR_SIZE, OCCUPATION_BAR_SIZE//5))
+
+
+@_asset
+def ionized_fields():
+    return {
+        i: pygame.transform.scale(_load_image(f'effects/ionized_field_animation/ionized_field_blue_{i}.png'),
+                                  size=(EFFECT_IONIZED_FIELD_SIZE, EFFECT_IONIZED_FIELD_SIZE))
+        for i in range(N_IONIZED_FIELD_FRAMES)
+    }
+
+
+@_asset
+def death_effect_animation():
+    return {
+        i: pygame.transform.scale(_load_image(f'effects/death_animation/death_animation_{i}.png'),
+                                  size=(EFFECT_DEATH_SIZE, EFFECT_DEATH_SIZE))
+        for i in range(15)
+    }
+
+
+@_asset
+def healing_effect_animation():
+    return {
+        i: pygame.transform.scale(_load_image(f'effects/healing_animation/healing_animation_{i}.png'),
+                                  size=(EFFECT_HEALING_SIZE, EFFECT_HEALING_SIZE))
+        for i in range(15)
+    }
+
+
+@_asset
+def firing_effect_animation():
+    return {
+        direction: {
+            i: pygame.transform.rotate(pygame.transform.scale(_load_image(f'effects/firing_animation/firing_animation_{i}.png'),
+                                  size=(EFFECT_FIRING_SIZE, EFFECT_FIRING_SIZE)), angle=65-90*direction)
+            for i in range(5)
+        } for direction in range(4)
+    }
+
+
+@_asset
+def capture_effect_animation():
+    return {
+        i: pygame.transform.scale(_load_image(f'effects/capture_animation/capture_animation_{i}.png'),
+                                  size=(EFFECT_CAPTURE_SIZE, EFFECT_CAPTURE_SIZE))
+        for i in range(12)
+    }
+
+
+@_asset
+def space_jump_effect_animation():
+    return {
+        i: pygame.transform.scale(_load_image(f'effects/space_jump/space_jump_{i}.png'),
+                                  size=(EFFECT_SPACE_JUMP_SIZE, EFFECT_SPACE_JUMP_SIZE))
+        for i in range(9)
+    }
+
+
+@_asset
+def team_icons():
+    return {
+        team_id: pygame.transform.scale(
+            _load_image(f'player_icons/octopus_{team_id}.png'), size=(PLAYER_ICON_SIZE, PLAYER_ICON_SIZE)
+        ) for team_id in range(51)
+    }
 
-SPACE_JUMP_EFFECT_ANIMATION = {
-    i: pygame.transform.scale(pygame.image.load(f'assets/effects/space_jump/space_jump_{i}.png'),
-                              size=(EFFECT_SPACE_JUMP_SIZE, EFFECT_SPACE_JUMP_SIZE))
-    for i in range(9)
-}
 
 TEAM_COLORS = {
     0: Color(233, 47, 137, 255),
@@ -145,12 +252,6 @@ TEAM_COLORS = {
     50: Color("violetred4"),
 }
 
-TEAM_ICONS = {
-    team_id: pygame.transform.scale(
-        pygame.image.load(f'assets/player_icons/octopus_{team_id}.png'), size=(PLAYER_ICON_SIZE, PLAYER_ICON_SIZE)
-    ) for team_id in range(51)
-}
-
 """
 Different images are going to be rendered based on which side is the ship currently facing.
 0 - right
@@ -169,24 +270,30 @@ SHIP_ORIENTATIONS_MAP = {
 }
 
 
-def generate_players_assets(
-    player_1_id: int,
-    player_2_id: int
-):
+@lru_cache(maxsize=None)
+def _get_ship_sprites(team_id: int) -> tuple:
+    """
+    Loads the ship images of all orientations in the team's color, cached, because they are requested on every reset
+    """
+    sprites = []
     for i in range(4):
-        ship_img_1 = pygame.image.load(f'assets/battleship_{SHIP_ORIENTATIONS_MAP[i]}.png')
+        ship_img = _load_image(f'battleship_{SHIP_ORIENTATIONS_MAP[i]}.png')
         if i == 2:
-            ship_img_1 = pygame.transform.flip(ship_img_1, flip_x=True, flip_y=False)
+            ship_img = pygame.transform.flip(ship_img, flip_x=True, flip_y=False)
         if i in [0, 2]:
-            ship_img_1 = pygame.transform.scale(ship_img_1, size=(SIDE_SHIP_SIZE, SIDE_SHIP_SIZE))
+            ship_img = pygame.transform.scale(ship_img, size=(SIDE_SHIP_SIZE, SIDE_SHIP_SIZE))
         else:
-            ship_img_1 = pygame.transform.scale(ship_img_1, size=(SHIP_SIZE, SHIP_SIZE))
-        ship_img_2 = ship_img_1.copy()
+            ship_img = pygame.transform.scale(ship_img, size=(SHIP_SIZE, SHIP_SIZE))
+
+        ship_img.fill(TEAM_COLORS[team_id], special_flags=BLEND_MULT)
+        sprites.append(ship_img)
+    return tuple(sprites)
 
-        ship_img_1.fill(TEAM_COLORS[player_1_id], special_flags=BLEND_MULT)
-        ship_img_2.fill(TEAM_COLORS[player_2_id], special_flags=BLEND_MULT)
 
+def generate_players_assets(
+    player_1_id: int,
+    player_2_id: int
+):
+    for i, (ship_img_1, ship_img_2) in enumerate(zip(_get_ship_sprites(player_1_id), _get_ship_sprites(player_2_id))):
         SHIP_ORIENTATIONS_1[i] = ship_img_1
         SHIP_ORIENTATIONS_2[i] = ship_img_2
-
-
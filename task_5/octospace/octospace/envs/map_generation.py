@@ -2,10 +2,9 @@ import numpy as np
 
 from octospace.envs.game_config import (PLANETS_DIAMETER, PLANETS_OFFSET, PLANETS_DISTANCE,
                          RF_ID_TO_CODING, RF_COORDS, FRAC_OF_ASTEROID_AREA, FRAC_OF_IONIZED_AREA, BOARD_SIZE,
-                         PLAYER_1_ORIGIN, PLAYER_2_ORIGIN, N_PLANETS)
-from octospace.envs.map_assets import (IONIZED_FIELDS, LAND, ASTEROIDS)
+                         PLAYER_1_ORIGIN, PLAYER_2_ORIGIN, N_PLANETS, SHIP_OCCUPATION_RANGE,
+                         N_LAND_SPRITES, N_ASTEROID_SPRITES, N_IONIZED_FIELD_FRAMES)
 from octospace.envs.schemes import (STARTING_PLANET_SCHEME, EMPTY_PLANET_SCHEME, ASTEROID_ID_TO_SCHEME, ASTEROID_AREA, PLANET_MASK)
-from scipy.spatial.distance import cdist
 from octospace.envs.utils import NoSpaceOnMapException
 
 
@@ -34,14 +33,14 @@ def _generate_map():
             centers.append(new_planet_center)
             continue
 
-        intra_dist = np.min(cdist([new_planet_center], centers))
+        intra_dist = np.min(np.linalg.norm(np.array(centers) - new_planet_center, axis=1))
         failed_attempts = 0
         while intra_dist <= PLANETS_DISTANCE:
             if failed_attempts >= 1000:
                 raise NoSpaceOnMapException("There's no space to place that many planets on the map")
 
             new_planet_center = np.random.randint(PLANETS_OFFSET, BOARD_SIZE - PLANETS_OFFSET, size=2, dtype=int)
-            intra_dist = np.min(cdist([new_planet_center], centers))
+            intra_dist = np.min(np.linalg.norm(np.array(centers) - new_planet_center, axis=1))
             failed_attempts += 1
         centers.append(new_planet_center)
 
@@ -93,7 +92,7 @@ def _generate_map():
         if not game_map[field_position[0], field_position[1]]:
             failed_attempts = 0
             game_map[field_position[0], field_position[1]] = 4
-            ionized_field_id[(field_position[0], field_position[1])] = np.random.randint(0, len(IONIZED_FIELDS.keys()) - 1)
+            ionized_field_id[(field_position[0], field_position[1])] = np.random.randint(0, N_IONIZED_FIELD_FRAMES - 1)
             n_ionized_fields -= 1
 
     return game_map, centers, ionized_field_id
@@ -133,16 +132,34 @@ def _add_base_planet_occupation(game_map: np.ndarray, centers:list):
     game_map[centers[1][0] - 4: centers[1][0] + 5, centers[1][1] - 4: centers[1][1] + 5] |= 128
 
 
+def _generate_planets_raster(planets_centers: np.ndarray):
+    """
+    Function maps every tile of the board to the planet, which can be captured from it.
+
+    :return: np.ndarray of shape (BOARD_SIZE, BOARD_SIZE) with the id of the first planet within
+             SHIP_OCCUPATION_RANGE of the tile, or -1
+    """
+    planets_raster = np.full((BOARD_SIZE, BOARD_SIZE), -1, dtype=np.int8)
+    tiles_y, tiles_x = np.mgrid[0:BOARD_SIZE, 0:BOARD_SIZE]
+
+    # Going backwards, so the planet with the lowest id wins on the tiles in range of many planets
+    for e, center in reversed(list(enumerate(planets_centers))):
+        in_range = (tiles_x - center[1]) ** 2 + (tiles_y - center[0]) ** 2 <= SHIP_OCCUPATION_RANGE ** 2
+        planets_raster[in_range] = e
+
+    return planets_raster
+
+
 def _generate_state_map(game_map: np.ndarray):
     state_id_map = np.zeros(shape=game_map.shape)
     land_mask = game_map & 3 == 1
     land_non_zero = np.count_nonzero(land_mask)
-    land_ids = np.random.randint(0, len(LAND.keys()), land_non_zero)
+    land_ids = np.random.randint(0, N_LAND_SPRITES, land_non_zero)
     state_id_map[land_mask] = land_ids
 
     asteroid_mask = game_map & 3 == 2
     asteroid_non_zero = np.count_nonzero(asteroid_mask)
-    asteroid_ids = np.random.randint(0, len(ASTEROIDS.keys()), asteroid_non_zero)
+    asteroid_ids = np.random.randint(0, N_ASTEROID_SPRITES, asteroid_non_zero)
     state_id_map[asteroid_mask] = asteroid_ids
 
     return state_id_map
@@ -1,8 +1,7 @@
-from typing import Any, Optional, Tuple
+from typing import Any, NamedTuple, Optional, Tuple, TYPE_CHECKING
 
 import gymnasium as gym
 from gymnasium import spaces
-import pygame
 import numpy as np
 from gymnasium.core import RenderFrame
 
@@ -11,23 +10,73 @@ from octospace.envs.game_config import (MAX_RESOURCES, MAP_MAX_VALUE,
                                         BASE_SHIP_SPEED, SHIP_COST,
                                         PLAYER_1_ORIGIN, PLAYER_2_ORIGIN, N_PLANETS, FIRING_COOLDOWN, MOVE_COOLDOWN,
                                         RESOURCE_PRODUCTION_DIVISOR)
-from octospace.envs.map_assets import BORDER, BORDER_SCORE, generate_players_assets
-from octospace.envs.map_generation import _generate_map, _generate_state_map, _add_base_planet_occupation, _reset_planets_occupation
-from octospace.envs.rendering import (_render_planets, _render_planet_occupation, _render_ongoing_planet_capture, _render_players,
-                       _render_ships, _render_turn, _render_background, _render_team_names, _render_resources,
-                       _render_effects, _render_vision_debug, _render_score)
+from octospace.envs.effects import Effects
+from octospace.envs.map_generation import (_generate_map, _generate_state_map, _generate_planets_raster,
+                                           _add_base_planet_occupation, _reset_planets_occupation)
 from octospace.envs.game_logic import (_ship_firing, _ship_movement, _ship_construction, _occupation_progress,
                         _change_ownership_of_planets, _ship_land_interaction, _decrease_cooldowns, _handle_ship_death,
                         _handle_visibility, _add_planet_visibility, _check_victory_conditions)
+from octospace.envs.ship_table import ShipTable, ShipTableState
+from octospace.envs.tile_rendering import _render_tiles
 from octospace.envs.sound import setup_music_loop, get_new_track
 
+# pygame and the assets are loaded only for rendering and sounds, the headless simulation doesn't touch them
+if TYPE_CHECKING:
+    import pygame
+
+
+class OctoSpaceState(NamedTuple):
+    """
+    Immutable snapshot of the game state (see OctoSpaceEnv.get_state).
+
+    The arrays are read-only copies: the map as uint8 and the visibility masks packed with np.packbits.
+    The arrays, which are fixed for the whole map (planets_centers, planets_raster and state_ids) are shared with
+    the environment and all of its snapshots, as the game never modifies them. The animation frames of the ionized
+    fields (changed by the rendering) are stored as a tuple of (tile, frame) pairs.
+    """
+    map: np.ndarray
+    planets_centers: np.ndarray
+    planets_raster: np.ndarray
+    state_ids: np.ndarray
+    ionized_field_id: tuple
+    planets_occupation_progress: tuple
+    planets_ongoing_occupation: tuple
+    player_1_visibility_mask: np.ndarray
+    player_2_visibility_mask: np.ndarray
+    player_1_resources: np.ndarray
+    player_2_resources: np.ndarray
+    player_1_occupied_rf: np.ndarray
+    player_2_occupied_rf: np.ndarray
+    ships: ShipTableState
+    turn: int
+    round: int
+    player_1_id: int
+    player_2_id: int
+    player_1_id_original: int
+    player_2_id_original: int
+    player_1_score: float
+    player_2_score: float
+    victorious_player: tuple
+    terminated: bool
+
+
+def _read_only(array: np.ndarray, dtype=None) -> np.ndarray:
+    array = np.array(array, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
 
 class OctoSpaceEnv(gym.Env):
     """
     Args:
-        render_mode: type of visualization, available options: human and rgb_array
+        render_mode: type of visualization, available options: human, rgb_array and rgb_array_tiles
+            - rgb_array_tiles renders one pixel per tile straight from the map, without pygame
         turn_on_music: turn on music and sound effects
         volume: change the volume of music and sound effects
+        headless: don't keep the effects (they are used only for rendering), by default when render_mode is None
+            or rgb_array_tiles
+        reuse_frame_buffer: render() returns the same preallocated frame every time (overwritten by the next call)
+            instead of a new array
 
     Observation Space:
         game_map: whole grid of board_size, which already has applied visibility mask on it
@@ -58,7 +107,10 @@ class OctoSpaceEnv(gym.Env):
     Construction of a new ship requires 100 units from each resource
     """
 
-    metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 10}
+    metadata = {"render_modes": ["human", "rgb_array", "rgb_array_tiles"], "render_fps": 10}
+
+    # Render modes, which draw the board with pygame
+    _pygame_render_modes = ["human", "rgb_array"]
 
     def __init__(self,
                  player_1_id: int,
@@ -67,11 +119,14 @@ class OctoSpaceEnv(gym.Env):
                  max_steps: int = 1000,
                  turn_on_music: bool = False,
                  volume: float = 0.25,
-                 seed: Optional[int] = None
+                 seed: Optional[int] = None,
+                 headless: Optional[bool] = None,
+                 reuse_frame_buffer: bool = False
                  ):
         assert BOARD_SIZE > 30
         assert N_PLANETS >= 2
         assert render_mode is None or render_mode in self.metadata['render_modes']
+        assert not (headless and render_mode in self._pygame_render_modes)
 
         self._turn_on_music = turn_on_music
         self.player_1_id = player_1_id
@@ -85,6 +140,8 @@ class OctoSpaceEnv(gym.Env):
         self.volume = volume
         self.seed = seed
         self.render_mode = render_mode
+        self.headless = render_mode not in self._pygame_render_modes if headless is None else headless
+        self.reuse_frame_buffer = reuse_frame_buffer
         self.debug = False
 
         self.observation_space = spaces.Dict({
@@ -158,6 +215,9 @@ class OctoSpaceEnv(gym.Env):
         self._state_ids = None
         self._planets_centers: np.ndarray = None
 
+        # Id of the planet, which can be captured from the tile, or -1 (see _generate_planets_raster)
+        self._planets_raster: np.ndarray = None
+
         # Contain the values between 0 and 100, indicating the occupation progress
         # 0 means the whole planet belongs to 1st player
         # 100 means the whole planet belongs to 2nd player
@@ -175,19 +235,14 @@ class OctoSpaceEnv(gym.Env):
         self._player_2_visibility_mask: np.ndarray = None
         self.ionized_field_id: dict = None
 
+        # Background and terrain of the current map pre-rendered for the frames (see _render_terrain_layer)
+        self._terrain_layer: tuple = None
+
         self._player_1_score = 0
         self._player_2_score = 0
 
-        # On start both players have 1 battleship at their base
-        self._player_1_ships: dict = None
-        self._player_2_ships: dict = None
-
-        self._player_1_ships_next_id: int = None
-        self._player_2_ships_next_id: int = None
-
-        # 0 - right, 1 - down, 2 - left, 3 - up
-        self._player_1_ships_facing: dict = None
-        self._player_2_ships_facing: dict = None
+        # Ships of both players (positions, health points, cooldowns and facing), see ShipTable
+        self._ships: ShipTable = None
 
         self._player_1_resources: np.ndarray = None
         self._player_2_resources: np.ndarray = None
@@ -201,8 +256,12 @@ class OctoSpaceEnv(gym.Env):
         self.victorious_player = [False, False]
         self.terminated = False
 
-        self.window: pygame.Surface = None
-        self.clock: pygame.time.Clock = None
+        self.window: Optional["pygame.Surface"] = None
+        self.canvas: Optional["pygame.Surface"] = None
+
+        # Preallocated, contiguous frame of shape (height, width, 3), which the rgb_array frames are copied into
+        self._frame: np.ndarray = None
+        self.clock: Optional["pygame.time.Clock"] = None
 
         """
         Death effect: (0, pos_x, pos_y, frame)
@@ -210,8 +269,11 @@ class OctoSpaceEnv(gym.Env):
         Firing effect: (2, ship_x, ship_y, facing, frame)
         Capture effect: (3, pos_x, pos_y, frame)
         Space jump effect: (4, pos_x, pos_y, frame)
+
+        At most MAX_EFFECTS transient effects are kept (the oldest ones are dropped), healing effects last
+        until the ship leaves its player's tiles (see Effects), None in the headless mode
         """
-        self.effects = None
+        self.effects: Optional[Effects] = None
 
         self.turn: int = None
         self._round = 0
@@ -219,8 +281,6 @@ class OctoSpaceEnv(gym.Env):
         if self._turn_on_music:
             setup_music_loop(volume=volume)
 
-        pygame.display.set_caption(f"Octospace {VERSION}")
-
     def _get_info(self):
         return {}
 
@@ -251,11 +311,17 @@ class OctoSpaceEnv(gym.Env):
         player_1_map[~(self._player_1_visibility_mask.astype(bool))] = -1
         player_2_map[~(self._player_2_visibility_mask.astype(bool))] = -1
 
+        # The list views of the ships are built only here, the game logic works on the ship table
+        player_1_rows = self._ships.alive_rows(0)
+        player_2_rows = self._ships.alive_rows(1)
+        player_1_visible_rows = player_2_rows[self._player_1_visibility_mask[self._ships.x[player_2_rows], self._ships.y[player_2_rows]]]
+        player_2_visible_rows = player_1_rows[self._player_2_visibility_mask[self._ships.x[player_1_rows], self._ships.y[player_1_rows]]]
+
         return {
             "player_1": {
                 "map": player_1_map,
-                "allied_ships": [[ship_id] + ship for ship_id, ship in self._player_1_ships.items()],
-                "enemy_ships": [[ship_id] + ship for ship_id, ship in self._player_2_ships.items() if self._player_1_visibility_mask[ship[0], ship[1]]],
+                "allied_ships": self._ships.as_list(player_1_rows),
+                "enemy_ships": self._ships.as_list(player_1_visible_rows),
                 "planets_occupation": [(planet_x, planet_y, occupation) for (planet_x, planet_y), occupation in
                                        zip(self._planets_centers, self._planets_occupation_progress) if
                                        self._player_1_visibility_mask[planet_y, planet_x]],
@@ -263,8 +329,8 @@ class OctoSpaceEnv(gym.Env):
             },
             "player_2": {
                 "map": player_2_map,
-                "allied_ships": [[ship_id] + ship for ship_id, ship in self._player_2_ships.items()],
-                "enemy_ships": [[ship_id] + ship for ship_id, ship in self._player_1_ships.items() if self._player_2_visibility_mask[ship[0], ship[1]]],
+                "allied_ships": self._ships.as_list(player_2_rows),
+                "enemy_ships": self._ships.as_list(player_2_visible_rows),
                 "planets_occupation": [(planet_x, planet_y, occupation) for (planet_x, planet_y), occupation in
                                        zip(self._planets_centers, self._planets_occupation_progress) if
                                        self._player_2_visibility_mask[planet_y, planet_x]],
@@ -278,16 +344,17 @@ class OctoSpaceEnv(gym.Env):
         seed: int = None,
         options: dict[str, Any] = None,
     ) -> Tuple[dict, dict]:
-        # On start both players have 1 battleship at their base
-        self._player_1_ships = {0: [PLAYER_1_ORIGIN[0] + 7, PLAYER_1_ORIGIN[1], 100, 0, 0]}
-        self._player_2_ships = {0: [PLAYER_2_ORIGIN[0] - 8, PLAYER_2_ORIGIN[1], 100, 0, 0]}
-
-        self._player_1_ships_next_id = 1
-        self._player_2_ships_next_id = 1
+        self._reset_state()
+        return self._get_obs(), self._get_info()
 
-        # 0 - right, 1 - down, 2 - left, 3 - up
-        self._player_1_ships_facing = {0: 1}
-        self._player_2_ships_facing = {0: 3}
+    def _reset_state(self):
+        """
+        Starts a new round, without building the observation (shared with the vector envs)
+        """
+        # On start both players have 1 battleship at their base
+        self._ships = ShipTable()
+        self._ships.add(owner=0, x=PLAYER_1_ORIGIN[0] + 7, y=PLAYER_1_ORIGIN[1], facing=1)
+        self._ships.add(owner=1, x=PLAYER_2_ORIGIN[0] - 8, y=PLAYER_2_ORIGIN[1], facing=3)
 
         self._player_1_visibility_mask = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=bool)
         self._player_2_visibility_mask = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=bool)
@@ -301,7 +368,7 @@ class OctoSpaceEnv(gym.Env):
         self.victorious_player = [False, False]
         self.terminated = False
 
-        self.effects = []
+        self.effects = None if self.headless else Effects()
 
         self.turn = 1
 
@@ -316,7 +383,9 @@ class OctoSpaceEnv(gym.Env):
         if self._round != 0:
             self._change_sides()
 
-        generate_players_assets(player_1_id=self.player_1_id, player_2_id=self.player_2_id)
+        if self.render_mode in self._pygame_render_modes:
+            from octospace.envs.map_assets import generate_players_assets
+            generate_players_assets(player_1_id=self.player_1_id, player_2_id=self.player_2_id)
 
         self._reset_planets_occupation_state()
 
@@ -325,15 +394,15 @@ class OctoSpaceEnv(gym.Env):
         _add_planet_visibility(self._planets_centers[0][1], self._planets_centers[0][0], self._player_1_visibility_mask)
         _add_planet_visibility(self._planets_centers[1][1], self._planets_centers[1][0], self._player_2_visibility_mask)
 
-        return self._get_obs(), self._get_info()
-
     def _generate_map(self):
         self._map, new_planet_centers, ionized_field_id = _generate_map()
         self._state_ids = _generate_state_map(game_map=self._map)
         self._planets_centers = [PLAYER_1_ORIGIN, PLAYER_2_ORIGIN]
         self._planets_centers.extend(new_planet_centers)
         self._planets_centers = np.array(self._planets_centers, dtype=int)
+        self._planets_raster = _generate_planets_raster(planets_centers=self._planets_centers)
         self.ionized_field_id = ionized_field_id
+        self._terrain_layer = None
 
     def _reset_planets_occupation_state(self):
         self._planets_occupation_progress = [-1 for _ in range(len(self._planets_centers))]
@@ -344,30 +413,34 @@ class OctoSpaceEnv(gym.Env):
     def step(
         self, actions: dict
     ) -> Tuple[dict, dict, bool, bool, dict]:
+        self._advance(actions)
+        return self._get_obs(), self._get_reward(), self.terminated, False, self._get_info()
+
+    def _advance(self, actions: dict):
+        """
+        Plays a single turn, without building the observation (shared with the SubprocVectorOctoSpaceEnv)
+        """
         self.turn += 1
         # If the song has ended, play another one
         if self._turn_on_music:
+            import pygame
             if not pygame.mixer.music.get_busy():
                 get_new_track()
 
         # Decrease cooldowns
-        _decrease_cooldowns(player_1_ships=self._player_1_ships, player_2_ships=self._player_2_ships)
+        _decrease_cooldowns(ships=self._ships)
 
         # Ships firing
-        _ship_firing(actions=actions, player_1_ships=self._player_1_ships, player_2_ships=self._player_2_ships,
-                     player_1_ships_facing=self._player_1_ships_facing, player_2_ships_facing=self._player_2_ships_facing,
-                     effects=self.effects, turn_on_music=self._turn_on_music, volume=self.volume)
+        _ship_firing(actions=actions, ships=self._ships, effects=self.effects, turn_on_music=self._turn_on_music,
+                     volume=self.volume)
 
         # Ship movement
-        _ship_movement(game_map=self._map, actions=actions, player_1_ships=self._player_1_ships,
-                       player_2_ships=self._player_2_ships, player_1_ships_facing=self._player_1_ships_facing,
-                       player_2_ships_facing=self._player_2_ships_facing, effects=self.effects, turn_on_music=self._turn_on_music,
-                       volume=self.volume)
+        _ship_movement(game_map=self._map, actions=actions, ships=self._ships, effects=self.effects,
+                       turn_on_music=self._turn_on_music, volume=self.volume)
 
         # Construction
-        _ship_construction(actions=actions, player_1_ships=self._player_1_ships, player_2_ships=self._player_2_ships,
-                           player_1_ships_facing=self._player_1_ships_facing, player_2_ships_facing=self._player_2_ships_facing,
-                           player_1_resources=self._player_1_resources, player_2_resources=self._player_2_resources)
+        _ship_construction(actions=actions, ships=self._ships, player_1_resources=self._player_1_resources,
+                           player_2_resources=self._player_2_resources)
 
         # Change the ownership of newly captured planets
         _change_ownership_of_planets(game_map=self._map, planets_centers=self._planets_centers,
@@ -385,42 +458,137 @@ class OctoSpaceEnv(gym.Env):
                              planets_ongoing_occupation=self._planets_ongoing_occupation)
 
         # Planet capture and ship healing
-        _ship_land_interaction(game_map=self._map, planets_centers=self._planets_centers, planets_occupation_progress=self._planets_occupation_progress,
+        _ship_land_interaction(game_map=self._map, planets_raster=self._planets_raster, planets_occupation_progress=self._planets_occupation_progress,
                                planets_ongoing_occupation=self._planets_ongoing_occupation,
-                               player_1_ships=self._player_1_ships, player_2_ships=self._player_2_ships,
-                               player_1_ships_facing=self._player_1_ships_facing, player_2_ships_facing=self._player_2_ships_facing,
-                               effects=self.effects)
+                               ships=self._ships, effects=self.effects)
 
-        _handle_ship_death(player_1_ships=self._player_1_ships, player_2_ships=self._player_2_ships, player_1_ships_facing=self._player_1_ships_facing,
-                           player_2_ships_facing=self._player_2_ships_facing, effects=self.effects, turn_on_music=self._turn_on_music, volume=self.volume)
+        _handle_ship_death(ships=self._ships, effects=self.effects, turn_on_music=self._turn_on_music, volume=self.volume)
 
-        _handle_visibility(player_1_ships=self._player_1_ships, player_2_ships=self._player_2_ships, player_1_visibility_mask=self._player_1_visibility_mask,
+        _handle_visibility(ships=self._ships, player_1_visibility_mask=self._player_1_visibility_mask,
                            player_2_visibility_mask=self._player_2_visibility_mask)
 
         self._victory_conditions()
 
-        return self._get_obs(), self._get_reward(), self.terminated, False, self._get_info()
+    def get_state(self) -> OctoSpaceState:
+        """
+        Snapshot of the game state, which can be restored with set_state, e.g. by the agents searching
+        over the future turns. Rendering state (effects, frames, pygame surfaces) is not included.
+        The snapshot can be pickled and sent to another process.
+        """
+        return OctoSpaceState(
+            map=_read_only(self._map, dtype=np.uint8),
+            planets_centers=self._planets_centers,
+            planets_raster=self._planets_raster,
+            state_ids=self._state_ids,
+            ionized_field_id=tuple(self.ionized_field_id.items()),
+            planets_occupation_progress=tuple(int(progress) for progress in self._planets_occupation_progress),
+            planets_ongoing_occupation=tuple(int(occupation) for occupation in self._planets_ongoing_occupation),
+            player_1_visibility_mask=_read_only(np.packbits(self._player_1_visibility_mask)),
+            player_2_visibility_mask=_read_only(np.packbits(self._player_2_visibility_mask)),
+            player_1_resources=_read_only(self._player_1_resources),
+            player_2_resources=_read_only(self._player_2_resources),
+            player_1_occupied_rf=_read_only(self._player_1_occupied_rf),
+            player_2_occupied_rf=_read_only(self._player_2_occupied_rf),
+            ships=self._ships.get_state(),
+            turn=self.turn,
+            round=self._round,
+            player_1_id=self.player_1_id,
+            player_2_id=self.player_2_id,
+            player_1_id_original=self.player_1_id_original,
+            player_2_id_original=self.player_2_id_original,
+            player_1_score=self._player_1_score,
+            player_2_score=self._player_2_score,
+            victorious_player=tuple(bool(victorious) for victorious in self.victorious_player),
+            terminated=self.terminated
+        )
+
+    def set_state(self, state: OctoSpaceState):
+        """
+        Restores the game state from the snapshot returned by get_state (of this or another environment).
+        The map, the visibility masks and the ship table are overwritten in place, the effects are cleared.
+        The snapshot itself is not modified, so it can be restored many times.
+        """
+        if self._map is None:
+            self._map = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=int)
+            self._player_1_visibility_mask = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=bool)
+            self._player_2_visibility_mask = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=bool)
+            self._ships = ShipTable()
+
+        np.copyto(self._map, state.map)
+        for visibility_mask, packed in [(self._player_1_visibility_mask, state.player_1_visibility_mask),
+                                        (self._player_2_visibility_mask, state.player_2_visibility_mask)]:
+            np.copyto(visibility_mask, np.unpackbits(packed, count=visibility_mask.size).reshape(visibility_mask.shape),
+                      casting="unsafe")
+
+        # The terrain layer has to be rendered again only for a different map
+        if self._state_ids is not state.state_ids:
+            self._planets_centers = state.planets_centers
+            self._planets_raster = state.planets_raster
+            self._state_ids = state.state_ids
+            self.ionized_field_id = dict(state.ionized_field_id)
+            self._terrain_layer = None
+
+        self._planets_occupation_progress = list(state.planets_occupation_progress)
+        self._planets_ongoing_occupation = list(state.planets_ongoing_occupation)
+
+        self._player_1_resources = state.player_1_resources.copy()
+        self._player_2_resources = state.player_2_resources.copy()
+        self._player_1_occupied_rf = state.player_1_occupied_rf.copy()
+        self._player_2_occupied_rf = state.player_2_occupied_rf.copy()
+
+        self._ships.set_state(state.ships)
+
+        self.turn = state.turn
+        self._round = state.round
+        self.player_1_id = state.player_1_id
+        self.player_2_id = state.player_2_id
+        self.player_1_id_original = state.player_1_id_original
+        self.player_2_id_original = state.player_2_id_original
+        self._players_rendering_order = sorted([self.player_1_id, self.player_2_id])
+        self._player_1_score = state.player_1_score
+        self._player_2_score = state.player_2_score
+        self.victorious_player = list(state.victorious_player)
+        self.terminated = state.terminated
+
+        self.effects = None if self.headless else Effects()
 
     def render(self) -> RenderFrame:
         if self.render_mode == "rgb_array":
             return self._render_frame()
 
+        if self.render_mode == "rgb_array_tiles":
+            return self._render_tiles_frame()
+
         if self.render_mode == "human":
             self._render_frame()
 
     def _render_frame(self):
+        import pygame
+        from octospace.envs.map_assets import BORDER, BORDER_SCORE
+        from octospace.envs.rendering import (_render_planets, _render_planet_occupation, _render_ongoing_planet_capture,
+                                              _render_players, _render_ships, _render_turn, _render_terrain_layer,
+                                              _render_team_names, _render_resources, _render_effects,
+                                              _render_vision_debug, _render_score)
+
         if self.window is None and self.render_mode == "human":
             pygame.init()
             pygame.display.init()
+            pygame.display.set_caption(f"Octospace {VERSION}")
             self.window = pygame.display.set_mode((WINDOW_SIZE + 2*GUI_SIZE + 2*BORDER_WIDTH, WINDOW_SIZE))
         if self.clock is None and self.render_mode == "human":
             self.clock = pygame.time.Clock()
 
-        canvas = pygame.Surface((WINDOW_SIZE, WINDOW_SIZE))
-        _render_background(canvas)
+        # The background and the terrain are drawn once per map
+        if self._terrain_layer is None:
+            self._terrain_layer = _render_terrain_layer(game_map=self._map, state_ids_map=self._state_ids)
+
+        # The canvas is reused, the terrain layer covers all of it
+        if self.canvas is None:
+            self.canvas = pygame.Surface((WINDOW_SIZE, WINDOW_SIZE))
+        canvas = self.canvas
 
         # Render planets
-        _render_planets(canvas, game_map=self._map, state_ids_map=self._state_ids, ionized_field_id=self.ionized_field_id)
+        _render_planets(canvas, terrain_layer=self._terrain_layer, ionized_field_id=self.ionized_field_id)
 
         # Render planets occupation
         _render_planet_occupation(canvas, game_map=self._map, planets_centers=self._planets_centers, player_1_id=self.player_1_id, player_2_id=self.player_2_id)
@@ -433,15 +601,13 @@ class OctoSpaceEnv(gym.Env):
         _render_players(canvas, player_1_id=self.player_1_id, player_2_id=self.player_2_id)
 
         # Render ships
-        _render_ships(canvas, player_1_ships=self._player_1_ships, player_2_ships=self._player_2_ships,
-                      player_1_ships_facing=self._player_1_ships_facing, player_2_ships_facing=self._player_2_ships_facing)
+        _render_ships(canvas, ships=self._ships)
 
         # Display which turn currently is it
         _render_turn(canvas, turn=self.turn)
 
         # Render effects
-        _render_effects(canvas, game_map=self._map, effects=self.effects, player_1_ships=self._player_1_ships, player_2_ships=self._player_2_ships,
-                        player_1_ships_facing=self._player_1_ships_facing, player_2_ships_facing=self._player_2_ships_facing)
+        _render_effects(canvas, game_map=self._map, effects=self.effects, ships=self._ships)
 
         # Vision debug
         if self.debug:
@@ -467,9 +633,16 @@ class OctoSpaceEnv(gym.Env):
 
             self.clock.tick(self.metadata["render_fps"])
         else:
-            return np.transpose(
-                np.array(pygame.surfarray.pixels3d(canvas)), axes=(1, 0, 2)
-            )
+            if self._frame is None:
+                self._frame = np.empty((WINDOW_SIZE, WINDOW_SIZE, 3), dtype=np.uint8)
+            np.copyto(self._frame, pygame.surfarray.pixels3d(canvas).transpose(1, 0, 2))
+            return self._frame if self.reuse_frame_buffer else self._frame.copy()
+
+    def _render_tiles_frame(self):
+        if self._frame is None:
+            self._frame = np.empty((BOARD_SIZE, BOARD_SIZE, 3), dtype=np.uint8)
+        _render_tiles(self._frame, game_map=self._map, ships=self._ships)
+        return self._frame if self.reuse_frame_buffer else self._frame.copy()
 
     def _victory_conditions(self):
         self.victorious_player = _check_victory_conditions(game_map=self._map, planets_centers=self._planets_centers)
@@ -485,11 +658,19 @@ class OctoSpaceEnv(gym.Env):
                 self._player_1_score += int(self.victorious_player[1]) / sum(self.victorious_player)
                 self._player_2_score += int(self.victorious_player[0]) / sum(self.victorious_player)
 
+    def _game_over(self) -> bool:
+        """
+        The game ends after max_steps turns or when a base gets captured. The env itself terminates only in the 1st
+        case - the runners (simulate_game and the vector envs) finish the game in both of them.
+        """
+        return self.terminated or any(self.victorious_player)
+
     def _change_sides(self):
         self.player_1_id, self.player_2_id = self.player_2_id, self.player_1_id
 
     def close(self):
         if self.window is not None:
+            import pygame
             if self._turn_on_music:
                 pygame.mixer.music.stop()
             pygame.display.quit()
@@ -12,6 +12,8 @@ from octospace.envs.map_assets import (LAND, RESOURCE_FIELDS_MARKERS, ASTEROIDS,
     PLAYER_ICON, RESOURCE_FIELDS_ICONS, RESOURCE_FIELDS_BARS, DEATH_EFFECT_ANIMATION, HEALING_EFFECT_ANIMATION,
                         FIRING_EFFECT_ANIMATION, CAPTURE_EFFECT_ANIMATION, SPACE_JUMP_EFFECT_ANIMATION, ROUGH_TERRAIN,
                         ROUGH_TERRAIN_FLAG, ROUGH_TERRAIN_CORNER)
+from octospace.envs.effects import Effects
+from octospace.envs.ship_table import ShipTable
 
 from matches_config import TEAMS_ABBREVIATIONS
 
@@ -25,54 +27,111 @@ scoreboard_font = pygame.font.SysFont("Arial", size=40)
 
 
 def _render_background(canvas: pygame.Surface):
-    canvas.blit(pygame.transform.scale(BACKGROUND, (WINDOW_SIZE, WINDOW_SIZE)), BACKGROUND.get_rect())
+    canvas.blit(BACKGROUND, (0, 0))
 
 
-def _render_planets(
-        canvas: pygame.Surface,
+def _get_terrain_blits(
         game_map: np.ndarray,
-        state_ids_map: np.ndarray,
-        ionized_field_id: dict):
+        state_ids_map: np.ndarray
+) -> list:
+    """
+    Lists the blits of the planets, asteroids and ionized fields in the drawing order (tile by tile, row by row).
+    Sprites are bigger than the tiles, so the order matters where they overlap.
+
+    :return: list of (surface, position, ionized field tile), the surface is None for the (animated) ionized fields
+    """
+    blits = []
     for y in range(BOARD_SIZE):
         for x in range(BOARD_SIZE):
             block = game_map[y, x]
             if block & 3 == 1:
-                canvas.blit(LAND[state_ids_map[y, x]], (x * TILE_SIZE, y * TILE_SIZE))
+                blits.append((LAND[state_ids_map[y, x]], (x * TILE_SIZE, y * TILE_SIZE), None))
                 # Render resource fields marks
                 if block & 57 != 1:
                     rf_coding = block & 57
-                    canvas.blit(RESOURCE_FIELDS_MARKERS[RF_CODING_TO_ID[rf_coding]],
-                                (x * TILE_SIZE + RF_MARKER_ADJUSTMENT, y * TILE_SIZE + RF_MARKER_ADJUSTMENT))
+                    blits.append((RESOURCE_FIELDS_MARKERS[RF_CODING_TO_ID[rf_coding]],
+                                  (x * TILE_SIZE + RF_MARKER_ADJUSTMENT, y * TILE_SIZE + RF_MARKER_ADJUSTMENT), None))
             elif block & 3 == 2:
-                canvas.blit(ASTEROIDS[state_ids_map[y, x]], (x * TILE_SIZE, y * TILE_SIZE))
+                blits.append((ASTEROIDS[state_ids_map[y, x]], (x * TILE_SIZE, y * TILE_SIZE), None))
             elif block & 3 == 3:
                 if game_map[y-1, x] & 57 != 1:
                     if game_map[y, x-1] & 57 != 1:
-                        canvas.blit(ROUGH_TERRAIN_CORNER[3], (x * TILE_SIZE, y * TILE_SIZE))
+                        rough_terrain = ROUGH_TERRAIN_CORNER[3]
                     elif game_map[y, x+1] & 57 != 1:
-                        canvas.blit(ROUGH_TERRAIN_CORNER[2], (x * TILE_SIZE, y * TILE_SIZE))
+                        rough_terrain = ROUGH_TERRAIN_CORNER[2]
                     else:
-                        canvas.blit(ROUGH_TERRAIN[1], (x * TILE_SIZE, y * TILE_SIZE))
+                        rough_terrain = ROUGH_TERRAIN[1]
                 elif game_map[y+1, x] & 57 != 1:
                     if game_map[y, x-1] & 57 != 1:
-                        canvas.blit(ROUGH_TERRAIN_CORNER[0], (x * TILE_SIZE, y * TILE_SIZE))
+                        rough_terrain = ROUGH_TERRAIN_CORNER[0]
                     elif game_map[y, x+1] & 57 != 1:
-                        canvas.blit(ROUGH_TERRAIN_CORNER[1], (x * TILE_SIZE, y * TILE_SIZE))
+                        rough_terrain = ROUGH_TERRAIN_CORNER[1]
                     else:
-                        canvas.blit(ROUGH_TERRAIN[3], (x * TILE_SIZE, y * TILE_SIZE))
+                        rough_terrain = ROUGH_TERRAIN[3]
                 elif game_map[y, x-1] & 57 != 1:
-                    canvas.blit(ROUGH_TERRAIN[2], (x * TILE_SIZE, y * TILE_SIZE))
+                    rough_terrain = ROUGH_TERRAIN[2]
                 elif game_map[y, x+1] & 57 != 1:
-                    canvas.blit(ROUGH_TERRAIN[0], (x * TILE_SIZE, y * TILE_SIZE))
+                    rough_terrain = ROUGH_TERRAIN[0]
                 else:
-                    canvas.blit(ROUGH_TERRAIN_FLAG, (x * TILE_SIZE, y * TILE_SIZE))
+                    rough_terrain = ROUGH_TERRAIN_FLAG
+                blits.append((rough_terrain, (x * TILE_SIZE, y * TILE_SIZE), None))
 
-            # Render ionized fields
+            # Ionized fields are animated
             elif block & 4 == 4:
                 effect_loc_adjustment = TILE_SIZE // 2 - EFFECT_IONIZED_FIELD_SIZE // 2
-                canvas.blit(IONIZED_FIELDS[ionized_field_id[(y, x)]],
-                            (x * TILE_SIZE + effect_loc_adjustment, y * TILE_SIZE + effect_loc_adjustment))
-                ionized_field_id[(y, x)] = (ionized_field_id[(y, x)] + 1) % len(IONIZED_FIELDS)
+                blits.append((None, (x * TILE_SIZE + effect_loc_adjustment, y * TILE_SIZE + effect_loc_adjustment), (y, x)))
+    return blits
+
+
+def _render_terrain_layer(
+        game_map: np.ndarray,
+        state_ids_map: np.ndarray
+) -> tuple:
+    """
+    Bakes the background and the static terrain of the map into one surface, which is reused by every frame.
+    Only the ownership bits of the map change during the game and they don't affect the terrain, so the layer has to
+    be rebuilt only for a new map.
+
+    The ionized fields are left out of the surface. For every one of them the blits overlapping its sprite are
+    collected instead, so _render_planets can redraw just that area in the original order.
+
+    :return: (surface, blits, list of (area of the ionized field, indices of the blits overlapping it))
+    """
+    blits = _get_terrain_blits(game_map=game_map, state_ids_map=state_ids_map)
+
+    surface = pygame.Surface((WINDOW_SIZE, WINDOW_SIZE))
+    _render_background(surface)
+    for source, position, ionized_tile in blits:
+        if ionized_tile is None:
+            surface.blit(source, position)
+
+    rects = [(source or IONIZED_FIELDS[0]).get_rect(topleft=position) for source, position, _ in blits]
+    ionized_areas = [(rects[i], rects[i].collidelistall(rects)) for i, (_, _, ionized_tile) in enumerate(blits)
+                     if ionized_tile is not None]
+    return surface, blits, ionized_areas
+
+
+def _render_planets(
+        canvas: pygame.Surface,
+        terrain_layer: tuple,
+        ionized_field_id: dict):
+    surface, blits, ionized_areas = terrain_layer
+    canvas.blit(surface, (0, 0))
+
+    # Redraw the areas of the ionized fields from the background up, with the current frames of the animation
+    for area, area_blits in ionized_areas:
+        canvas.set_clip(area)
+        _render_background(canvas)
+        for i in area_blits:
+            source, position, ionized_tile = blits[i]
+            if ionized_tile is not None:
+                source = IONIZED_FIELDS[ionized_field_id[ionized_tile]]
+            canvas.blit(source, position)
+    canvas.set_clip(None)
+
+    for _, _, ionized_tile in blits:
+        if ionized_tile is not None:
+            ionized_field_id[ionized_tile] = (ionized_field_id[ionized_tile] + 1) % len(IONIZED_FIELDS)
 
 def _render_planet_occupation(
     canvas: pygame.Surface,
@@ -134,32 +193,18 @@ def _render_players(
 
 def _render_ships(
     canvas: pygame.Surface,
-    player_1_ships: dict,
-    player_2_ships: dict,
-    player_1_ships_facing: dict,
-    player_2_ships_facing: dict,
+    ships: ShipTable
 ):
-    for key in player_1_ships.keys():
-        ship = player_1_ships[key]
-        x, y = ship[0], ship[1]
-        ship_loc_adjustment = TILE_SIZE // 2 - (
-            SHIP_SIZE // 2 if player_1_ships_facing[key] in [1, 3] else SIDE_SHIP_SIZE // 2)
-        ship_x = x * TILE_SIZE + ship_loc_adjustment
-        ship_y = y * TILE_SIZE + ship_loc_adjustment
-        canvas.blit(SHIP_ORIENTATIONS_1[player_1_ships_facing[key]], (ship_x, ship_y))
-        ship_text = ship_font.render(f"{ship[2]}%", False, _get_ship_text_color(ship))
-        canvas.blit(ship_text, (ship_x, ship_y - 12))
-
-    for key in player_2_ships.keys():
-        ship = player_2_ships[key]
-        x, y = ship[0], ship[1]
-        ship_loc_adjustment = TILE_SIZE // 2 - (
-            SHIP_SIZE // 2 if player_2_ships_facing[key] in [1, 3] else SIDE_SHIP_SIZE // 2)
-        ship_x = x * TILE_SIZE + ship_loc_adjustment
-        ship_y = y * TILE_SIZE + ship_loc_adjustment
-        canvas.blit(SHIP_ORIENTATIONS_2[player_2_ships_facing[key]], (ship_x, ship_y))
-        ship_text = ship_font.render(f"{ship[2]}%", False, _get_ship_text_color(ship))
-        canvas.blit(ship_text, (ship_x, ship_y - 12))
+    for player, ship_orientations in enumerate([SHIP_ORIENTATIONS_1, SHIP_ORIENTATIONS_2]):
+        for row in ships.alive_rows(player):
+            x, y, hp, facing = int(ships.x[row]), int(ships.y[row]), int(ships.hp[row]), int(ships.facing[row])
+            ship_loc_adjustment = TILE_SIZE // 2 - (
+                SHIP_SIZE // 2 if facing in [1, 3] else SIDE_SHIP_SIZE // 2)
+            ship_x = x * TILE_SIZE + ship_loc_adjustment
+            ship_y = y * TILE_SIZE + ship_loc_adjustment
+            canvas.blit(ship_orientations[facing], (ship_x, ship_y))
+            ship_text = ship_font.render(f"{hp}%", False, _get_ship_text_color(hp))
+            canvas.blit(ship_text, (ship_x, ship_y - 12))
 
 
 def _render_turn(canvas, turn):
@@ -236,36 +281,28 @@ def _render_score(
 
 
 
+def _is_effect_expired(effect: list) -> bool:
+    return ((effect[0] == 0 and effect[3] == 15) or (effect[0] == 2 and effect[4] == 5)
+            or (effect[0] == 3 and effect[3] == 12) or (effect[0] == 4 and effect[3] == 9))
+
+
 def _render_effects(
     canvas: pygame.Surface,
     game_map: np.ndarray,
-    effects: list,
-    player_1_ships: dict,
-    player_2_ships: dict,
-    player_1_ships_facing: dict,
-    player_2_ships_facing: dict
+    effects: Effects,
+    ships: ShipTable
 ):
     """
     Effects
     """
     # Delete all expired effects
-    i = 0
-    while i < len(effects):
-        if effects[i][0] == 0 and effects[i][3] == 15:
-            effects.pop(i)
-        elif effects[i][0] == 1 and effects[i][3] == 15:
+    effects.remove_expired(_is_effect_expired)
+    for _, effect in effects.healing.values():
+        if effect[3] == 15:
             # Reset frame counter
-            effects[i][3] %= 15
-        elif effects[i][0] == 2 and effects[i][4] == 5:
-            effects.pop(i)
-        elif effects[i][0] == 3 and effects[i][3] == 12:
-            effects.pop(i)
-        elif effects[i][0] == 4 and effects[i][3] == 9:
-            effects.pop(i)
-        else:
-            i += 1
+            effect[3] %= 15
 
-    for e, effect in enumerate(effects):
+    for effect in effects:
         effect_id = effect[0]
 
         # Death effect
@@ -274,22 +311,19 @@ def _render_effects(
             canvas.blit(DEATH_EFFECT_ANIMATION[frame], (pos_x*TILE_SIZE+EFFECT_DEATH_ADJUSTMENT, pos_y*TILE_SIZE+EFFECT_DEATH_ADJUSTMENT))
 
             # Proceed to the next frame
-            effects[e][3] += 1
+            effect[3] += 1
 
         # Healing effect
         elif effect_id == 1:
             player, ship_id, frame = effect[1], effect[2], effect[3]
-            if player == 0:
-                ally_ships = player_1_ships
-            else:
-                ally_ships = player_2_ships
+            row = ships.rows_of(owner=player, ship_ids=ship_id)
 
-            if ship_id in ally_ships.keys():
-                pos_x, pos_y = ally_ships[ship_id][0], ally_ships[ship_id][1]
+            if row != -1:
+                pos_x, pos_y = int(ships.x[row]), int(ships.y[row])
                 canvas.blit(HEALING_EFFECT_ANIMATION[frame], (pos_x*TILE_SIZE+EFFECT_HEALING_ADJUSTMENT, pos_y*TILE_SIZE+EFFECT_HEALING_ADJUSTMENT))
 
                 # Next frame
-                effects[e][3] += 1
+                effect[3] += 1
 
         # Firing effect:
         elif effect_id == 2:
@@ -311,21 +345,21 @@ def _render_effects(
                         (ship_x*TILE_SIZE+EFFECT_FIRING_ADJUSTMENT + facing_adjustment[0],
                          ship_y*TILE_SIZE+EFFECT_FIRING_ADJUSTMENT + facing_adjustment[1]))
 
-            effects[e][4] += 1
+            effect[4] += 1
 
         # Capture effect
         elif effect_id == 3:
             pos_x, pos_y, frame = effect[1], effect[2], effect[3]
             canvas.blit(CAPTURE_EFFECT_ANIMATION[frame], (pos_x*TILE_SIZE+EFFECT_CAPTURE_ADJUSTMENT, pos_y*TILE_SIZE+EFFECT_CAPTURE_ADJUSTMENT))
 
-            effects[e][3] += 1
+            effect[3] += 1
 
         # Space jump effect
         elif effect_id == 4:
             pos_x, pos_y, frame = effect[1], effect[2], effect[3]
             canvas.blit(SPACE_JUMP_EFFECT_ANIMATION[frame], (pos_x*TILE_SIZE+EFFECT_SPACE_JUMP_ADJUSTMENT, pos_y*TILE_SIZE+EFFECT_SPACE_JUMP_ADJUSTMENT))
 
-            effects[e][3] += 1
+            effect[3] += 1
 
 
 def _render_vision_debug(
@@ -357,10 +391,10 @@ def _render_vision_debug(
         canvas.blit(vision_surface, (0, 0))
 
 
-def _get_ship_text_color(ship: list):
-    if ship[2] <= 33:
+def _get_ship_text_color(hp: int):
+    if hp <= 33:
         return (255, 0, 0)
-    elif ship[2] >= 66:
+    elif hp >= 66:
         return (255, 255, 255)
     else:
         return (255, 255, 0)
\ No newline at end of file
@@ -0,0 +1,270 @@
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+from octospace.envs.spatial_grid import SpatialGrid
+
+
+class ShipTableState(NamedTuple):
+    """
+    Immutable snapshot of the alive ships (see ShipTable.get_state), one read-only array per column
+    in construction order, and the next ship id of every player.
+    """
+    ids: np.ndarray
+    owner: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    hp: np.ndarray
+    firing_cooldown: np.ndarray
+    move_cooldown: np.ndarray
+    facing: np.ndarray
+    next_id: Tuple[int, int]
+
+
+class ShipTable:
+    """
+    Struct-of-arrays storage for the ships of both players, in one or many matches (envs).
+
+    Every ship occupies one row of the table. Rows are appended in the order of construction and are never
+    reordered (compaction drops dead rows, but keeps the relative order of the alive ones), so iterating over
+    the alive rows visits the ships in the same order as the old per-player dicts did.
+    The ships of all envs share the columns, so the game phases of the VectorOctoSpaceEnv handle all matches at once.
+
+    Columns:
+        ids: ship id, unique among the ships of one player in one env
+        env: index of the match the ship plays in, always 0 in the table of a single OctoSpaceEnv
+        owner: 0 - 1st player, 1 - 2nd player
+        x, y: position of the ship on the board
+        hp: current health points
+        firing_cooldown: int [0, FIRING_COOLDOWN]
+        move_cooldown: int [0, MOVE_COOLDOWN]
+        facing: 0 - right, 1 - down, 2 - left, 3 - up
+        alive: mask of the rows, which hold a ship that is still on the board
+        moved: mask of the rows, which changed position (or were added) since the last call of pop_moved_rows
+
+    Alive ships are indexed by the spatial grid, which follows every add, remove and move.
+    """
+
+    COLUMNS = ("ids", "env", "owner", "x", "y", "hp", "firing_cooldown", "move_cooldown", "facing", "alive", "moved")
+
+    def __init__(self, capacity: int = 64, n_envs: int = 1):
+        self.capacity = capacity
+        self.n_envs = n_envs
+        self.ids = np.zeros(capacity, dtype=np.int32)
+        self.env = np.zeros(capacity, dtype=np.int32)
+        self.owner = np.zeros(capacity, dtype=np.int8)
+        self.x = np.zeros(capacity, dtype=np.int16)
+        self.y = np.zeros(capacity, dtype=np.int16)
+        self.hp = np.zeros(capacity, dtype=np.int16)
+        self.firing_cooldown = np.zeros(capacity, dtype=np.int16)
+        self.move_cooldown = np.zeros(capacity, dtype=np.int16)
+        self.facing = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.moved = np.zeros(capacity, dtype=bool)
+
+        # Number of rows in use (alive or not)
+        self.size = 0
+
+        # Next ship id to be assigned, per env and player
+        self.next_id = np.zeros((n_envs, 2), dtype=np.int64)
+
+        # Row of every ship id per env and player, -1 if the ship doesn't exist
+        self._row_of = np.full((n_envs, 2, capacity), -1, dtype=np.int32)
+
+        self.grid = SpatialGrid(capacity, n_envs=n_envs)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive[:self.size]))
+
+    def add(
+        self,
+        owner: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        facing: np.ndarray,
+        n: np.ndarray = 1,
+        hp: int = 100,
+        env: np.ndarray = 0
+    ) -> np.ndarray:
+        """
+        Appends n new ships of the given player at the (x, y) position (in the given env).
+        Apart from hp, the arguments can also be arrays with one value per group of new ships,
+        the (env, owner) pairs of the groups have to be unique.
+
+        :return: np.ndarray with the rows of the new ships
+        """
+        env, owner, x, y, facing, n = np.broadcast_arrays(*[np.atleast_1d(np.asarray(value, dtype=np.int64))
+                                                            for value in (env, owner, x, y, facing, n)])
+        total = int(n.sum())
+        if self.size + total > self.capacity:
+            self._make_room(total)
+
+        # Ids of every group continue from the next id of its player
+        rows = np.arange(self.size, self.size + total)
+        group = np.repeat(np.arange(len(n)), n)
+        new_ids = self.next_id[env, owner][group] + np.arange(total) - np.repeat(np.cumsum(n) - n, n)
+        if total > 0 and new_ids.max() >= self._row_of.shape[2]:
+            self._grow_ids(new_ids.max() + 1)
+
+        self.ids[rows] = new_ids
+        self.env[rows] = env[group]
+        self.owner[rows] = owner[group]
+        self.x[rows] = x[group]
+        self.y[rows] = y[group]
+        self.hp[rows] = hp
+        self.firing_cooldown[rows] = 0
+        self.move_cooldown[rows] = 0
+        self.facing[rows] = facing[group]
+        self.alive[rows] = True
+        self.moved[rows] = True
+        self._row_of[env[group], owner[group], new_ids] = rows
+        self.grid.insert(rows, self.env[rows], self.owner[rows], self.x[rows], self.y[rows])
+
+        self.size += total
+        self.next_id[env, owner] += n
+        return rows
+
+    def remove(self, rows: np.ndarray):
+        rows = np.asarray(rows, dtype=int)
+        self.alive[rows] = False
+        self._row_of[self.env[rows], self.owner[rows], self.ids[rows]] = -1
+        self.grid.remove(rows)
+
+    def move(self, rows: np.ndarray, x: np.ndarray, y: np.ndarray):
+        """
+        Moves the ships to the (x, y) positions, rows have to be unique
+        """
+        changed = (self.x[rows] != x) | (self.y[rows] != y)
+        self.x[rows] = x
+        self.y[rows] = y
+        self.moved[rows[changed]] = True
+        self.grid.move(rows[changed], self.env[rows[changed]], self.owner[rows[changed]], self.x[rows[changed]],
+                       self.y[rows[changed]])
+
+    def pop_moved_rows(self, owner: int = None, envs: np.ndarray = None) -> np.ndarray:
+        """
+        :param envs: boolean mask of the envs to take the ships from, all envs if not provided
+        :return: np.ndarray with the rows of alive ships (of the given player only, if provided),
+                 which moved since the last call
+        """
+        selected = np.ones(self.size, dtype=bool)
+        if owner is not None:
+            selected &= self.owner[:self.size] == owner
+        if envs is not None:
+            selected &= envs[self.env[:self.size]]
+
+        rows = np.flatnonzero(self.moved[:self.size] & self.alive[:self.size] & selected)
+        self.moved[:self.size][selected] = False
+        return rows
+
+    def alive_rows(self, owner: int = None, env: int = None) -> np.ndarray:
+        """
+        :return: np.ndarray with the rows of alive ships (of the given player and env only, if provided)
+                 in construction order
+        """
+        mask = self.alive[:self.size]
+        if owner is not None:
+            mask = mask & (self.owner[:self.size] == owner)
+        if env is not None:
+            mask = mask & (self.env[:self.size] == env)
+        return np.flatnonzero(mask)
+
+    def rows_of(self, owner: np.ndarray, ship_ids: np.ndarray, env: np.ndarray = 0) -> np.ndarray:
+        """
+        Translates (player, ship id) pairs (of the given envs) into rows of the table.
+
+        :return: np.ndarray with the rows, -1 for ships that don't exist
+        """
+        owner = np.asarray(owner, dtype=int)
+        env = np.asarray(env, dtype=int)
+        ship_ids = np.asarray(ship_ids, dtype=int)
+        rows = np.full(ship_ids.shape, -1, dtype=np.int32)
+        valid = (ship_ids >= 0) & (ship_ids < self._row_of.shape[2])
+        rows[valid] = self._row_of[np.broadcast_to(env, ship_ids.shape)[valid],
+                                   np.broadcast_to(owner, ship_ids.shape)[valid], ship_ids[valid]]
+        return rows
+
+    def as_list(self, rows: np.ndarray) -> list:
+        """
+        Builds the observation view of the ships: a list of (ship id, position x, y, health points,
+        firing_cooldown, move_cooldown) lists.
+        """
+        return np.stack([self.ids[rows], self.x[rows], self.y[rows], self.hp[rows],
+                         self.firing_cooldown[rows], self.move_cooldown[rows]], axis=1).tolist()
+
+    def get_state(self, env: int = 0) -> ShipTableState:
+        """
+        :return: ShipTableState with copies of the alive rows of the env (dead rows are dropped, the order is kept)
+        """
+        rows = self.alive_rows(env=env)
+        columns = []
+        for column in ShipTableState._fields[:-1]:
+            values = getattr(self, column)[rows]
+            values.flags.writeable = False
+            columns.append(values)
+        return ShipTableState(*columns, next_id=tuple(int(next_id) for next_id in self.next_id[env]))
+
+    def set_state(self, state: ShipTableState, env: int = 0):
+        """
+        Replaces the ships of the env with the ones from the snapshot, reusing the arrays of the table.
+        All restored rows are marked as moved, so the incremental updates (e.g. visibility) see every ship.
+        """
+        self.remove(self.alive_rows(env=env))
+        if not self.alive[:self.size].any():
+            # There are no ships in the other envs, so the rows are reused from the start
+            self.size = 0
+
+        n = len(state.ids)
+        if self.size + n > self.capacity:
+            self._make_room(n)
+
+        rows = np.arange(self.size, self.size + n)
+        for column in ShipTableState._fields[:-1]:
+            getattr(self, column)[rows] = getattr(state, column)
+        self.env[rows] = env
+        self.alive[rows] = True
+        self.moved[rows] = True
+        self.size += n
+        self.next_id[env] = state.next_id
+
+        if self.next_id[env].max() > self._row_of.shape[2]:
+            self._grow_ids(self.next_id[env].max())
+        self._row_of[env, self.owner[rows], self.ids[rows]] = rows
+        self.grid.insert(rows, self.env[rows], self.owner[rows], self.x[rows], self.y[rows])
+
+    def _make_room(self, n: int):
+        # Drop dead rows first, grow only if the alive ships don't leave enough space
+        self._compact()
+        if self.size + n > self.capacity:
+            self._grow(max(2 * self.capacity, self.size + n))
+
+    def _compact(self):
+        keep = self.alive_rows()
+        for column in self.COLUMNS:
+            values = getattr(self, column)
+            values[:len(keep)] = values[keep]
+        self.alive[len(keep):] = False
+        self.moved[len(keep):] = False
+        self.size = len(keep)
+
+        self._row_of.fill(-1)
+        self._row_of[self.env[:self.size], self.owner[:self.size], self.ids[:self.size]] = np.arange(self.size)
+        self._rebuild_grid()
+
+    def _grow(self, capacity: int):
+        for column in self.COLUMNS:
+            values = getattr(self, column)
+            grown = np.zeros(capacity, dtype=values.dtype)
+            grown[:self.capacity] = values
+            setattr(self, column, grown)
+        self.capacity = capacity
+        self._rebuild_grid()
+
+    def _rebuild_grid(self):
+        rows = self.alive_rows()
+        self.grid.rebuild(self.capacity, rows, self.env[rows], self.owner[rows], self.x[rows], self.y[rows])
+
+    def _grow_ids(self, n_ids: int):
+        grown = np.full((self.n_envs, 2, max(2 * self._row_of.shape[2], n_ids)), -1, dtype=np.int32)
+        grown[:, :, :self._row_of.shape[2]] = self._row_of
+        self._row_of = grown
@@ -1,5 +1,10 @@
+import os
+
 import numpy as np
-import pygame
+
+from octospace.envs.game_config import ASSETS_DIR
+
+# pygame is imported only when a sound is played, so the headless simulation never loads it
 
 
 TRACKS = [
@@ -19,11 +24,13 @@ current_track_id = 0
 
 
 def get_new_track():
+    import pygame
+
     next_track_id = np.random.randint(0, len(TRACKS))
     while next_track_id == current_track_id:
         next_track_id = np.random.randint(0, len(TRACKS))
 
-    pygame.mixer.music.load(f'assets/sounds/{TRACKS[next_track_id]}')
+    pygame.mixer.music.load(os.path.join(ASSETS_DIR, 'sounds', TRACKS[next_track_id]))
     pygame.mixer.music.play()
 
 
@@ -35,24 +42,32 @@ def setup_music_loop(volume: float = 0.25):
 
 
 def play_shoot_sound(volume: float):
-    shoot_sound = pygame.mixer.Sound('assets/sounds/shot_1.wav')
+    import pygame
+
+    shoot_sound = pygame.mixer.Sound(os.path.join(ASSETS_DIR, 'sounds', 'shot_1.wav'))
     shoot_sound.set_volume(volume*2.0)
     pygame.mixer.Channel(1).play(shoot_sound)
 
 
 def play_space_jump_sound(volume: float):
-    space_jump_sound = pygame.mixer.Sound('assets/sounds/space_jump.mp3')
+    import pygame
+
+    space_jump_sound = pygame.mixer.Sound(os.path.join(ASSETS_DIR, 'sounds', 'space_jump.mp3'))
     space_jump_sound.set_volume(volume * 2.0)
     pygame.mixer.Channel(3).play(space_jump_sound)
 
 
 def play_capture_sound(volume: float):
-    capture_sound = pygame.mixer.Sound('assets/sounds/capture.mp3')
+    import pygame
+
+    capture_sound = pygame.mixer.Sound(os.path.join(ASSETS_DIR, 'sounds', 'capture.mp3'))
     capture_sound.set_volume(volume * 0.5)
     pygame.mixer.Channel(4).play(capture_sound)
 
 
 def play_ship_explosion_sound(volume: float):
-    sound_file = pygame.mixer.Sound('assets/sounds/ship_explosion.ogg')
+    import pygame
+
+    sound_file = pygame.mixer.Sound(os.path.join(ASSETS_DIR, 'sounds', 'ship_explosion.ogg'))
     sound_file.set_volume(volume * 0.75)
     pygame.mixer.Channel(2).play(sound_file)
\ No newline at end of file
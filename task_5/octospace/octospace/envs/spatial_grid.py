@@ -0,0 +1,112 @@
+import numpy as np
+
+from octospace.envs.game_config import BOARD_SIZE, SPATIAL_GRID_CELL_SIZE
+
+
+class SpatialGrid:
+    """
+    Uniform bucket grid over the board, which indexes the rows of a ShipTable by (env, owner, cell).
+
+    The bucket of every row and the number of ships in every bucket are updated incrementally, whenever ships are
+    added, removed or moved. The rows sorted by bucket (together with the start of every bucket) are rebuilt lazily,
+    only when a query comes after the buckets have changed.
+    """
+
+    def __init__(self, capacity: int, n_envs: int = 1, board_size: int = BOARD_SIZE,
+                 cell_size: int = SPATIAL_GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.n_cells = -(-board_size // cell_size)      # cells per axis
+
+        # Bucket of every row: (env * 2 + owner) * n_cells^2 + cell, -1 for rows which are not in the grid
+        self.bucket_of = np.full(capacity, -1, dtype=np.int32)
+        self.counts = np.zeros(n_envs * 2 * self.n_cells ** 2, dtype=np.int32)
+
+        self._sorted_rows: np.ndarray = None
+        self._starts: np.ndarray = None
+        self._dirty = True
+
+    def get_buckets(self, env: np.ndarray, owner: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return ((np.asarray(env, dtype=np.int32) * 2 + np.asarray(owner, dtype=np.int32)) * self.n_cells ** 2 +
+                (np.asarray(y, dtype=np.int32) // self.cell_size) * self.n_cells +
+                np.asarray(x, dtype=np.int32) // self.cell_size)
+
+    def insert(self, rows: np.ndarray, env: np.ndarray, owner: np.ndarray, x: np.ndarray, y: np.ndarray):
+        buckets = self.get_buckets(env, owner, x, y)
+        self.bucket_of[rows] = buckets
+        np.add.at(self.counts, buckets, 1)
+        self._dirty = True
+
+    def remove(self, rows: np.ndarray):
+        rows = rows[self.bucket_of[rows] != -1]
+        np.subtract.at(self.counts, self.bucket_of[rows], 1)
+        self.bucket_of[rows] = -1
+        self._dirty = True
+
+    def move(self, rows: np.ndarray, env: np.ndarray, owner: np.ndarray, x: np.ndarray, y: np.ndarray):
+        """
+        Updates the buckets of the rows after the ships have moved to the (x, y) positions
+        """
+        buckets = self.get_buckets(env, owner, x, y)
+        changed = buckets != self.bucket_of[rows]
+        if not changed.any():
+            return
+
+        np.subtract.at(self.counts, self.bucket_of[rows[changed]], 1)
+        np.add.at(self.counts, buckets[changed], 1)
+        self.bucket_of[rows[changed]] = buckets[changed]
+        self._dirty = True
+
+    def rebuild(self, capacity: int, rows: np.ndarray, env: np.ndarray, owner: np.ndarray, x: np.ndarray,
+                y: np.ndarray):
+        """
+        Indexes the given rows from scratch, used after the ship table has been resized or compacted
+        """
+        self.bucket_of = np.full(capacity, -1, dtype=np.int32)
+        self.counts.fill(0)
+        self.insert(rows, env, owner, x, y)
+
+    def get_neighbour_pairs(
+        self,
+        env: np.ndarray,
+        owner: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        reach: int
+    ):
+        """
+        Finds the ships of the given owners (in the same envs), that may be within the reach (in tiles)
+        of the (x, y) positions.
+        All ships in the cells overlapping the square of side 2 * reach + 1 are returned, so the exact
+        distance has to be checked by the caller.
+
+        :return: (query_index, rows) - for every found ship the index of the query it was found for and its row
+        """
+        self._update_sorted_rows()
+        owner, x, y = np.asarray(owner, dtype=np.int32), np.asarray(x, dtype=np.int32), np.asarray(y, dtype=np.int32)
+        env = np.broadcast_to(np.asarray(env, dtype=np.int32), x.shape)
+
+        reach_cells = -(-reach // self.cell_size)
+        offsets = np.arange(-reach_cells, reach_cells + 1)
+        cell_x = (x // self.cell_size)[:, None, None] + offsets[None, None, :]
+        cell_y = (y // self.cell_size)[:, None, None] + offsets[None, :, None]
+        valid = (cell_x >= 0) & (cell_x < self.n_cells) & (cell_y >= 0) & (cell_y < self.n_cells)
+        buckets = (env * 2 + owner)[:, None, None] * self.n_cells ** 2 + cell_y * self.n_cells + cell_x
+
+        # Every (query, bucket) pair expands into the segment of the bucket's rows
+        query_index = np.broadcast_to(np.arange(len(x))[:, None, None], buckets.shape)[valid]
+        buckets = buckets[valid]
+        lengths = self.counts[buckets]
+        segment_starts = np.cumsum(lengths) - lengths
+        positions = (np.arange(lengths.sum()) - np.repeat(segment_starts, lengths) +
+                     np.repeat(self._starts[buckets], lengths))
+        return np.repeat(query_index, lengths), self._sorted_rows[positions]
+
+    def _update_sorted_rows(self):
+        if not self._dirty:
+            return
+
+        # Stable sort keeps the rows of a bucket in construction order
+        indexed_rows = np.flatnonzero(self.bucket_of != -1)
+        self._sorted_rows = indexed_rows[np.argsort(self.bucket_of[indexed_rows], kind="stable")]
+        self._starts = np.cumsum(self.counts) - self.counts
+        self._dirty = False
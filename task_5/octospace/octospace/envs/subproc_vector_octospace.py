@@ -0,0 +1,281 @@
+import multiprocessing as mp
+import traceback
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Optional, Sequence, Tuple
+
+import numpy as np
+from gymnasium import spaces
+from gymnasium.vector import AutoresetMode, VectorEnv
+
+from octospace.envs.game_config import BOARD_SIZE, MAP_MAX_VALUE, MAX_SHIPS, N_PLANETS, MAX_RESOURCES
+from octospace.envs.octospace import OctoSpaceEnv
+
+
+# Fixed layout of the observations, the leading axis is the env, the 2nd one the player (0 - player_1, 1 - player_2)
+# Ships and planets are padded, only the first *_count rows of every player are valid
+def _get_buffers_layout(num_envs: int, max_ships: int) -> dict:
+    return {
+        "map": ((num_envs, 2, BOARD_SIZE, BOARD_SIZE), np.int16),
+        "allied_ships": ((num_envs, 2, max_ships, 6), np.int32),
+        "allied_ships_count": ((num_envs, 2), np.int32),
+        "enemy_ships": ((num_envs, 2, max_ships, 6), np.int32),
+        "enemy_ships_count": ((num_envs, 2), np.int32),
+        "planets_occupation": ((num_envs, 2, N_PLANETS + 2, 3), np.int32),
+        "planets_occupation_count": ((num_envs, 2), np.int32),
+        "resources": ((num_envs, 2, 4), np.int32),
+        "reward": ((num_envs, 2), np.float64),
+        "terminated": ((num_envs,), bool),
+    }
+
+
+OBS_KEYS = ("map", "allied_ships", "allied_ships_count", "enemy_ships", "enemy_ships_count",
+            "planets_occupation", "planets_occupation_count", "resources")
+
+
+def _attach_buffers(names: dict, layout: dict) -> Tuple[dict, list]:
+    shared_memories = []
+    buffers = {}
+    for key, (shape, dtype) in layout.items():
+        shared_memory = SharedMemory(name=names[key])
+        shared_memories.append(shared_memory)
+        buffers[key] = np.ndarray(shape, dtype=dtype, buffer=shared_memory.buf)
+    return buffers, shared_memories
+
+
+def _write_obs(env, buffers: dict, i: int):
+    """
+    Writes the observation of the env into the i-th slot of the buffers, same content as OctoSpaceEnv._get_obs
+    """
+    ships = env._ships
+    masks = [env._player_1_visibility_mask, env._player_2_visibility_mask]
+    max_ships = buffers["allied_ships"].shape[2]
+
+    for owner in range(2):
+        mask = masks[owner]
+        np.copyto(buffers["map"][i, owner], np.where(mask, env._map, -1), casting="unsafe")
+
+        allied_rows = ships.alive_rows(owner)
+        enemy_rows = ships.alive_rows(1 - owner)
+        enemy_rows = enemy_rows[mask[ships.x[enemy_rows], ships.y[enemy_rows]]]
+
+        # Ships above max_ships (in construction order) don't fit into the buffers and are skipped
+        for key, rows in [("allied_ships", allied_rows[:max_ships]), ("enemy_ships", enemy_rows[:max_ships])]:
+            buffers[key][i, owner, :len(rows)] = np.stack([ships.ids[rows], ships.x[rows], ships.y[rows], ships.hp[rows],
+                                                           ships.firing_cooldown[rows], ships.move_cooldown[rows]], axis=1)
+            buffers[f"{key}_count"][i, owner] = len(rows)
+
+        planets_occupation = [(planet_x, planet_y, occupation) for (planet_x, planet_y), occupation in
+                              zip(env._planets_centers, env._planets_occupation_progress) if mask[planet_y, planet_x]]
+        if planets_occupation:
+            buffers["planets_occupation"][i, owner, :len(planets_occupation)] = planets_occupation
+        buffers["planets_occupation_count"][i, owner] = len(planets_occupation)
+
+    buffers["resources"][i, 0] = env._player_1_resources
+    buffers["resources"][i, 1] = env._player_2_resources
+
+
+def _worker(
+    pipe,
+    env_indices: list,
+    env_kwargs: dict,
+    buffer_names: dict,
+    layout: dict,
+    seed: Optional[int]
+):
+    buffers, shared_memories = _attach_buffers(names=buffer_names, layout=layout)
+    envs = [OctoSpaceEnv(**env_kwargs) for _ in env_indices]
+    autoreset = [False for _ in env_indices]
+
+    # Maps are generated with the global numpy generator, forked workers would otherwise generate the same ones
+    np.random.seed(None if seed is None else seed + env_indices[0])
+
+    try:
+        while True:
+            command, data = pipe.recv()
+            if command == "reset":
+                if data is not None:
+                    np.random.seed(data + env_indices[0])
+                for j, (env, i) in enumerate(zip(envs, env_indices)):
+                    env._reset_state()
+                    autoreset[j] = False
+                    _write_obs(env, buffers=buffers, i=i)
+                pipe.send((True, None))
+
+            elif command == "step":
+                for j, (env, i) in enumerate(zip(envs, env_indices)):
+                    if autoreset[j]:
+                        env._reset_state()
+                        autoreset[j] = False
+                        buffers["reward"][i] = 0
+                        buffers["terminated"][i] = False
+                    else:
+                        env._advance(data[j])
+                        reward = env._get_reward()
+                        buffers["reward"][i] = reward["player_1"], reward["player_2"]
+                        autoreset[j] = env._game_over()
+                        buffers["terminated"][i] = autoreset[j]
+                    _write_obs(env, buffers=buffers, i=i)
+                pipe.send((True, None))
+
+            elif command == "close":
+                pipe.send((True, None))
+                break
+
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception:
+        pipe.send((False, traceback.format_exc()))
+    finally:
+        for env in envs:
+            env.close()
+        for shared_memory in shared_memories:
+            shared_memory.close()
+
+
+class SubprocVectorOctoSpaceEnv(VectorEnv):
+    """
+    N OctoSpace matches run by OctoSpaceEnv in worker processes, without rendering.
+
+    Workers write the observations into multiprocessing.shared_memory buffers with a fixed layout, only the actions
+    are sent through the pipes. Observations are a dict of np.ndarray, N - number of envs:
+        map: (N, 2, BOARD_SIZE, BOARD_SIZE) - map with the visibility mask applied, [:, 0] - player_1, [:, 1] - player_2
+        allied_ships, enemy_ships: (N, 2, max_ships, 6) - ships as in OctoSpaceEnv, padded with garbage after the count
+        allied_ships_count, enemy_ships_count: (N, 2)
+        planets_occupation: (N, 2, N_PLANETS + 2, 3), padded in the same way
+        planets_occupation_count: (N, 2)
+        resources: (N, 2, 4)
+    get_env_obs converts the observation of a single env back to the OctoSpaceEnv format.
+
+    Args:
+        num_envs: number of matches
+        num_workers: number of worker processes, the envs are split between them evenly
+        max_ships: number of ships per player, that fit into the buffers (the rest is skipped)
+        context: multiprocessing start method, default of the platform if None
+        copy: return copies of the buffers, otherwise the observations are overwritten by the next step
+        player_1_id, player_2_id, max_steps, seed: same as in OctoSpaceEnv
+
+    Actions are a sequence of N actions of OctoSpaceEnv. Rewards are returned as np.ndarray of shape (N, 2).
+    A match is terminated after max_steps turns or when a base gets captured (see OctoSpaceEnv._game_over) and is reset
+    on the next call of step (the actions given for it are ignored).
+    """
+
+    metadata = {"render_modes": [], "autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(self,
+                 num_envs: int,
+                 player_1_id: int,
+                 player_2_id: int,
+                 max_steps: int = 1000,
+                 num_workers: Optional[int] = None,
+                 max_ships: int = MAX_SHIPS,
+                 context: Optional[str] = None,
+                 copy: bool = True,
+                 seed: Optional[int] = None
+                 ):
+        self.num_envs = num_envs
+        self.num_workers = min(num_workers or mp.cpu_count(), num_envs)
+        self.render_mode = None
+        self.copy = copy
+
+        self.single_observation_space = spaces.Dict({
+            "map": spaces.Box(-1, MAP_MAX_VALUE, shape=(2, BOARD_SIZE, BOARD_SIZE), dtype=np.int16),
+            "allied_ships": spaces.Box(0, np.iinfo(np.int32).max, shape=(2, max_ships, 6), dtype=np.int32),
+            "allied_ships_count": spaces.Box(0, max_ships, shape=(2,), dtype=np.int32),
+            "enemy_ships": spaces.Box(0, np.iinfo(np.int32).max, shape=(2, max_ships, 6), dtype=np.int32),
+            "enemy_ships_count": spaces.Box(0, max_ships, shape=(2,), dtype=np.int32),
+            "planets_occupation": spaces.Box(-1, 100, shape=(2, N_PLANETS + 2, 3), dtype=np.int32),
+            "planets_occupation_count": spaces.Box(0, N_PLANETS + 2, shape=(2,), dtype=np.int32),
+            "resources": spaces.Box(0, MAX_RESOURCES, shape=(2, 4), dtype=np.int32)
+        })
+        self.observation_space = spaces.Dict({
+            key: spaces.Box(space.low[None].repeat(num_envs, axis=0), space.high[None].repeat(num_envs, axis=0),
+                            dtype=space.dtype)
+            for key, space in self.single_observation_space.items()
+        })
+
+        layout = _get_buffers_layout(num_envs=num_envs, max_ships=max_ships)
+        self._shared_memories = []
+        self._buffers = {}
+        for key, (shape, dtype) in layout.items():
+            shared_memory = SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+            self._shared_memories.append(shared_memory)
+            self._buffers[key] = np.ndarray(shape, dtype=dtype, buffer=shared_memory.buf)
+        buffer_names = {key: shared_memory.name for key, shared_memory in zip(layout, self._shared_memories)}
+
+        env_kwargs = {"player_1_id": player_1_id, "player_2_id": player_2_id, "max_steps": max_steps}
+        self._env_indices = np.array_split(np.arange(num_envs), self.num_workers)
+
+        ctx = mp.get_context(context)
+        self._pipes = []
+        self._processes = []
+        for env_indices in self._env_indices:
+            parent_pipe, child_pipe = ctx.Pipe()
+            process = ctx.Process(target=_worker, daemon=True,
+                                  args=(child_pipe, env_indices.tolist(), env_kwargs, buffer_names, layout, seed))
+            process.start()
+            child_pipe.close()
+            self._pipes.append(parent_pipe)
+            self._processes.append(process)
+
+    def reset(
+        self,
+        *,
+        seed: Optional[int] = None,
+        options: dict[str, Any] = None,
+    ) -> Tuple[dict, dict]:
+        for pipe in self._pipes:
+            pipe.send(("reset", seed))
+        self._wait()
+        return self._get_obs(), {}
+
+    def step(
+        self, actions: Sequence[dict]
+    ) -> Tuple[dict, np.ndarray, np.ndarray, np.ndarray, dict]:
+        for pipe, env_indices in zip(self._pipes, self._env_indices):
+            pipe.send(("step", [actions[i] for i in env_indices]))
+        self._wait()
+
+        rewards = self._buffers["reward"].copy()
+        terminated = self._buffers["terminated"].copy()
+        return self._get_obs(), rewards, terminated, np.zeros(self.num_envs, dtype=bool), {}
+
+    def _wait(self):
+        results = [pipe.recv() for pipe in self._pipes]
+        for success, error in results:
+            if not success:
+                raise RuntimeError(f"OctoSpace worker has failed:\n{error}")
+
+    def _get_obs(self) -> dict:
+        return {key: self._buffers[key].copy() if self.copy else self._buffers[key] for key in OBS_KEYS}
+
+    @staticmethod
+    def get_env_obs(obs: dict, i: int) -> dict:
+        """
+        Converts the observation of the i-th env into the format returned by OctoSpaceEnv.
+        """
+        env_obs = {}
+        for owner, player in enumerate(["player_1", "player_2"]):
+            env_obs[player] = {
+                "map": obs["map"][i, owner].astype(int),
+                "allied_ships": obs["allied_ships"][i, owner, :obs["allied_ships_count"][i, owner]].tolist(),
+                "enemy_ships": obs["enemy_ships"][i, owner, :obs["enemy_ships_count"][i, owner]].tolist(),
+                "planets_occupation": [tuple(planet) for planet in
+                                       obs["planets_occupation"][i, owner, :obs["planets_occupation_count"][i, owner]].tolist()],
+                "resources": obs["resources"][i, owner].astype(int)
+            }
+        return env_obs
+
+    def close_extras(self, **kwargs):
+        for pipe in self._pipes:
+            try:
+                pipe.send(("close", None))
+                pipe.recv()
+            except (BrokenPipeError, EOFError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for shared_memory in self._shared_memories:
+            shared_memory.close()
+            shared_memory.unlink()
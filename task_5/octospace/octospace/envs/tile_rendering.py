@@ -0,0 +1,54 @@
+import numpy as np
+
+from octospace.envs.game_config import MAP_MAX_VALUE, RF_CODING_TO_ID
+from octospace.envs.ship_table import ShipTable
+
+
+"""
+Observation-resolution rendering: one pixel per tile, computed from the game map with numpy only (no pygame).
+"""
+SPACE_COLOR = (10, 10, 30)
+LAND_COLOR = (120, 120, 120)
+ROUGH_TERRAIN_COLOR = (80, 70, 60)
+ASTEROID_COLOR = (110, 80, 50)
+IONIZED_FIELD_COLOR = (60, 140, 255)
+RESOURCE_FIELD_COLORS = [(170, 170, 170), (60, 200, 60), (160, 100, 40), (40, 80, 220)]
+PLAYER_COLORS = np.array([(233, 47, 137), (0, 200, 200)], dtype=np.uint8)
+
+
+def _get_tile_color(value: int) -> tuple:
+    if value & 3 == 3:
+        color = ROUGH_TERRAIN_COLOR
+    elif value & 1 == 1:
+        color = RESOURCE_FIELD_COLORS[RF_CODING_TO_ID[value & 57]] if value & 57 in RF_CODING_TO_ID else LAND_COLOR
+    elif value & 2 == 2:
+        return ASTEROID_COLOR
+    elif value & 4 == 4:
+        return IONIZED_FIELD_COLOR
+    else:
+        return SPACE_COLOR
+
+    # Land occupied by a player is tinted with the player's color
+    if value & 64 == 64:
+        color = tuple((np.array(color) + PLAYER_COLORS[0]) // 2)
+    elif value & 128 == 128:
+        color = tuple((np.array(color) + PLAYER_COLORS[1]) // 2)
+    return color
+
+
+# Color of every map value (see the map coding in game_config)
+TILE_PALETTE = np.array([_get_tile_color(value) for value in range(MAP_MAX_VALUE + 1)], dtype=np.uint8)
+
+
+def _render_tiles(
+    frame: np.ndarray,
+    game_map: np.ndarray,
+    ships: ShipTable
+):
+    """
+    Renders the map with the ships into the frame of shape (BOARD_SIZE, BOARD_SIZE, 3), one pixel per tile
+    """
+    np.take(TILE_PALETTE, game_map, axis=0, out=frame)
+
+    rows = ships.alive_rows()
+    frame[ships.y[rows], ships.x[rows]] = PLAYER_COLORS[ships.owner[rows]]
@@ -0,0 +1,309 @@
+from typing import Sequence
+
+import numpy as np
+
+from octospace.envs.game_config import (MAX_SHIP_FIRE_RANGE, SHIP_DAMAGE, BASE_SHIP_SPEED, IONIZED_FIELD_SPEED_FACTOR,
+                                        BOARD_SIZE, MOVEMENT_DIRECTIONS, SHIP_COST, PLAYER_1_ORIGIN, PLAYER_2_ORIGIN,
+                                        OCCUPATION_SPEED, SHIP_HEALING_SPEED, FIRING_COOLDOWN, MOVE_COOLDOWN,
+                                        ASTEROID_DAMAGE, VISION_RANGE, VISION_ADD_MASK)
+from octospace.envs.game_logic import _select_targets, _get_command_rank
+from octospace.envs.schemes import PLANET_MASK
+from octospace.envs.ship_table import ShipTable
+
+
+# Offsets of the tiles revealed around a position, the same part of VISION_ADD_MASK as in game_logic._add_visibility
+VISION_OFFSETS = np.argwhere(VISION_ADD_MASK[:2 * VISION_RANGE + 1, :2 * VISION_RANGE + 1]) - VISION_RANGE
+
+# Offsets of the planet's tiles and of its whole area from the planet center
+PLANET_TILES = np.argwhere(PLANET_MASK) - 4
+PLANET_AREA = np.arange(-4, 5)
+
+# Values of the resource fields' tiles without any ownership, in the order of the resources
+RESOURCE_FIELDS_VALUES = [9, 17, 25, 57]
+
+ORIGINS = np.array([PLAYER_1_ORIGIN, PLAYER_2_ORIGIN], dtype=int)
+
+
+def _parse_actions(
+    actions: Sequence[dict],
+    active: np.ndarray
+):
+    """
+    Collects the ship commands of both players in the active matches, in the order of execution.
+
+    :return: (commands, construction) - np.ndarray of shape (n_commands, 6) with env, owner, ship id, action type,
+             direction and velocity (0 for firing) of every command, np.ndarray of shape (N, 2) with the number of
+             ships to build
+    """
+    commands = []
+    construction = np.zeros((len(active), 2), dtype=int)
+    for env in np.flatnonzero(active):
+        for owner, player_key in enumerate(["player_1", "player_2"]):
+            construction[env, owner] = actions[env][player_key]["construction"]
+            for command in actions[env][player_key]["ships_actions"]:
+                commands.append((env, owner, command[0], command[1], command[2], command[3] if command[1] == 0 else 0))
+    return np.array(commands, dtype=int).reshape(-1, 6), construction
+
+
+def _get_commanded_rows(
+    commands: np.ndarray,
+    ships: ShipTable,
+    action_type: int
+):
+    """
+    :return: rows of the ships given the commands of the type (0 - movement, 1 - firing), their directions and
+             velocities, commands to ships that don't exist are skipped
+    """
+    commands = commands[commands[:, 3] == action_type]
+    rows = ships.rows_of(owner=commands[:, 1], ship_ids=commands[:, 2], env=commands[:, 0])
+    valid = rows != -1
+    return rows[valid], commands[valid, 4], commands[valid, 5]
+
+
+def _decrease_cooldowns(
+    ships: ShipTable,
+    active: np.ndarray
+):
+    rows = np.flatnonzero(active[ships.env[:ships.size]])
+    ships.firing_cooldown[rows] = np.maximum(ships.firing_cooldown[rows] - 1, 0)
+    ships.move_cooldown[rows] = np.maximum(ships.move_cooldown[rows] - 1, 0)
+
+
+def _ship_firing(
+    commands: np.ndarray,
+    ships: ShipTable
+):
+    rows, directions, _ = _get_commanded_rows(commands=commands, ships=ships, action_type=1)
+
+    # Ships with an active move cooldown can't fire
+    can_fire = ships.move_cooldown[rows] == 0
+    rows, directions = rows[can_fire], directions[can_fire]
+    ships.firing_cooldown[rows] = FIRING_COOLDOWN
+
+    # The targets are looked up among the enemy ships of the same match
+    shot_index, enemy_rows = ships.grid.get_neighbour_pairs(env=ships.env[rows], owner=1 - ships.owner[rows],
+                                                            x=ships.x[rows], y=ships.y[rows], reach=MAX_SHIP_FIRE_RANGE)
+    targets = _select_targets(
+        ships_x=ships.x[rows],
+        ships_y=ships.y[rows],
+        directions=directions,
+        shot_index=shot_index,
+        target_index=enemy_rows,
+        target_x=ships.x[enemy_rows],
+        target_y=ships.y[enemy_rows]
+    )
+    hit = targets != -1
+
+    np.subtract.at(ships.hp, targets[hit], SHIP_DAMAGE)
+    ships.facing[rows[hit]] = directions[hit]
+
+
+def _ship_movement(
+    maps: np.ndarray,
+    commands: np.ndarray,
+    ships: ShipTable
+):
+    rows, directions, velocities = _get_commanded_rows(commands=commands, ships=ships, action_type=0)
+
+    # The n-th command of every ship (in every match) is handled in the n-th pass
+    command_rank = _get_command_rank(rows)
+    for rank in range(command_rank.max() + 1 if len(rows) > 0 else 0):
+        selected = command_rank == rank
+        _move_ships(maps=maps, ships=ships, rows=rows[selected], directions=directions[selected],
+                    velocities=velocities[selected])
+
+
+def _move_ships(
+    maps: np.ndarray,
+    ships: ShipTable,
+    rows: np.ndarray,
+    directions: np.ndarray,
+    velocities: np.ndarray
+):
+    can_move = ships.move_cooldown[rows] == 0
+    rows, directions, velocities = rows[can_move], directions[can_move], velocities[can_move]
+    env, ship_x, ship_y = ships.env[rows], ships.x[rows].astype(int), ships.y[rows].astype(int)
+
+    on_ionized_field = maps[env, ship_y, ship_x] == 4
+    max_movement = np.where(on_ionized_field, int(BASE_SHIP_SPEED * IONIZED_FIELD_SPEED_FACTOR), BASE_SHIP_SPEED)
+    velocities = np.clip(velocities, 0, max_movement)
+    movement_vec = MOVEMENT_DIRECTIONS[directions] * velocities[:, None]
+
+    new_x = np.clip(ship_x + movement_vec[:, 0], 0, BOARD_SIZE - 1)
+    new_y = np.clip(ship_y + movement_vec[:, 1], 0, BOARD_SIZE - 1)
+    ships.move(rows, new_x, new_y)
+    ships.facing[rows] = directions
+
+    on_asteroids = rows[maps[env, new_y, new_x] == 2]
+    ships.move_cooldown[on_asteroids] = MOVE_COOLDOWN
+    ships.hp[on_asteroids] -= ASTEROID_DAMAGE
+
+
+def _ship_construction(
+    construction: np.ndarray,
+    ships: ShipTable,
+    resources: np.ndarray
+):
+    # Build as many of the requested ships as the resources allow
+    n_ships = np.where(construction > 0, np.minimum(construction, np.min(resources // SHIP_COST, axis=2)), 0)
+
+    # Match by match, 1st player first - the new ships get their rows in the same order as in a single match
+    env, owner = np.nonzero(n_ships > 0)
+    ships.add(owner=owner, x=ORIGINS[owner, 0], y=ORIGINS[owner, 1], facing=0, n=n_ships[env, owner], env=env)
+    resources -= SHIP_COST * n_ships[:, :, None]
+
+
+def _occupation_progress(
+    planets_occupation_progress: np.ndarray,
+    planets_ongoing_occupation: np.ndarray,
+    active: np.ndarray
+):
+    ongoing = (planets_ongoing_occupation != 0) & active[:, None]
+    planets_occupation_progress[ongoing] = np.clip(
+        planets_occupation_progress[ongoing] + planets_ongoing_occupation[ongoing] * OCCUPATION_SPEED, 0, 100)
+
+    # If the planet got occupied, reset the occupation speed counter
+    occupied = ongoing & ((planets_occupation_progress == 0) | (planets_occupation_progress == 100))
+    planets_ongoing_occupation[occupied] = 0
+
+
+def _change_ownership_of_planets(
+    maps: np.ndarray,
+    planets_centers: np.ndarray,
+    planets_occupation_progress: np.ndarray,
+    occupied_rf: np.ndarray,
+    visibility_masks: np.ndarray,
+    active: np.ndarray
+):
+    active_envs = np.flatnonzero(active)
+
+    # Planets are captured one after another, as in a single match (all matches at once)
+    for planet in range(planets_centers.shape[1]):
+        for owner, owner_bit, enemy_bit, own_progress in [(0, 64, 128, 0), (1, 128, 64, 100)]:
+            center = planets_centers[active_envs, planet]
+            captured = ((planets_occupation_progress[active_envs, planet] == own_progress) &
+                        (maps[active_envs, center[:, 0], center[:, 1]] & owner_bit != owner_bit))
+            env, center = active_envs[captured], center[captured]
+            if len(env) == 0:
+                continue
+            tiles = env[:, None], center[:, 0, None] + PLANET_TILES[:, 0], center[:, 1, None] + PLANET_TILES[:, 1]
+
+            # If the planet was already occupied by the other player, delete his ownership
+            enemy_owned = maps[env, center[:, 0], center[:, 1]] & enemy_bit == enemy_bit
+            maps[tiles] -= enemy_bit * enemy_owned[:, None]
+
+            area = maps[env[:, None, None], center[:, 0, None, None] + PLANET_AREA[:, None],
+                        center[:, 1, None, None] + PLANET_AREA[None, :]]
+            rf_counts = np.stack([np.count_nonzero(area == value, axis=(1, 2)) for value in RESOURCE_FIELDS_VALUES],
+                                 axis=1)
+
+            # The other player's ownership is checked at the transposed center, the same as in a single match
+            lost = maps[env, center[:, 1], center[:, 0]] & enemy_bit == enemy_bit
+            occupied_rf[env[lost], 1 - owner] -= rf_counts[lost]
+            occupied_rf[env, owner] += rf_counts
+
+            maps[tiles] |= owner_bit
+
+            # Add area around the planet to the player's visibility mask
+            _add_visibility(visibility_masks, env=env, owner=np.full(len(env), owner), pos_x=center[:, 1],
+                            pos_y=center[:, 0])
+
+
+def _ship_land_interaction(
+    maps: np.ndarray,
+    planets_raster: np.ndarray,
+    planets_occupation_progress: np.ndarray,
+    planets_ongoing_occupation: np.ndarray,
+    ships: ShipTable,
+    active: np.ndarray
+):
+    n_planets = planets_occupation_progress.shape[1]
+
+    # 1st player pushes the occupation progress towards 0, 2nd player towards 100
+    for player, owner_bit, own_progress, enemy_progress, sign in [(0, 64, 0, 100, -1), (1, 128, 100, 0, 1)]:
+        rows = ships.alive_rows(player)
+        rows = rows[active[ships.env[rows]]]
+        env, ship_x, ship_y, hp = ships.env[rows], ships.x[rows], ships.y[rows], ships.hp[rows]
+
+        healed = (maps[env, ship_y, ship_x] & owner_bit == owner_bit) & (hp != 100)
+        ships.hp[rows[healed]] = np.clip(hp[healed] + SHIP_HEALING_SPEED, 1, 100)
+
+        planet_ids = planets_raster[env, ship_y, ship_x].astype(int)
+        landing = planet_ids != -1
+        rows, env, planet_ids = rows[landing], env[landing], planet_ids[landing]
+
+        # The planets' state changes with every landing ship, so the n-th ship landing on every planet
+        # is handled in the n-th pass
+        landing_rank = _get_command_rank(env * n_planets + planet_ids)
+        to_delete = np.zeros(len(rows), dtype=bool)
+        for rank in range(landing_rank.max() + 1 if len(rows) > 0 else 0):
+            selected = np.flatnonzero(landing_rank == rank)
+            planet = env[selected], planet_ids[selected]
+            progress, ongoing = planets_occupation_progress[planet], planets_ongoing_occupation[planet]
+
+            # There is an ongoing fight for the planet, the planet is unoccupied or it belongs to the other player
+            fight = (ongoing != 0) | ~np.isin(progress, [-1, 0, 100])
+            unoccupied = ~fight & (progress == -1)
+            enemy = ~fight & (progress == enemy_progress)
+
+            planets_ongoing_occupation[planet] = ongoing + sign * (fight | enemy)
+            planets_occupation_progress[planet] = np.select([unoccupied, enemy],
+                                                            [own_progress, enemy_progress + sign * OCCUPATION_SPEED],
+                                                            progress)
+            to_delete[selected] = fight | unoccupied | enemy
+
+        ships.remove(rows[to_delete])
+
+
+def _handle_ship_death(
+    ships: ShipTable
+):
+    rows = ships.alive_rows()
+    ships.remove(rows[ships.hp[rows] <= 0])
+
+
+def _handle_visibility(
+    ships: ShipTable,
+    visibility_masks: np.ndarray,
+    active: np.ndarray
+):
+    # Vision is only ever added, so only the ships which moved since the last turn can reveal new tiles
+    rows = ships.pop_moved_rows(envs=active)
+
+    # Ships of one player standing on the same tile add the same vision
+    positions = np.unique(((ships.env[rows].astype(int) * 2 + ships.owner[rows]) * BOARD_SIZE + ships.x[rows])
+                          * BOARD_SIZE + ships.y[rows])
+    _add_visibility(visibility_masks, env=positions // (2 * BOARD_SIZE ** 2), owner=positions // BOARD_SIZE ** 2 % 2,
+                    pos_x=positions // BOARD_SIZE % BOARD_SIZE, pos_y=positions % BOARD_SIZE)
+
+
+def _check_victory_conditions(
+    maps: np.ndarray,
+    planets_centers: np.ndarray
+):
+    """
+    :return: np.ndarray of shape (N, 2), whether the 1st and the 2nd player won the match
+    """
+    env = np.arange(len(maps))
+    player_1_center = planets_centers[:, 0]
+    player_2_center = planets_centers[:, 1]
+    player_1_victory = maps[env, player_2_center[:, 0], player_2_center[:, 1]] & 128 != 128
+    player_2_victory = maps[env, player_1_center[:, 0], player_1_center[:, 1]] & 64 != 64
+    return np.stack([player_1_victory, player_2_victory], axis=1)
+
+
+def _add_visibility(
+    visibility_masks: np.ndarray,
+    env: np.ndarray,
+    owner: np.ndarray,
+    pos_x: np.ndarray,
+    pos_y: np.ndarray
+):
+    """
+    Reveals the tiles around the (pos_x, pos_y) positions to the owners, as game_logic._add_visibility
+    """
+    x = np.asarray(pos_x, dtype=int)[:, None] + VISION_OFFSETS[:, 0]
+    y = np.asarray(pos_y, dtype=int)[:, None] + VISION_OFFSETS[:, 1]
+    inside = (x >= 0) & (x < BOARD_SIZE) & (y >= 0) & (y < BOARD_SIZE)
+    visibility_masks[np.broadcast_to(np.asarray(env)[:, None], x.shape)[inside],
+                     np.broadcast_to(np.asarray(owner)[:, None], x.shape)[inside], x[inside], y[inside]] = True
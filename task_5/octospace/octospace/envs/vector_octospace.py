@@ -0,0 +1,229 @@
+from typing import Any, Optional, Sequence, Tuple
+
+import numpy as np
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space
+
+from octospace.envs.game_config import BOARD_SIZE, MAX_RESOURCES, N_PLANETS, RESOURCE_PRODUCTION_DIVISOR
+from octospace.envs.octospace import OctoSpaceEnv
+from octospace.envs.ship_table import ShipTable
+from octospace.envs.vector_game_logic import (_parse_actions, _decrease_cooldowns, _ship_firing, _ship_movement,
+                                              _ship_construction, _change_ownership_of_planets, _occupation_progress,
+                                              _ship_land_interaction, _handle_ship_death, _handle_visibility,
+                                              _check_victory_conditions)
+
+
+class VectorOctoSpaceEnv(VectorEnv):
+    """
+    Batched engine, which plays N OctoSpace matches in lockstep, without rendering.
+
+    The state of all matches is kept in arrays with a leading env axis and every game phase (see vector_game_logic)
+    handles all matches at once, with the same rules as OctoSpaceEnv (check_vector_env.py compares them):
+        maps: np.ndarray of shape (N, BOARD_SIZE, BOARD_SIZE)
+        visibility_masks: np.ndarray of shape (N, 2, BOARD_SIZE, BOARD_SIZE), [:, 0] - 1st player, [:, 1] - 2nd player
+        ships: ShipTable with the ships of all matches (the env column holds the index of the match)
+        resources, occupied_rf: np.ndarray of shape (N, 2, 4)
+        planets_centers: np.ndarray of shape (N, N_PLANETS + 2, 2)
+        planets_occupation_progress, planets_ongoing_occupation: np.ndarray of shape (N, N_PLANETS + 2)
+
+    New rounds are started by an OctoSpaceEnv per match (it generates the maps and changes the sides the same way
+    as a single env), its state is then copied into the arrays.
+
+    Args:
+        num_envs: number of matches
+        player_1_id, player_2_id, max_steps: same as in OctoSpaceEnv, shared by all matches
+
+    Observation Space:
+        Batched observation space of OctoSpaceEnv - for every player:
+            map: np.ndarray of shape (N, BOARD_SIZE, BOARD_SIZE) with the visibility mask applied
+            allied_ships, enemy_ships, planets_occupation: tuples of N lists, same as in OctoSpaceEnv
+            resources: np.ndarray of shape (N, 4)
+
+    Action Space:
+        A sequence of N actions of OctoSpaceEnv (one dict with the actions of both players per match)
+
+    Rewards are returned as a dict with np.ndarray of shape (N,) for every player. A match is terminated after
+    max_steps turns or when a base gets captured (see OctoSpaceEnv._game_over) and is reset on the next call of step
+    (the actions given for it are ignored, its rewards are 0).
+    """
+
+    metadata = {"render_modes": [], "autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(self,
+                 num_envs: int,
+                 player_1_id: int,
+                 player_2_id: int,
+                 max_steps: int = 1000,
+                 seed: Optional[int] = None
+                 ):
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.render_mode = None
+        self.seed = seed
+
+        self._matches = [OctoSpaceEnv(player_1_id=player_1_id, player_2_id=player_2_id, max_steps=max_steps)
+                         for _ in range(num_envs)]
+
+        self.single_observation_space = self._matches[0].observation_space
+        self.single_action_space = self._matches[0].action_space
+        self.observation_space = batch_space(self.single_observation_space, n=num_envs)
+        self.action_space = batch_space(self.single_action_space, n=num_envs)
+
+        n_planets = N_PLANETS + 2
+        self.maps = np.zeros((num_envs, BOARD_SIZE, BOARD_SIZE), dtype=int)
+        self.visibility_masks = np.zeros((num_envs, 2, BOARD_SIZE, BOARD_SIZE), dtype=bool)
+        self.ships = ShipTable(capacity=64 * num_envs, n_envs=num_envs)
+        self.resources = np.zeros((num_envs, 2, 4), dtype=int)
+        self.occupied_rf = np.zeros((num_envs, 2, 4), dtype=int)
+        self.planets_centers = np.zeros((num_envs, n_planets, 2), dtype=int)
+        self.planets_raster = np.zeros((num_envs, BOARD_SIZE, BOARD_SIZE), dtype=np.int8)
+        self.planets_occupation_progress = np.zeros((num_envs, n_planets), dtype=int)
+        self.planets_ongoing_occupation = np.zeros((num_envs, n_planets), dtype=int)
+        self.turn = np.zeros(num_envs, dtype=int)
+        self.victorious_player = np.zeros((num_envs, 2), dtype=bool)
+
+        # Matches, in which the players have changed sides (player_1_id is the original 2nd player)
+        self._swapped = np.zeros(num_envs, dtype=bool)
+
+        # Matches, which have terminated on the last step and will be reset on the next one
+        self._autoreset = np.zeros(num_envs, dtype=bool)
+
+    def reset(
+        self,
+        *,
+        seed: Optional[int] = None,
+        options: dict[str, Any] = None,
+    ) -> Tuple[dict, dict]:
+        seed = self.seed if seed is None else seed
+        if seed is not None:
+            # Maps are generated with the global numpy generator (see _generate_map)
+            np.random.seed(seed)
+
+        for i in range(self.num_envs):
+            self._reset_env(i)
+        self._autoreset.fill(False)
+
+        return self._get_obs(), {}
+
+    def step(
+        self, actions: Sequence[dict]
+    ) -> Tuple[dict, dict, np.ndarray, np.ndarray, dict]:
+        for i in np.flatnonzero(self._autoreset):
+            self._reset_env(i)
+        active = ~self._autoreset
+        self.turn[active] += 1
+
+        commands, construction = _parse_actions(actions=actions, active=active)
+
+        _decrease_cooldowns(ships=self.ships, active=active)
+
+        _ship_firing(commands=commands, ships=self.ships)
+
+        _ship_movement(maps=self.maps, commands=commands, ships=self.ships)
+
+        _ship_construction(construction=construction, ships=self.ships, resources=self.resources)
+
+        _change_ownership_of_planets(maps=self.maps, planets_centers=self.planets_centers,
+                                     planets_occupation_progress=self.planets_occupation_progress,
+                                     occupied_rf=self.occupied_rf, visibility_masks=self.visibility_masks,
+                                     active=active)
+
+        # Resource production
+        self.resources[active] = np.clip(self.resources[active] + self.occupied_rf[active] // RESOURCE_PRODUCTION_DIVISOR,
+                                         0, MAX_RESOURCES)
+
+        _occupation_progress(planets_occupation_progress=self.planets_occupation_progress,
+                             planets_ongoing_occupation=self.planets_ongoing_occupation, active=active)
+
+        _ship_land_interaction(maps=self.maps, planets_raster=self.planets_raster,
+                               planets_occupation_progress=self.planets_occupation_progress,
+                               planets_ongoing_occupation=self.planets_ongoing_occupation, ships=self.ships,
+                               active=active)
+
+        _handle_ship_death(ships=self.ships)
+
+        _handle_visibility(ships=self.ships, visibility_masks=self.visibility_masks, active=active)
+
+        self.victorious_player[active] = _check_victory_conditions(maps=self.maps,
+                                                                   planets_centers=self.planets_centers)[active]
+
+        rewards = self._get_rewards(active)
+        terminated = active & ((self.turn == self.max_steps) | self.victorious_player.any(axis=1))
+        self._autoreset = terminated.copy()
+
+        return self._get_obs(), rewards, terminated, np.zeros(self.num_envs, dtype=bool), {}
+
+    def _reset_env(self, i: int):
+        match = self._matches[i]
+        match._reset_state()
+
+        # Copy the state of the new round into the arrays
+        self.maps[i] = match._map
+        self.visibility_masks[i, 0] = match._player_1_visibility_mask
+        self.visibility_masks[i, 1] = match._player_2_visibility_mask
+        self.ships.set_state(match._ships.get_state(), env=i)
+        self.resources[i] = [match._player_1_resources, match._player_2_resources]
+        self.occupied_rf[i] = [match._player_1_occupied_rf, match._player_2_occupied_rf]
+        self.planets_centers[i] = match._planets_centers
+        self.planets_raster[i] = match._planets_raster
+        self.planets_occupation_progress[i] = match._planets_occupation_progress
+        self.planets_ongoing_occupation[i] = match._planets_ongoing_occupation
+        self.turn[i] = match.turn
+        self.victorious_player[i] = False
+        self._swapped[i] = match.player_1_id != match.player_1_id_original
+
+    def _get_rewards(self, active: np.ndarray) -> dict:
+        # Same as OctoSpaceEnv._get_reward: a draw after max_steps turns or when both players are victorious,
+        # otherwise the winner (if there is one yet) gets 1
+        draw = (self.turn == self.max_steps) | self.victorious_player.all(axis=1)
+        won = np.where(self._swapped[:, None], self.victorious_player[:, ::-1], self.victorious_player)
+        rewards = np.where(draw[:, None], 0.5, won.astype(float)) * active[:, None]
+        return {"player_1": rewards[:, 0], "player_2": rewards[:, 1]}
+
+    def _get_obs(self) -> dict:
+        # Same as OctoSpaceEnv._get_obs, the maps of all matches are masked at once
+        maps = np.where(self.visibility_masks, self.maps[:, None], -1)
+
+        # Alive ships grouped by match, in construction order within every match
+        ships = self.ships
+        rows = ships.alive_rows()
+        rows = rows[np.argsort(ships.env[rows], kind="stable")]
+        env, owner, ship_x, ship_y = ships.env[rows], ships.owner[rows], ships.x[rows], ships.y[rows]
+
+        envs = np.arange(self.num_envs)
+        planets_centers = self.planets_centers.tolist()
+        planets_occupation_progress = self.planets_occupation_progress.tolist()
+
+        obs = {}
+        for player, player_owner in [("player_1", 0), ("player_2", 1)]:
+            visible = self.visibility_masks[env, player_owner, ship_x, ship_y]
+            allied_ships = self._split_ships(rows[owner == player_owner], env[owner == player_owner])
+            enemy_ships = self._split_ships(rows[(owner != player_owner) & visible],
+                                            env[(owner != player_owner) & visible])
+
+            visible_planets = self.visibility_masks[envs[:, None], player_owner, self.planets_centers[:, :, 1],
+                                                    self.planets_centers[:, :, 0]].tolist()
+            planets_occupation = tuple(
+                [(planet_x, planet_y, occupation) for (planet_x, planet_y), occupation, planet_visible in
+                 zip(planets_centers[i], planets_occupation_progress[i], visible_planets[i]) if planet_visible]
+                for i in range(self.num_envs)
+            )
+
+            obs[player] = {
+                "map": maps[:, player_owner],
+                "allied_ships": allied_ships,
+                "enemy_ships": enemy_ships,
+                "planets_occupation": planets_occupation,
+                "resources": self.resources[:, player_owner].copy()
+            }
+        return obs
+
+    def _split_ships(self, rows: np.ndarray, env: np.ndarray) -> tuple:
+        # Rows are grouped by match, so the list view of every match is a slice of the list view of all rows
+        ships = self.ships.as_list(rows)
+        ends = np.cumsum(np.bincount(env, minlength=self.num_envs)).tolist()
+        return tuple(ships[start:end] for start, end in zip([0] + ends[:-1], ends))
+
+    def close_extras(self, **kwargs):
+        for match in self._matches:
+            match.close()
@@ -0,0 +1,142 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from data import load_data_from_single_match, load_data_from_trajectory
+from dataset import SHARDS_MANIFEST_FILE, compute_training_arrays, save_training_arrays
+from trajectory import TRAJECTORY_SUFFIX
+
+
+"""
+Przyrostowe przygotowanie danych treningowych: każda rozgrywka z folderów z zapisami (np. saves, saves_choco)
+trafia do osobnego fragmentu (folder z plikami .npy czytany przez MemmapOctoSpaceDataset) w folderze wyjściowym.
+
+Folder wyjściowy zawiera manifest.json:
+    {"max_ships": 10, "max_planets": 8,
+     "matches": {"/home/.../saves_choco/2025-03-15_19-39-44": {"signature": [...], "shard": "...", "n_samples": 698},
+                 ...}}
+Kluczem rozgrywki jest jej pełna ścieżka, więc foldery z zapisami o tej samej nazwie (np. dwa foldery saves)
+nie kolidują.
+Przy kolejnym uruchomieniu przetwarzane są tylko nowe rozgrywki i te, których sygnatura (rozmiar i czas modyfikacji)
+się zmieniła. Dane ze wszystkich fragmentów wczytuje dataset.create_sharded_dataset.
+"""
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description='Preprocess recorded matches into training shards')
+    parser.add_argument('output_path', type=str, help='Folder with the training shards and the manifest')
+    parser.add_argument('saves_paths', type=str, nargs='+', help='Folders with recorded matches')
+    parser.add_argument('--num_workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--max_ships', type=int, default=10, help='Number of ships in the features')
+    parser.add_argument('--max_planets', type=int, default=8, help='Number of planets in the features')
+    return parser
+
+
+def find_matches(saves_path: Path):
+    """
+    Rozgrywki w folderze z zapisami: podfoldery (zapis JSON) i pliki .octo (TrajectoryRecorder).
+    """
+    return sorted(path for path in saves_path.iterdir() if path.is_dir() or path.suffix == TRAJECTORY_SUFFIX)
+
+
+def get_match_signature(match_path: Path):
+    # Dodanie kroku do zapisu JSON zmienia czas modyfikacji folderu, dopisanie do pliku .octo - jego rozmiar
+    stat = match_path.stat()
+    return [stat.st_size if match_path.is_file() else 0, stat.st_mtime_ns]
+
+
+def get_shard_name(key: str) -> str:
+    # Nazwa czytelna (folder i rozgrywka) z krótkim skrótem pełnej ścieżki, żeby była unikalna
+    match_path = Path(key)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:8]
+    return f"{match_path.parent.name}__{match_path.name.removesuffix(TRAJECTORY_SUFFIX)}__{digest}"
+
+
+def preprocess_match(match_path: Path, shard_path: Path, max_ships: int, max_planets: int):
+    """
+    Przetwarza jedną rozgrywkę do fragmentu shard_path. Fragment zapisujemy do folderu tymczasowego i podmieniamy
+    na końcu, żeby przerwane przetwarzanie nie zostawiło niepełnych danych. Zwraca liczbę próbek.
+    """
+    if match_path.is_dir():
+        observations, actions, _ = load_data_from_single_match(match_path)
+    else:
+        observations, actions, _ = load_data_from_trajectory(match_path)
+    arrays = compute_training_arrays(observations, actions, max_ships=max_ships, max_planets=max_planets)
+
+    tmp_path = shard_path.with_name(shard_path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    save_training_arrays(tmp_path, arrays)
+    shutil.rmtree(shard_path, ignore_errors=True)
+    tmp_path.rename(shard_path)
+    return len(arrays["features"])
+
+
+def save_manifest(output_path: Path, manifest: dict):
+    tmp_file = output_path / (SHARDS_MANIFEST_FILE + ".tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(manifest, f, indent=2)
+    tmp_file.replace(output_path / SHARDS_MANIFEST_FILE)
+
+
+def preprocess_all_matches(output_path, saves_paths, num_workers=None, max_ships=10, max_planets=8):
+    """
+    Przetwarza w num_workers procesach wszystkie rozgrywki z folderów saves_paths, których nie ma jeszcze
+    w manifeście folderu output_path (albo które zmieniły się od ostatniego przetworzenia).
+    Manifest jest zapisywany po każdej rozgrywce, więc przerwane przetwarzanie można wznowić.
+    Zwraca manifest.
+    """
+    output_path = Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    manifest_file = output_path / SHARDS_MANIFEST_FILE
+    if manifest_file.exists():
+        with open(manifest_file, "r") as f:
+            manifest = json.load(f)
+        if (manifest["max_ships"], manifest["max_planets"]) != (max_ships, max_planets):
+            raise ValueError(f"Fragmenty w {output_path} mają inne parametry cech: max_ships={manifest['max_ships']}, "
+                             f"max_planets={manifest['max_planets']}")
+    else:
+        manifest = {"max_ships": max_ships, "max_planets": max_planets, "matches": {}}
+
+    pending = {}
+    for saves_path in map(Path, saves_paths):
+        for match_path in find_matches(saves_path):
+            key = str(match_path.resolve())
+            signature = get_match_signature(match_path)
+            if manifest["matches"].get(key, {}).get("signature") != signature:
+                pending[key] = (match_path, signature)
+
+    print(f"Rozgrywki do przetworzenia: {len(pending)}, już przetworzone: {len(manifest['matches'])}")
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = {}
+        for key, (match_path, signature) in pending.items():
+            shard = get_shard_name(key)
+            future = executor.submit(preprocess_match, match_path, output_path / shard, max_ships, max_planets)
+            futures[future] = (key, shard, signature)
+
+        for future in as_completed(futures):
+            key, shard, signature = futures[future]
+            try:
+                n_samples = future.result()
+            except Exception as e:
+                print(f"  Błąd przy przetwarzaniu rozgrywki {key}: {e}")
+                continue
+
+            manifest["matches"][key] = {"signature": signature, "shard": shard, "n_samples": n_samples}
+            save_manifest(output_path, manifest)
+            print(f"  [{key}] {n_samples} próbek")
+
+    total = sum(match["n_samples"] for match in manifest["matches"].values())
+    print(f"Łącznie {total} próbek z {len(manifest['matches'])} rozgrywek w {output_path}")
+    return manifest
+
+
+if __name__ == '__main__':
+    args = get_parser().parse_args()
+    preprocess_all_matches(args.output_path, args.saves_paths, num_workers=args.num_workers,
+                           max_ships=args.max_ships, max_planets=args.max_planets)
@@ -6,6 +6,7 @@ from importlib.machinery import SourceFileLoader
 
 from matches_config import TEAMS
 from simulation import simulate_game
+from timed_agent import save_timing_report
 
 
 
@@ -17,6 +18,10 @@ def get_parser():
     parser.add_argument('--verbose', action='store_true', help='Print additional information')
     parser.add_argument('--render_mode', type=str, default=None, help='Render mode')
     parser.add_argument('--turn_on_music', type=bool, default=False, help='Music')
+    parser.add_argument('--action_time_budget', type=float, default=None,
+                        help='Time limit of get_action in seconds, slower actions are replaced with no-op')
+    parser.add_argument('--agents_in_processes', action='store_true', help='Run each agent in a separate process')
+    parser.add_argument('--timing_report', type=str, default=None, help="Path to the JSON file with agents' timings")
     return parser
 
 
@@ -27,7 +32,10 @@ def run_match(
         agent_2_path: str,
         render_mode: str = None,
         verbose: bool = False,
-        turn_on_music: bool = False
+        turn_on_music: bool = False,
+        action_time_budget: float = None,
+        timing_report_path: str = None,
+        agents_in_processes: bool = False
 ):
     # Disable warnings in the gym
     if not verbose:
@@ -39,11 +47,21 @@ def run_match(
     agent_1 = SourceFileLoader('agent_1', agent_1_path).load_module()
     agent_2 = SourceFileLoader('agent_2', agent_2_path).load_module()
 
-    score = simulate_game(player_1_id=player_1_id, player_2_id=player_2_id, player_1_agent_class=agent_1.Agent,
-                            player_2_agent_class=agent_2.Agent, n_games=n_matches,
-                            render_mode=render_mode, verbose=False, turn_on_music=turn_on_music)
+    score, timing = simulate_game(player_1_id=player_1_id, player_2_id=player_2_id, player_1_agent_class=agent_1.Agent,
+                                  player_2_agent_class=agent_2.Agent, n_games=n_matches,
+                                  render_mode=render_mode, verbose=False, turn_on_music=turn_on_music,
+                                  action_time_budget=action_time_budget, return_timing=True,
+                                  agents_in_processes=agents_in_processes)
 
     print(f'{TEAMS[player_1_id]} vs {TEAMS[player_2_id]}: {score}')
+    for player, agent_path in [("player_1", agent_1_path), ("player_2", agent_2_path)]:
+        stats = timing[player]
+        print(f'{agent_path} get_action: p50 {stats.get("p50_ms", 0):.2f} ms, p95 {stats.get("p95_ms", 0):.2f} ms, '
+              f'p99 {stats.get("p99_ms", 0):.2f} ms, over budget {stats["over_budget"]}/{stats["n_calls"]}')
+
+    if timing_report_path is not None:
+        save_timing_report(timing_report_path, {"player_1": {"agent": agent_1_path, **timing["player_1"]},
+                                                "player_2": {"agent": agent_2_path, **timing["player_2"]}})
 
 
 if __name__ == '__main__':
@@ -51,7 +69,9 @@ if __name__ == '__main__':
     args = parse.parse_args()
 
     run_match(n_matches=args.n_matches, agent_1_path=args.path_to_agent_1, agent_2_path=args.path_to_agent_2,
-              verbose=args.verbose, render_mode=args.render_mode, turn_on_music=args.turn_on_music)
+              verbose=args.verbose, render_mode=args.render_mode, turn_on_music=args.turn_on_music,
+              action_time_budget=args.action_time_budget, timing_report_path=args.timing_report,
+              agents_in_processes=args.agents_in_processes)
 
     """
     Example execution:
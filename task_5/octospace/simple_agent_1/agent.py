@@ -1,13 +1,19 @@
+import numpy as np
 import torch
-from feature_extraction import extract_features
+from feature_extraction import extract_features_batch
+from simple_agent_1.inference import EagerBackend, select_backend
 from simple_agent_1.simple_agent import SimpleAgent
 
+INPUT_DIM = 55
+
 
 class Agent:
     def __init__(self, player_id):
         self.device = torch.device("cpu")
-        self.model = SimpleAgent(input_dim=55, hidden_dim=128)
+        self.model = SimpleAgent(input_dim=INPUT_DIM, hidden_dim=128)
         self.model.to(self.device)
+        self.backend = EagerBackend(self.model, INPUT_DIM, device=self.device)
+        self._backend_weights = self._copy_weights()
 
     def get_action(self, obs: dict) -> dict:
         """
@@ -15,42 +21,71 @@ class Agent:
         i zwraca akcję w formacie:
           { "ships_actions": [(ship_id, action_type, direction, speed)], "construction": construction_value }
         """
-        features = extract_features(obs, max_ships=10, max_planets=8)
-        features = features.unsqueeze(0)  # dodajemy wymiar batch
-        features = features.to(self.device)
-        self.model.eval()
-        with torch.no_grad():
-            at_logits, dir_logits, spd_logits, constr_logits = self.model(features)
-
-        action_type = torch.argmax(at_logits, dim=1).item()
-        direction = torch.argmax(dir_logits, dim=1).item()
-        if action_type == 0:  # move
-            speed_label = torch.argmax(spd_logits, dim=1).item()
-            speed = speed_label + 1
-        else:
-            speed = 0
+        return self.get_actions_batch([obs])[0]
 
-        construction = torch.argmax(constr_logits, dim=1).item()
+    def get_actions_batch(self, observations: list) -> list:
+        """
+        Akcje (w formacie get_action) dla listy obserwacji, np. z wielu równoległych gier -
+        cechy wszystkich obserwacji są liczone razem i model wykonuje jedno przejście dla całego batcha.
+        """
+        features = extract_features_batch(observations, max_ships=10, max_planets=8)
+        at_logits, dir_logits, spd_logits, constr_logits = self.backend(features)
 
-        if len(obs.get("allied_ships", [])) > 0:
-            ship_id = obs["allied_ships"][0][0]
-        else:
-            ship_id = 0
+        action_types = np.argmax(at_logits, axis=1).tolist()
+        directions = np.argmax(dir_logits, axis=1).tolist()
+        speed_labels = np.argmax(spd_logits, axis=1).tolist()
+        constructions = np.argmax(constr_logits, axis=1).tolist()
+
+        actions = []
+        for obs, action_type, direction, speed_label, construction in zip(observations, action_types, directions,
+                                                                         speed_labels, constructions):
+            # move - prędkość z głowicy speed, fire - prędkość 0
+            speed = speed_label + 1 if action_type == 0 else 0
 
-        return {
-            "ships_actions": [(ship_id, action_type, direction, speed)],
-            "construction": construction
-        }
+            if len(obs.get("allied_ships", [])) > 0:
+                ship_id = obs["allied_ships"][0][0]
+            else:
+                ship_id = 0
+
+            actions.append({
+                "ships_actions": [(ship_id, action_type, direction, speed)],
+                "construction": construction
+            })
+        return actions
 
     def load(self, abs_path: str):
         from pathlib import Path
         weight_path = Path(abs_path) / "agent_weights.pth"
         self.model.load_state_dict(torch.load(weight_path, map_location=self.device))
-        print("Wagi zostały załadowane.")
+        self._update_backend()
+        print(f"Wagi zostały załadowane (backend: {self.backend.name}).")
+
+    def _copy_weights(self) -> list:
+        return [parameter.detach().clone() for parameter in self.model.parameters()]
+
+    def _update_backend(self):
+        # ONNX i TorchScript działają tylko na CPU - na GPU zostaje eager
+        if self.device.type == "cpu":
+            self.backend = select_backend(self.model, INPUT_DIM)
+        else:
+            self.backend = EagerBackend(self.model, INPUT_DIM, device=self.device)
+        self._backend_weights = self._copy_weights()
 
     def eval(self):
+        """
+        Backendy ONNX i TorchScript liczą na kopii wag z chwili wyboru backendu (load, to), więc po zmianie
+        self.model (np. po treningu) trzeba wywołać eval() - backend jest wtedy wybierany ponownie.
+        """
         self.model.eval()
+        if any(not torch.equal(parameter, weights)
+               for parameter, weights in zip(self.model.parameters(), self._backend_weights)):
+            self._update_backend()
 
     def to(self, device):
+        # Backend wybieramy ponownie tylko przy zmianie urządzenia (simulation.get_agent wywołuje to po load)
+        device = torch.device(device)
+        if device == self.device:
+            return
         self.device = device
-        self.model.to(device)
+        self.model.to(self.device)
+        self._update_backend()
@@ -0,0 +1,167 @@
+import io
+import time
+import warnings
+
+import numpy as np
+import torch
+
+
+"""
+Backendy inferencji SimpleAgent na CPU: eager PyTorch, TorchScript i ONNX Runtime.
+
+Każdy backend przyjmuje cechy (N, input_dim) jako np.ndarray float32 i zwraca listę logitów czterech głowic
+(np.ndarray). Cechy są kopiowane do bufora wejściowego alokowanego raz (i powiększanego tylko dla większego batcha),
+a model jest przełączany w tryb eval przy tworzeniu backendu, nie przy każdym wywołaniu.
+select_backend mierzy czas wywołania dostępnych backendów i wybiera najszybszy.
+"""
+BACKENDS = ("onnx", "torchscript", "eager")
+
+OUTPUT_NAMES = ["action", "direction", "speed", "construction"]
+
+
+def export_torchscript(model, input_dim: int, path=None):
+    """
+    Eksportuje model do TorchScript (torch.jit.trace). Zwraca ScriptModule, a jeśli podano path - zapisuje go też
+    do pliku (wczytanie: torch.jit.load).
+    """
+    model.eval()
+    # Nowe wersje torcha oznaczają torch.jit.trace jako przestarzały - ostrzeżenie przy każdym wczytaniu agenta
+    # nic nie wnosi
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        script_module = torch.jit.trace(model, torch.zeros(1, input_dim))
+    if path is not None:
+        script_module.save(str(path))
+    return script_module
+
+
+def export_onnx(model, input_dim: int, path=None) -> bytes:
+    """
+    Eksportuje model do ONNX ze zmiennym rozmiarem batcha (wejście "features", wyjścia OUTPUT_NAMES).
+    Zwraca model ONNX jako bytes, a jeśli podano path - zapisuje go też do pliku.
+    """
+    model.eval()
+    buffer = io.BytesIO()
+    torch.onnx.export(model, (torch.zeros(1, input_dim),), buffer, input_names=["features"],
+                      output_names=OUTPUT_NAMES, dynamic_axes={"features": {0: "batch"}}, dynamo=False)
+    onnx_model = buffer.getvalue()
+    if path is not None:
+        with open(path, "wb") as f:
+            f.write(onnx_model)
+    return onnx_model
+
+
+class _TorchBackend:
+    def __init__(self, module, input_dim: int, device=torch.device("cpu")):
+        self.module = module
+        self.input_dim = input_dim
+        self.device = torch.device(device)
+        self._allocate(1)
+
+    def _allocate(self, batch_size: int):
+        self._buffer = torch.zeros((batch_size, self.input_dim), dtype=torch.float32, device=self.device)
+        # Na CPU kopiujemy cechy bezpośrednio do pamięci tensora
+        self._buffer_np = self._buffer.numpy() if self.device.type == "cpu" else None
+
+    def __call__(self, features: np.ndarray) -> list:
+        n = len(features)
+        if n > len(self._buffer):
+            self._allocate(n)
+        if self._buffer_np is not None:
+            np.copyto(self._buffer_np[:n], features)
+        else:
+            self._buffer[:n].copy_(torch.from_numpy(features))
+
+        with torch.inference_mode():
+            logits = self.module(self._buffer[:n])
+        return [head.cpu().numpy() for head in logits]
+
+
+class EagerBackend(_TorchBackend):
+    name = "eager"
+
+    def __init__(self, model, input_dim: int, device=torch.device("cpu")):
+        model.eval()
+        super().__init__(model, input_dim, device=device)
+
+
+class TorchScriptBackend(_TorchBackend):
+    name = "torchscript"
+
+    def __init__(self, model, input_dim: int):
+        super().__init__(export_torchscript(model, input_dim), input_dim)
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, model, input_dim: int):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        # Tyle wątków, ile ma torch w tym procesie (np. 1 w procesach turnieju)
+        options.intra_op_num_threads = torch.get_num_threads()
+        self.session = onnxruntime.InferenceSession(export_onnx(model, input_dim), sess_options=options,
+                                                    providers=["CPUExecutionProvider"])
+        self.input_dim = input_dim
+        self._buffer = np.zeros((1, input_dim), dtype=np.float32)
+
+    def __call__(self, features: np.ndarray) -> list:
+        n = len(features)
+        if n > len(self._buffer):
+            self._buffer = np.zeros((n, self.input_dim), dtype=np.float32)
+        np.copyto(self._buffer[:n], features)
+        return self.session.run(OUTPUT_NAMES, {"features": self._buffer[:n]})
+
+
+_BACKEND_CLASSES = {"eager": EagerBackend, "torchscript": TorchScriptBackend, "onnx": OnnxBackend}
+
+
+def create_backend(name: str, model, input_dim: int):
+    """
+    Tworzy backend o nazwie name (jedna z BACKENDS) dla wag modelu z chwili wywołania.
+    """
+    return _BACKEND_CLASSES[name](model, input_dim)
+
+
+def time_backend(backend, features: np.ndarray, n_calls: int = 100, warmup: int = 10) -> np.ndarray:
+    """
+    Czasy (w sekundach) n_calls kolejnych wywołań backendu dla cech features.
+    """
+    for _ in range(warmup):
+        backend(features)
+    times = np.zeros(n_calls)
+    for i in range(n_calls):
+        start = time.perf_counter()
+        backend(features)
+        times[i] = time.perf_counter() - start
+    return times
+
+
+def select_backend(model, input_dim: int, backends=BACKENDS, n_calls: int = 50, verbose: bool = False):
+    """
+    Tworzy dostępne backendy z listy backends i zwraca ten z najmniejszą medianą czasu wywołania dla jednej
+    obserwacji. Backend, którego nie da się utworzyć (np. brak onnxruntime) albo którego wyniki różnią się
+    od modelu eager, jest pomijany - eager jest zawsze dostępny jako ostatnia możliwość.
+    """
+    features = np.random.default_rng(0).random((1, input_dim), dtype=np.float32)
+    eager = EagerBackend(model, input_dim)
+    expected = eager(features)
+
+    best, best_time = eager, None
+    for name in backends:
+        try:
+            backend = eager if name == "eager" else create_backend(name, model, input_dim)
+            if not all(np.allclose(out, exp, atol=1e-5) for out, exp in zip(backend(features), expected)):
+                raise ValueError("wyniki różnią się od modelu eager")
+        except Exception as e:
+            if verbose:
+                print(f"Backend {name} niedostępny: {e}")
+            continue
+
+        median = float(np.median(time_backend(backend, features, n_calls=n_calls)))
+        if verbose:
+            print(f"Backend {name}: {median * 1e6:.1f} us/wywołanie")
+        if best_time is None or median < best_time:
+            best, best_time = backend, median
+    return best
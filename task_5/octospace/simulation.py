@@ -1,8 +1,10 @@
+import contextlib
 from pathlib import Path
 
 import gymnasium as gym
 import numpy as np
 import os
+import random
 import torch
 
 # Don't delete this! It allows the environment to be registered
@@ -11,20 +13,53 @@ import pygame
 
 from dummy_agent import Agent
 import datetime
-from data import save_training_data_separately
+from agent_process import ProcessAgent
+from octospace.envs import VectorOctoSpaceEnv
+from timed_agent import TimedAgent
+from trajectory import BackgroundTrajectoryRecorder, get_recording_path
 
 
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 
-def setup_agent(agent_class: Agent.__class__, player_id: int):
+# Wczytani agenci: (klasa agenta, player_id, folder z wagami) -> (sygnatura plików z wagami, agent)
+_AGENTS_CACHE = {}
+
+
+def setup_agent(agent_class: Agent.__class__, player_id: int, weights_path: str = None):
     agent = agent_class(player_id=player_id)
-    agent.load(os.path.abspath(f"agents/{player_id}/"))
+    agent.load(os.path.abspath(weights_path or f"agents/{player_id}/"))
     agent.to(DEVICE)
     agent.eval()
     return agent
 
 
+def _get_weights_signature(weights_path: str):
+    # Nadpisanie pliku z wagami nie zmienia czasu modyfikacji folderu, więc sprawdzamy każdy plik
+    return tuple(sorted((str(path), path.stat().st_mtime_ns) for path in Path(weights_path).rglob("*") if path.is_file()))
+
+
+def get_agent(agent_class: Agent.__class__, player_id: int, weights_path: str = None):
+    """
+    Zwraca agenta przygotowanego przez setup_agent, wczytanego tylko raz w danym procesie. Agent jest tworzony
+    i wczytywany ponownie dopiero wtedy, gdy zmieni się któryś z plików w jego folderze z wagami.
+    """
+    weights_path = os.path.abspath(weights_path or f"agents/{player_id}/")
+    key = (agent_class, player_id, weights_path)
+    signature = _get_weights_signature(weights_path)
+
+    if key not in _AGENTS_CACHE or _AGENTS_CACHE[key][0] != signature:
+        _AGENTS_CACHE[key] = (signature, setup_agent(agent_class=agent_class, player_id=player_id,
+                                                     weights_path=weights_path))
+    return _AGENTS_CACHE[key][1]
+
+
+def reset_agent(agent):
+    # Agent może mieć stan z poprzedniej gry - opcjonalna metoda reset() przygotowuje go do nowej gry
+    if hasattr(agent, "reset"):
+        agent.reset()
+
+
 def simulate_game(
     player_1_id: int,
     player_2_id: int,
@@ -34,16 +69,48 @@ def simulate_game(
     render_mode: str = "human",
     verbose: bool = False,
     turn_on_music: bool = False,
+    player_1_weights_path: str = None,
+    player_2_weights_path: str = None,
+    seed: int = None,
+    record: bool = True,
+    action_time_budget: float = None,
+    return_timing: bool = False,
+    agents_in_processes: bool = False,
 ):
+    """
+    Rozgrywa mecz n_games gier między agentami i zwraca sumę nagród obu graczy.
+    Wagi agentów są wczytywane z player_X_weights_path (domyślnie agents/<player_id>/) tylko raz w procesie
+    (patrz get_agent), a przed każdą grą wywoływana jest opcjonalna metoda reset() agenta.
+    seed ustala mapy wszystkich gier, a record=False wyłącza zapis rozgrywki do folderu saves.
+    Czas get_action obu agentów jest mierzony (TimedAgent) - akcja liczona dłużej niż action_time_budget sekund
+    jest zastępowana akcją pustą. Z return_timing=True zwraca (wynik, statystyki czasu obu graczy).
+    Z agents_in_processes=True każdy agent działa w osobnym procesie (ProcessAgent) - agenci liczą akcje równolegle,
+    a awaria agenta nie przerywa meczu.
+    """
     if not verbose:
         gym.logger.min_level = 40
 
     env = gym.make('OctoSpace-v0', player_1_id=player_1_id, player_2_id=player_2_id, max_steps=1000,
                    render_mode=render_mode, turn_on_music=turn_on_music, volume=0.1)
+    if seed is not None:
+        # Mapy są generowane globalnym generatorem numpy (patrz OctoSpaceEnv._generate_map)
+        np.random.seed(seed)
+        random.seed(seed)
+        torch.manual_seed(seed)
     obs, info = env.reset()
 
-    agent_1 = setup_agent(agent_class=player_1_agent_class, player_id=player_1_id)
-    agent_2 = setup_agent(agent_class=player_2_agent_class, player_id=player_2_id)
+    if agents_in_processes:
+        agent_1 = ProcessAgent(agent_class=player_1_agent_class, player_id=player_1_id,
+                               weights_path=player_1_weights_path, time_budget=action_time_budget)
+        agent_2 = ProcessAgent(agent_class=player_2_agent_class, player_id=player_2_id,
+                               weights_path=player_2_weights_path, time_budget=action_time_budget)
+    else:
+        agent_1 = TimedAgent(get_agent(agent_class=player_1_agent_class, player_id=player_1_id,
+                                       weights_path=player_1_weights_path), time_budget=action_time_budget)
+        agent_2 = TimedAgent(get_agent(agent_class=player_2_agent_class, player_id=player_2_id,
+                                       weights_path=player_2_weights_path), time_budget=action_time_budget)
+    reset_agent(agent_1)
+    reset_agent(agent_2)
 
     terminated = False
     reward = {}
@@ -56,40 +123,121 @@ def simulate_game(
     current_time = datetime.datetime.now()
 
     # Sformatuj datę i godzinę w odpowiedni sposób
-    base_path = Path("saves") / current_time.strftime("%Y-%m-%d_%H-%M-%S")
-    base_path.mkdir(parents=True, exist_ok=False)
-    step = 0
-
-    while curr_round / 2 != n_games:
-        if terminated or sum(reward.values()) != 0:
-            curr_round += 1
-            score += np.array(list(reward.values()))
-            obs, info = env.reset()
-            agent_1 = setup_agent(agent_class=player_1_agent_class, player_id=player_1_id)
-            agent_2 = setup_agent(agent_class=player_2_agent_class, player_id=player_2_id)
-
-        env.render()
-
-        action_1 = agent_1.get_action(obs["player_1"])
-        action_2 = agent_2.get_action(obs["player_2"])
-
-        path = base_path / f"{step}"
-
-        obs, reward, terminated, _, info = env.step(
-            {
-                "player_1": action_1,
-                "player_2": action_2
-            }
-        )
-        save_training_data_separately(obs["player_2"], action_2, reward, path)
+    # Cały mecz trafia do jednego pliku: obserwacje i akcje gracza 2 oraz nagrody obu graczy,
+    # mapy są zapisywane różnicowo z pełną mapą co 32 kroki. Plik zapisuje osobny wątek, więc dysk nie spowalnia gry
+    recorder = None
+    if record:
+        recording_path = get_recording_path("saves", current_time.strftime("%Y-%m-%d_%H-%M-%S"))
+        recorder = BackgroundTrajectoryRecorder(recording_path,
+                                                meta={"player_1_id": player_1_id, "player_2_id": player_2_id,
+                                                      "recorded_player": "player_2"},
+                                                keyframe_interval=32)
+
+    with contextlib.ExitStack() as stack:
+        if recorder is not None:
+            stack.enter_context(recorder)
+        if agents_in_processes:
+            stack.callback(agent_1.close)
+            stack.callback(agent_2.close)
+
+        while curr_round / 2 != n_games:
+            if terminated or sum(reward.values()) != 0:
+                curr_round += 1
+                score += np.array(list(reward.values()))
+                if recorder is not None:
+                    recorder.end_episode()
+                obs, info = env.reset()
+                reset_agent(agent_1)
+                reset_agent(agent_2)
+
+            env.render()
+
+            # Najpierw obie obserwacje, potem obie akcje - agenci w osobnych procesach liczą je jednocześnie
+            agent_1.send_observation(obs["player_1"])
+            agent_2.send_observation(obs["player_2"])
+            action_1 = agent_1.receive_action()
+            action_2 = agent_2.receive_action()
+
+            obs, reward, terminated, _, info = env.step(
+                {
+                    "player_1": action_1,
+                    "player_2": action_2
+                }
+            )
+            if recorder is not None:
+                recorder.add_step(obs["player_2"], action_2, reward, round_id=curr_round)
+
+            if render_mode is not None:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        timing = {"player_1": agent_1.get_stats(), "player_2": agent_2.get_stats()}
+                        return (-1, timing) if return_timing else -1
+
+    if verbose and recorder is not None:
+        print(f"Zapis rozgrywki: {recorder.stats}")
+
+    if return_timing:
+        return score, {"player_1": agent_1.get_stats(), "player_2": agent_2.get_stats()}
+    return score
 
-        if render_mode is not None:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return -1
 
-        step += 1
+def get_actions(agent, observations: list) -> list:
+    """
+    Akcje agenta dla listy obserwacji - jednym wywołaniem get_actions_batch, jeśli agent je ma.
+    """
+    if hasattr(agent, "get_actions_batch"):
+        return agent.get_actions_batch(observations)
+    return [agent.get_action(obs) for obs in observations]
 
-    return score
+
+def _split_observations(observations: dict, num_envs: int) -> list:
+    # Obserwacja VectorOctoSpaceEnv jednego gracza -> lista obserwacji w formacie OctoSpaceEnv, po jednej na grę
+    return [{name: values[i] for name, values in observations.items()} for i in range(num_envs)]
 
 
+def simulate_vector_games(
+    player_1_id: int,
+    player_2_id: int,
+    player_1_agent_class: Agent.__class__,
+    player_2_agent_class: Agent.__class__,
+    n_games: int = 8,
+    num_envs: int = 8,
+    player_1_weights_path: str = None,
+    player_2_weights_path: str = None,
+    seed: int = None,
+):
+    """
+    Rozgrywa n_games gier na VectorOctoSpaceEnv, po num_envs naraz (bez renderowania i zapisu), i zwraca sumę nagród
+    obu graczy. W każdej turze agent dostaje obserwacje wszystkich gier w jednym wywołaniu (patrz get_actions),
+    więc może policzyć akcje jednym przejściem modelu. Jeden agent gra wszystkie gry - reset() jest wywoływany
+    tylko na początku. Gra kończy się zdobyciem bazy albo po limicie tur, tak jak w simulate_game
+    (sprawdzenie: check_vector_games.py).
+    """
+    envs = VectorOctoSpaceEnv(num_envs=num_envs, player_1_id=player_1_id, player_2_id=player_2_id, max_steps=1000)
+    if seed is not None:
+        random.seed(seed)
+        torch.manual_seed(seed)
+    obs, info = envs.reset(seed=seed)
+
+    agent_1 = get_agent(agent_class=player_1_agent_class, player_id=player_1_id, weights_path=player_1_weights_path)
+    agent_2 = get_agent(agent_class=player_2_agent_class, player_id=player_2_id, weights_path=player_2_weights_path)
+    reset_agent(agent_1)
+    reset_agent(agent_2)
+
+    score = np.array([0, 0], dtype=float)
+    finished_games = 0
+    while finished_games < n_games:
+        actions_1 = get_actions(agent_1, _split_observations(obs["player_1"], num_envs))
+        actions_2 = get_actions(agent_2, _split_observations(obs["player_2"], num_envs))
+
+        obs, rewards, terminated, _, info = envs.step(
+            [{"player_1": action_1, "player_2": action_2} for action_1, action_2 in zip(actions_1, actions_2)]
+        )
+
+        # Zakończone gry są restartowane w następnym kroku - liczymy tylko pierwsze n_games
+        for i in np.flatnonzero(terminated)[:n_games - finished_games]:
+            score += [rewards["player_1"][i], rewards["player_2"][i]]
+            finished_games += 1
+
+    envs.close()
+    return score
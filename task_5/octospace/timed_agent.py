@@ -0,0 +1,83 @@
+import json
+import time
+
+import numpy as np
+
+
+def get_noop_action() -> dict:
+    """
+    Akcja, która nic nie robi - wykonywana zamiast akcji agenta, który przekroczył limit czasu.
+    """
+    return {"ships_actions": [], "construction": 0}
+
+
+class TimedAgent:
+    """
+    Nakładka na agenta, która mierzy czas każdego wywołania get_action.
+
+    Jeśli podano time_budget (w sekundach), a get_action trwało dłużej, akcja agenta jest odrzucana i zamiast niej
+    zwracana jest akcja pusta (get_noop_action). Agent działa w tym samym procesie, więc nie da się go przerwać -
+    przekroczenie limitu sprawdzamy po zakończeniu wywołania. Pozostałe metody (load, reset, to, ...)
+    są przekazywane do agenta.
+    """
+
+    def __init__(self, agent, time_budget: float = None):
+        self.agent = agent
+        self.time_budget = time_budget
+        self.latencies = []
+        self.over_budget = 0
+        self._obs = None
+
+    def get_action(self, obs: dict) -> dict:
+        start = time.perf_counter()
+        action = self.agent.get_action(obs)
+        latency = time.perf_counter() - start
+
+        self.latencies.append(latency)
+        if self.time_budget is not None and latency > self.time_budget:
+            self.over_budget += 1
+            return get_noop_action()
+        return action
+
+    def __getattr__(self, name):
+        return getattr(self.agent, name)
+
+    def send_observation(self, obs: dict):
+        # Ten sam interfejs co ProcessAgent (agent_process.py) - tutaj akcja jest liczona dopiero w receive_action
+        self._obs = obs
+
+    def receive_action(self) -> dict:
+        if self._obs is None:
+            raise RuntimeError("TimedAgent.receive_action wywołane przed send_observation")
+        obs, self._obs = self._obs, None
+        return self.get_action(obs)
+
+    def get_stats(self) -> dict:
+        """
+        Statystyki czasu get_action (w milisekundach) od utworzenia nakładki: liczba wywołań, średnia, p50, p95, p99,
+        maksimum oraz liczba wywołań ponad limitem czasu.
+        """
+        return get_latency_stats(self.latencies, self.time_budget, self.over_budget)
+
+
+def get_latency_stats(latencies: list, time_budget: float = None, over_budget: int = 0) -> dict:
+    """
+    Statystyki czasów latencies (w sekundach) w milisekundach (patrz TimedAgent.get_stats).
+    """
+    stats = {"n_calls": len(latencies), "time_budget_ms": None, "over_budget": over_budget}
+    if time_budget is not None:
+        stats["time_budget_ms"] = time_budget * 1e3
+    if latencies:
+        latencies = np.array(latencies) * 1e3
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        stats.update({"mean_ms": float(latencies.mean()), "p50_ms": float(p50), "p95_ms": float(p95),
+                      "p99_ms": float(p99), "max_ms": float(latencies.max())})
+    return stats
+
+
+def save_timing_report(path, report):
+    """
+    Zapisuje statystyki czasu agentów (np. zwrócone przez simulate_game z return_timing=True) do pliku JSON.
+    """
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,187 @@
+import argparse
+import functools
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+import gymnasium as gym
+import torch
+
+from simulation import simulate_game
+
+
+"""
+Turniej każdy z każdym między agentami (np. kolejnymi checkpointami) rozgrywany w puli procesów.
+
+Każda para agentów gra matches_per_side meczów jako gracz 1 i tyle samo jako gracz 2 - mecze lustrzane mają ten sam
+seed, więc obaj agenci grają na tych samych mapach. Wynik meczu to suma nagród z jego gier (1 za wygraną,
+po 0.5 za remis - suma punktów obu graczy to liczba gier), z której liczymy punkty, wygrane mecze i ranking Elo.
+"""
+PLAYER_1_ID = 46
+PLAYER_2_ID = 47
+
+ELO_INITIAL_RATING = 1500
+ELO_K = 32
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description='Run a round-robin tournament between agents')
+    parser.add_argument('agent_paths', type=str, nargs='+', help="Paths to the agents' files")
+    parser.add_argument('--weights_paths', type=str, nargs='*', default=None,
+                        help="Directories with the agents' weights (by default the directory of each agent file)")
+    parser.add_argument('--n_games', type=int, default=3, help='Number of games in a match')
+    parser.add_argument('--matches_per_side', type=int, default=1,
+                        help='Number of matches of every pair with each agent as the 1st player')
+    parser.add_argument('--num_workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first match')
+    parser.add_argument('--action_time_budget', type=float, default=None,
+                        help='Time limit of get_action in seconds, slower actions are replaced with no-op')
+    parser.add_argument('--output', type=str, default=None, help='Path to the JSON file with the results')
+    return parser
+
+
+def _init_worker():
+    # Każdy proces gra jeden mecz naraz - wątki torcha tylko konkurowałyby o rdzenie z innymi procesami
+    torch.set_num_threads(1)
+    gym.logger.min_level = 40
+
+
+@functools.lru_cache(maxsize=None)
+def _load_agent_class(agent_path: str):
+    # Nazwa modułu zależy od ścieżki, żeby agenci z różnych plików nie nadpisywali się w sys.modules.
+    # Moduł wczytujemy raz na proces - ta sama klasa pozwala simulate_game używać już wczytanych agentów
+    module_name = f"agent_{abs(hash(os.path.abspath(agent_path)))}"
+    return SourceFileLoader(module_name, agent_path).load_module().Agent
+
+
+def play_match(match: dict) -> dict:
+    """
+    Rozgrywa jeden mecz turnieju (bez renderowania i zapisu) i zwraca go uzupełniony o wynik i czas.
+    """
+    start = time.perf_counter()
+    score, timing = simulate_game(player_1_id=PLAYER_1_ID, player_2_id=PLAYER_2_ID,
+                          player_1_agent_class=_load_agent_class(match["agent_1_path"]),
+                          player_2_agent_class=_load_agent_class(match["agent_2_path"]),
+                          n_games=match["n_games"], render_mode=None,
+                          player_1_weights_path=match["weights_1_path"], player_2_weights_path=match["weights_2_path"],
+                          seed=match["seed"], record=False, action_time_budget=match["action_time_budget"],
+                          return_timing=True)
+    return {**match, "score": [float(value) for value in score], "time": time.perf_counter() - start,
+            "timing": [timing["player_1"], timing["player_2"]]}
+
+
+def schedule_matches(agent_paths, weights_paths, n_games=3, matches_per_side=1, seed=0, action_time_budget=None):
+    """
+    Lista meczów turnieju każdy z każdym (słowniki z indeksami i ścieżkami agentów, liczbą gier i seedem).
+    """
+    matches = []
+    pair_seed = seed
+    for agent_1, agent_2 in itertools.combinations(range(len(agent_paths)), 2):
+        for _ in range(matches_per_side):
+            for player_1, player_2 in [(agent_1, agent_2), (agent_2, agent_1)]:
+                matches.append({
+                    "match_id": len(matches),
+                    "agent_1": player_1,
+                    "agent_2": player_2,
+                    "agent_1_path": agent_paths[player_1],
+                    "agent_2_path": agent_paths[player_2],
+                    "weights_1_path": weights_paths[player_1],
+                    "weights_2_path": weights_paths[player_2],
+                    "n_games": n_games,
+                    "seed": pair_seed,
+                    "action_time_budget": action_time_budget,
+                })
+            pair_seed += 1
+    return matches
+
+
+def compute_standings(agent_paths, results):
+    """
+    Tabela turnieju: punkty, wygrane / remisy / przegrane mecze, procent wygranych gier i ranking Elo
+    (liczony po kolei w kolejności match_id, więc nie zależy od kolejności kończenia się meczów)
+    oraz czasy get_action: najgorszy p99 i liczba akcji ponad limitem czasu.
+    """
+    standings = [{"agent": path, "points": 0.0, "games": 0, "wins": 0, "draws": 0, "losses": 0,
+                  "elo": float(ELO_INITIAL_RATING), "max_p99_ms": 0.0, "over_budget": 0} for path in agent_paths]
+
+    for result in sorted(results, key=lambda result: result["match_id"]):
+        sides = [(standings[result["agent_1"]], result["score"][0]), (standings[result["agent_2"]], result["score"][1])]
+        total = sum(result["score"])
+
+        # Najgorszy p99 czasu get_action ze wszystkich meczów agenta
+        for (player, _), timing in zip(sides, result["timing"]):
+            player["max_p99_ms"] = max(player["max_p99_ms"], timing.get("p99_ms", 0.0))
+            player["over_budget"] += timing["over_budget"]
+
+        for (player, points), (opponent, opponent_points) in [(sides[0], sides[1]), (sides[1], sides[0])]:
+            player["points"] += points
+            player["games"] += total
+            if points > opponent_points:
+                player["wins"] += 1
+            elif points == opponent_points:
+                player["draws"] += 1
+            else:
+                player["losses"] += 1
+
+        # Wynik meczu w Elo to udział w zdobytych punktach (remis, jeśli nikt nie zdobył punktów)
+        actual = sides[0][1] / total if total > 0 else 0.5
+        expected = 1 / (1 + 10 ** ((sides[1][0]["elo"] - sides[0][0]["elo"]) / 400))
+        sides[0][0]["elo"] += ELO_K * (actual - expected)
+        sides[1][0]["elo"] -= ELO_K * (actual - expected)
+
+    for player in standings:
+        player["win_rate"] = player["points"] / player["games"] if player["games"] else 0.0
+    return sorted(standings, key=lambda player: player["elo"], reverse=True)
+
+
+def run_tournament(agent_paths, weights_paths=None, n_games=3, matches_per_side=1, num_workers=None, seed=0,
+                   action_time_budget=None):
+    """
+    Rozgrywa wszystkie mecze turnieju w num_workers procesach. Zwraca (standings, results).
+    Mecz zakończony błędem (np. wyjątek agenta) jest pomijany w wynikach.
+    """
+    weights_paths = weights_paths or [str(Path(path).parent) for path in agent_paths]
+    assert len(weights_paths) == len(agent_paths), "Każdy agent musi mieć folder z wagami."
+
+    matches = schedule_matches(agent_paths, weights_paths, n_games=n_games, matches_per_side=matches_per_side,
+                               seed=seed, action_time_budget=action_time_budget)
+    print(f"Turniej: {len(agent_paths)} agentów, {len(matches)} meczów")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker) as executor:
+        futures = {executor.submit(play_match, match): match for match in matches}
+        for future in as_completed(futures):
+            match = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"  Błąd w meczu {match['agent_1_path']} vs {match['agent_2_path']} (seed {match['seed']}): {e}")
+                continue
+
+            results.append(result)
+            print(f"  [{len(results)}/{len(matches)}] {result['agent_1_path']} vs {result['agent_2_path']}: "
+                  f"{result['score']} ({result['time']:.1f} s)")
+
+    return compute_standings(agent_paths, results), sorted(results, key=lambda result: result["match_id"])
+
+
+if __name__ == '__main__':
+    args = get_parser().parse_args()
+    start = time.perf_counter()
+    standings, results = run_tournament(args.agent_paths, weights_paths=args.weights_paths, n_games=args.n_games,
+                                        matches_per_side=args.matches_per_side, num_workers=args.num_workers,
+                                        seed=args.seed, action_time_budget=args.action_time_budget)
+
+    print(f"\nWyniki ({time.perf_counter() - start:.1f} s):")
+    for place, player in enumerate(standings, start=1):
+        print(f"{place:3}. {player['agent']}: Elo {player['elo']:.0f}, punkty {player['points']:.1f}/{player['games']} "
+              f"({player['win_rate']:.1%}), mecze W/R/P {player['wins']}/{player['draws']}/{player['losses']}, "
+              f"p99 get_action {player['max_p99_ms']:.2f} ms, ponad limitem {player['over_budget']}")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"standings": standings, "matches": results}, f, indent=2)
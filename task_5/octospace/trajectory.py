@@ -0,0 +1,445 @@
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+"""
+Kolumnowy, binarny format zapisu rozgrywki - jeden plik na mecz.
+
+Plik składa się z nagłówka MAGIC i kolejnych fragmentów (chunków), z których każdy zawiera do chunk_size kroków:
+    u32 długość nagłówka, nagłówek JSON, dane kolumn (każda kolumna wyrównana do ALIGNMENT bajtów)
+
+Nagłówek fragmentu: {"n_steps": T, "meta": {...}, "columns": {nazwa: {"dtype", "shape", "offset"}}}.
+Kolumny fragmentu (T - liczba kroków we fragmencie):
+    map: (T, 100, 100) int16 - mapa z nałożoną maską widoczności
+    allied_ships, enemy_ships: (N, 6) int16 - statki wszystkich kroków jeden po drugim
+    allied_ships_offsets, enemy_ships_offsets: (T + 1,) int32 - statki kroku t to wiersze [offsets[t], offsets[t + 1])
+    planets_occupation: (P, 3) int16 oraz planets_occupation_offsets: (T + 1,) int32
+    resources: (T, 4) int16
+    ships_actions: (A, 4) int16 (dla strzału speed = -1) oraz ships_actions_offsets: (T + 1,) int32
+    construction: (T,) int16
+    reward: (T, 2) float32 - nagrody player_1, player_2
+    round: (T,) int16 - numer rundy w meczu
+
+Przy zapisie z keyframe_interval = K mapa jest kodowana różnicowo - zamiast kolumny map fragment zawiera:
+    map_keyframes: (ceil(T / K), 100, 100) int16 - pełne mapy kroków 0, K, 2K, ... fragmentu
+    map_diff_indices: (D,) int32 - indeksy (y * 100 + x) pól zmienionych względem poprzedniego kroku
+    map_diff_values: (D,) int16 - nowe wartości tych pól
+    map_diff_offsets: (T + 1,) int32 - zmiany kroku t to elementy [offsets[t], offsets[t + 1])
+a nagłówek fragmentu ma pole "map_keyframe_interval". Mapę kroku t odtwarza się z najbliższej wcześniejszej
+mapy kluczowej, nakładając kolejno zmiany kroków pośrednich.
+
+Odczyt mapuje plik do pamięci (np.memmap), więc kolumny są widokami na plik, bez kopiowania.
+"""
+MAGIC = b"OCTOREC1"
+ALIGNMENT = 64
+TRAJECTORY_SUFFIX = ".octo"
+
+RAGGED_COLUMNS = {
+    "allied_ships": 6,
+    "enemy_ships": 6,
+    "planets_occupation": 3,
+    "ships_actions": 4,
+}
+
+
+def _pad(position: int) -> int:
+    return -position % ALIGNMENT
+
+
+def get_recording_path(saves_path, name: str) -> Path:
+    """
+    Ścieżka nowego pliku z zapisem w folderze saves_path. Jeśli plik o tej nazwie już istnieje (np. mecz rozpoczęty
+    w tej samej sekundzie), dodajemy do nazwy kolejny numer.
+    """
+    path = Path(saves_path) / (name + TRAJECTORY_SUFFIX)
+    number = 1
+    while path.exists():
+        path = Path(saves_path) / f"{name}_{number}{TRAJECTORY_SUFFIX}"
+        number += 1
+    return path
+
+
+def _snapshot_observation(observation: dict) -> dict:
+    # Tablice obserwacji mogą być współdzielone ze środowiskiem, które zmienia je w miejscu (np. zasoby
+    # przy budowie statków), więc kopiujemy je przy dodaniu kroku - od razu w typie zapisywanej kolumny
+    return {**observation, "map": np.array(observation["map"], dtype=np.int16),
+            "resources": np.array(observation["resources"], dtype=np.int16)}
+
+
+class TrajectoryRecorder:
+    """
+    Zapisuje przebieg meczu do pliku w formacie kolumnowym (patrz opis na początku modułu).
+
+    Kroki są buforowane w pamięci i zapisywane co chunk_size kroków oraz przy zamknięciu.
+    Parametry:
+      path: ścieżka do pliku (np. "saves/2025-03-15_19-39-44.octo"), który nie może jeszcze istnieć
+        (patrz get_recording_path)
+      chunk_size: liczba kroków w jednym fragmencie pliku
+      meta: dodatkowe informacje o meczu zapisywane w nagłówku pierwszego fragmentu (np. id graczy)
+      keyframe_interval: co ile kroków zapisywana jest pełna mapa, pomiędzy nimi tylko zmienione pola;
+        None - pełna mapa w każdym kroku
+    """
+
+    def __init__(self, path, chunk_size: int = 256, meta: dict = None, keyframe_interval: int = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.meta = meta or {}
+        self.keyframe_interval = keyframe_interval
+        self.n_steps = 0
+
+        # Tryb "xb" - istniejący zapis innego meczu nie zostanie nadpisany
+        self._file = open(self.path, "xb")
+        self._file.write(MAGIC)
+        self._steps = []
+
+    def add_step(self, observation: dict, action: dict, reward: dict, round_id: int = 0):
+        """
+        Dodaje krok: obserwację i akcję zapisywanego gracza oraz nagrody obu graczy.
+        Mapa i zasoby obserwacji są kopiowane, więc środowisko może je później zmieniać.
+        """
+        self._steps.append((_snapshot_observation(observation), action, reward, round_id))
+        self.n_steps += 1
+        if len(self._steps) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Zapisuje zbuforowane kroki jako nowy fragment pliku.
+        """
+        if not self._steps:
+            return
+        self._write_chunk(self._build_columns(self._steps))
+        self._steps = []
+        self._file.flush()
+
+    def end_episode(self):
+        """
+        Zapisuje zbuforowane kroki i wymusza zapis pliku na dysk (fsync) - wywoływane po zakończeniu rundy.
+        """
+        self.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _build_columns(self, steps: list) -> dict:
+        columns = {
+            "map": np.stack([np.asarray(observation["map"], dtype=np.int16) for observation, _, _, _ in steps]),
+            "resources": np.array([observation["resources"] for observation, _, _, _ in steps], dtype=np.int16).reshape(-1, 4),
+            "construction": np.array([action.get("construction", 0) for _, action, _, _ in steps], dtype=np.int16),
+            "reward": np.array([[reward["player_1"], reward["player_2"]] for _, _, reward, _ in steps], dtype=np.float32),
+            "round": np.array([round_id for _, _, _, round_id in steps], dtype=np.int16),
+        }
+
+        for name, width in RAGGED_COLUMNS.items():
+            if name == "ships_actions":
+                rows_per_step = [action.get("ships_actions", []) for _, action, _, _ in steps]
+            else:
+                rows_per_step = [observation[name] for observation, _, _, _ in steps]
+
+            lengths = [len(rows) for rows in rows_per_step]
+            values = np.full((sum(lengths), width), -1, dtype=np.int16)
+            i = 0
+            for rows in rows_per_step:
+                for row in rows:
+                    # Komenda strzału ma 3 elementy, brakująca prędkość zostaje jako -1
+                    values[i, :len(row)] = [int(value) for value in row[:width]]
+                    i += 1
+
+            columns[name] = values
+            columns[f"{name}_offsets"] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+
+        if self.keyframe_interval is not None:
+            columns.update(self._encode_maps(columns.pop("map")))
+        return columns
+
+    def _encode_maps(self, maps: np.ndarray) -> dict:
+        keyframe_steps = np.arange(0, len(maps), self.keyframe_interval)
+
+        # Zmiany kroku t względem kroku t - 1, w krokach z mapą kluczową nie zapisujemy zmian
+        flat_maps = maps.reshape(len(maps), -1)
+        changed = flat_maps[1:] != flat_maps[:-1]
+        changed[keyframe_steps[1:] - 1] = False
+        steps, indices = np.nonzero(changed)
+
+        return {
+            "map_keyframes": maps[keyframe_steps],
+            "map_diff_indices": indices.astype(np.int32),
+            "map_diff_values": flat_maps[steps + 1, indices],
+            "map_diff_offsets": np.concatenate([[0], np.cumsum(np.bincount(steps + 1, minlength=len(maps)))]).astype(np.int32),
+        }
+
+    def _write_chunk(self, columns: dict):
+        # Najpierw liczymy położenie kolumn względem początku danych, potem piszemy nagłówek i dane
+        layout = {}
+        offset = 0
+        for name, values in columns.items():
+            offset += _pad(offset)
+            layout[name] = {"dtype": values.dtype.str, "shape": list(values.shape), "offset": offset}
+            offset += values.nbytes
+
+        header = {"n_steps": len(columns["round"]), "columns": layout}
+        if self.keyframe_interval is not None:
+            header["map_keyframe_interval"] = self.keyframe_interval
+        if self._file.tell() == len(MAGIC):
+            header["meta"] = self.meta
+        header = json.dumps(header).encode()
+
+        position = self._file.tell() + 4 + len(header)
+        header += b" " * _pad(position)
+        self._file.write(np.uint32(len(header)).tobytes())
+        self._file.write(header)
+
+        written = 0
+        for name, values in columns.items():
+            padding = layout[name]["offset"] - written
+            self._file.write(b"\0" * padding)
+            self._file.write(np.ascontiguousarray(values).tobytes())
+            written += padding + values.nbytes
+
+
+class BackgroundTrajectoryRecorder(TrajectoryRecorder):
+    """
+    TrajectoryRecorder, który zapisuje plik w osobnym wątku, więc zapis na dysk nie spowalnia pętli gry.
+
+    add_step, end_episode, flush i close tylko wstawiają polecenia do kolejki o rozmiarze max_queue_size,
+    którą opróżnia wątek zapisujący (kroki są zapisywane fragmentami po chunk_size, fsync po każdej rundzie).
+    Gdy kolejka jest pełna, add_step czeka na wątek zapisujący - czas oczekiwania jest w self.stats:
+      enqueued_steps, written_steps, written_bytes, fsyncs: liczba kroków dodanych / zapisanych, bajtów
+        w pliku i wywołań fsync
+      max_queue_size: największa zaobserwowana liczba poleceń w kolejce
+      blocked_puts, blocked_time: ile razy i jak długo (w sekundach) add_step czekał na miejsce w kolejce
+    Błąd zapisu jest zgłaszany przy następnym wywołaniu metody rejestratora.
+    Mapa i zasoby obserwacji są kopiowane już w add_step (przed wstawieniem do kolejki), pozostałe pola obserwacji
+    i akcje nie - nie mogą być modyfikowane po przekazaniu do add_step.
+    """
+
+    def __init__(self, path, chunk_size: int = 256, meta: dict = None, keyframe_interval: int = None,
+                 max_queue_size: int = 1024):
+        super().__init__(path, chunk_size=chunk_size, meta=meta, keyframe_interval=keyframe_interval)
+        self.stats = {
+            "enqueued_steps": 0,
+            "written_steps": 0,
+            "written_bytes": 0,
+            "fsyncs": 0,
+            "max_queue_size": 0,
+            "blocked_puts": 0,
+            "blocked_time": 0.0,
+        }
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._error = None
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="trajectory-writer", daemon=True)
+        self._writer.start()
+
+    def add_step(self, observation: dict, action: dict, reward: dict, round_id: int = 0):
+        self._put(("step", (_snapshot_observation(observation), action, reward, round_id)))
+        self.n_steps += 1
+        self.stats["enqueued_steps"] += 1
+
+    def end_episode(self):
+        self._put(("end_episode", None))
+
+    def flush(self):
+        """
+        Czeka, aż wszystkie dodane kroki zostaną zapisane.
+        """
+        self._put(("flush", None))
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._put(("close", None))
+        self._writer.join()
+        self._raise_error()
+
+    def _put(self, command: tuple):
+        self._raise_error()
+        try:
+            self._queue.put_nowait(command)
+        except queue.Full:
+            start = time.perf_counter()
+            self._queue.put(command)
+            self.stats["blocked_puts"] += 1
+            self.stats["blocked_time"] += time.perf_counter() - start
+        self.stats["max_queue_size"] = max(self.stats["max_queue_size"], self._queue.qsize())
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _write_loop(self):
+        # Metody klasy bazowej wywołujemy jawnie - metody tej klasy wstawiają polecenia do kolejki
+        while True:
+            command, step = self._queue.get()
+            try:
+                if self._file.closed:
+                    pass
+                elif command == "step":
+                    self._steps.append(step)
+                    if len(self._steps) >= self.chunk_size:
+                        self._write_steps()
+                elif command == "end_episode":
+                    self._write_steps()
+                    os.fsync(self._file.fileno())
+                    self.stats["fsyncs"] += 1
+                elif command == "flush":
+                    self._write_steps()
+                elif command == "close":
+                    self._write_steps()
+                    os.fsync(self._file.fileno())
+                    self.stats["fsyncs"] += 1
+                    self._file.close()
+            except Exception as error:
+                # Po błędzie dalej opróżniamy kolejkę, żeby nie zablokować gry
+                self._error = error
+                self._file.close()
+            finally:
+                self._queue.task_done()
+
+            if command == "close":
+                return
+
+    def _write_steps(self):
+        n_steps = len(self._steps)
+        TrajectoryRecorder.flush(self)
+        self.stats["written_steps"] += n_steps
+        self.stats["written_bytes"] = self._file.tell()
+
+
+class TrajectoryReader:
+    """
+    Odczytuje mecz zapisany przez TrajectoryRecorder. Plik jest mapowany do pamięci, kolumny każdego fragmentu
+    (self.chunks) są widokami na plik. Pojedyncze kroki można odczytać w formacie środowiska przez
+    get_observation, get_action i get_reward.
+
+    Mapy kodowane różnicowo są odtwarzane przez get_map z najbliższej mapy kluczowej. Przy odczycie kolejnych
+    kroków po kolei wykorzystywana jest mapa poprzedniego kroku, więc każda mapa jest dekodowana tylko raz.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._buffer = np.memmap(self.path, dtype=np.uint8, mode="r")
+        if bytes(self._buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{self.path} nie jest plikiem z zapisem rozgrywki")
+
+        self.meta = {}
+        self.chunks = []
+        self._keyframe_intervals = []
+        position = len(MAGIC)
+        while position < len(self._buffer):
+            header_length = int(np.frombuffer(self._buffer, dtype=np.uint32, count=1, offset=position)[0])
+            header = json.loads(bytes(self._buffer[position + 4:position + 4 + header_length]))
+            data_start = position + 4 + header_length
+            self.meta.update(header.get("meta", {}))
+
+            chunk = {}
+            end = data_start
+            for name, column in header["columns"].items():
+                dtype = np.dtype(column["dtype"])
+                count = int(np.prod(column["shape"]))
+                chunk[name] = np.frombuffer(self._buffer, dtype=dtype, count=count,
+                                            offset=data_start + column["offset"]).reshape(column["shape"])
+                end = max(end, data_start + column["offset"] + count * dtype.itemsize)
+            self.chunks.append(chunk)
+            self._keyframe_intervals.append(header.get("map_keyframe_interval"))
+            position = end
+
+        self._chunk_starts = np.cumsum([0] + [len(chunk["round"]) for chunk in self.chunks])
+
+        # Ostatnio zdekodowana mapa (krok, mapa) - do odczytu kolejnych kroków bez wracania do mapy kluczowej
+        self._last_map = (None, None)
+
+    def __len__(self):
+        return int(self._chunk_starts[-1])
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Cała kolumna (stałej długości na krok, np. "map" albo "reward") - widok, jeśli plik ma jeden fragment.
+        Mapy kodowane różnicowo są dekodowane do nowej tablicy.
+        """
+        if name == "map" and any(interval is not None for interval in self._keyframe_intervals):
+            return np.stack([self.get_map(step) for step in range(len(self))])
+        if len(self.chunks) == 1:
+            return self.chunks[0][name]
+        return np.concatenate([chunk[name] for chunk in self.chunks])
+
+    def _locate(self, step: int):
+        chunk_id = int(np.searchsorted(self._chunk_starts, step, side="right")) - 1
+        return chunk_id, step - int(self._chunk_starts[chunk_id])
+
+    @staticmethod
+    def _get_rows(chunk: dict, name: str, t: int) -> np.ndarray:
+        offsets = chunk[f"{name}_offsets"]
+        return chunk[name][offsets[t]:offsets[t + 1]]
+
+    def get_map(self, step: int) -> np.ndarray:
+        """
+        Mapa kroku step - widok na plik (tylko do odczytu) albo, dla map kodowanych różnicowo, nowa tablica.
+        """
+        chunk_id, t = self._locate(step)
+        chunk = self.chunks[chunk_id]
+        keyframe_interval = self._keyframe_intervals[chunk_id]
+        if keyframe_interval is None:
+            return chunk["map"][t]
+
+        last_step, last_map = self._last_map
+        if t % keyframe_interval != 0 and last_step == step - 1:
+            game_map = last_map.copy()
+            first_diff = t
+        else:
+            game_map = chunk["map_keyframes"][t // keyframe_interval].copy()
+            first_diff = t - t % keyframe_interval + 1
+
+        flat_map = game_map.reshape(-1)
+        offsets = chunk["map_diff_offsets"]
+        for diff_step in range(first_diff, t + 1):
+            diff = slice(offsets[diff_step], offsets[diff_step + 1])
+            flat_map[chunk["map_diff_indices"][diff]] = chunk["map_diff_values"][diff]
+
+        # Zwracamy kopię - zmiana zwróconej mapy nie może zepsuć dekodowania kolejnego kroku
+        self._last_map = (step, game_map)
+        return game_map.copy()
+
+    def get_observation(self, step: int) -> dict:
+        chunk_id, t = self._locate(step)
+        chunk = self.chunks[chunk_id]
+        return {
+            "map": self.get_map(step),
+            "allied_ships": self._get_rows(chunk, "allied_ships", t).tolist(),
+            "enemy_ships": self._get_rows(chunk, "enemy_ships", t).tolist(),
+            "planets_occupation": self._get_rows(chunk, "planets_occupation", t).tolist(),
+            "resources": chunk["resources"][t],
+        }
+
+    def get_action(self, step: int) -> dict:
+        chunk_id, t = self._locate(step)
+        chunk = self.chunks[chunk_id]
+        ships_actions = [row[:3] if row[3] == -1 else row for row in self._get_rows(chunk, "ships_actions", t).tolist()]
+        return {"ships_actions": ships_actions, "construction": int(chunk["construction"][t])}
+
+    def get_reward(self, step: int) -> dict:
+        chunk_id, t = self._locate(step)
+        chunk = self.chunks[chunk_id]
+        return {"player_1": float(chunk["reward"][t, 0]), "player_2": float(chunk["reward"][t, 1])}